@@ -41,11 +41,15 @@ from src.shared.logger import get_logger
 
 
 def main():
+    container = None
     try:
         logger = get_logger()
         logger.info("Iniciando Sistema de Biblioteca Liskov")
 
         container = Container()
+        container.get_metrics_server()
+        container.get_planificador()
+        container.iniciar_auditoria()
         console_ui = container.get_console_ui()
 
         console_ui.ejecutar()
@@ -56,8 +60,12 @@ def main():
     except Exception as e:
         print(f"❌ Error crítico del sistema: {str(e)}")
         logger = get_logger()
-        logger.error(f"Error crítico: {str(e)}")
+        logger.error("Error crítico: %s", e)
         sys.exit(1)
+    finally:
+        if container:
+            container.detener_planificador()
+            container.detener_auditoria()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark de hidratación de entidades: filas/segundo antes y después
+de los mappers compilados.
+
+    python scripts/benchmark_hidratacion.py            # 1.000.000 de préstamos
+    python scripts/benchmark_hidratacion.py --filas 100000
+
+"Antes" es el camino original: filas sqlite3.Row copiadas a dict y
+`_row_to_entity` con búsquedas por clave, `Enum(valor)` y fromisoformat
+condicional. "Después" lee tuplas crudas y usa el constructor compilado.
+Se miden por separado la hidratación sola (filas ya en memoria) y el
+recorrido completo consulta + hidratación.
+"""
+
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Agregar el path del proyecto al sistema
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.domain.entities import CategoriaItem, EstadoItem, ItemBiblioteca, Prestamo
+from src.infrastructure.database import ORM, DatabaseConnection
+from src.infrastructure.repositories import ItemBibliotecaRepository, PrestamoRepository
+
+
+def prestamo_legacy(row):
+    return Prestamo(
+        id=row["id"],
+        usuario_id=row["usuario_id"],
+        item_id=row["item_id"],
+        empleado_id=row["empleado_id"],
+        fecha_prestamo=datetime.fromisoformat(row["fecha_prestamo"]) if row["fecha_prestamo"] else None,
+        fecha_devolucion_esperada=(
+            datetime.fromisoformat(row["fecha_devolucion_esperada"]) if row["fecha_devolucion_esperada"] else None
+        ),
+        fecha_devolucion_real=(datetime.fromisoformat(row["fecha_devolucion_real"]) if row["fecha_devolucion_real"] else None),
+        observaciones=row["observaciones"],
+        activo=bool(row["activo"]),
+    )
+
+
+def item_legacy(row):
+    return ItemBiblioteca(
+        id=row["id"],
+        titulo=row["titulo"],
+        autor=row["autor"],
+        isbn=row["isbn"],
+        categoria=CategoriaItem(row["categoria"]),
+        estado=EstadoItem(row["estado"]),
+        descripcion=row["descripcion"],
+        ubicacion=row["ubicacion"],
+        fecha_adquisicion=datetime.fromisoformat(row["fecha_adquisicion"]) if row["fecha_adquisicion"] else None,
+        valor_reposicion=row["valor_reposicion"],
+    )
+
+
+def poblar(db_path: str, filas: int) -> None:
+    ORM(DatabaseConnection(db_path)).create_tables()
+    base = datetime(2024, 1, 1, 9, 30)
+    categorias = [c.value for c in CategoriaItem]
+    estados = [e.value for e in EstadoItem]
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany(
+            "INSERT INTO prestamos (usuario_id, item_id, empleado_id, fecha_prestamo, fecha_devolucion_esperada,"
+            " fecha_devolucion_real, observaciones, activo) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                (
+                    i % 5000 + 1,
+                    i % 20000 + 1,
+                    i % 10 + 1,
+                    (base + timedelta(minutes=i)).isoformat(),
+                    (base + timedelta(days=15, minutes=i)).isoformat(),
+                    (base + timedelta(days=10, minutes=i)).isoformat() if i % 3 else None,
+                    None,
+                    i % 3 == 0,
+                )
+                for i in range(filas)
+            ),
+        )
+        conn.executemany(
+            "INSERT INTO items_biblioteca (titulo, autor, categoria, estado, fecha_adquisicion, valor_reposicion)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                (
+                    f"Titulo {i}",
+                    f"Autor {i % 700}",
+                    categorias[i % len(categorias)],
+                    estados[i % len(estados)],
+                    (base - timedelta(hours=i)).isoformat(),
+                    1000.0 + i % 50,
+                )
+                for i in range(filas)
+            ),
+        )
+
+
+def medir(nombre: str, filas: int, funcion) -> float:
+    inicio = time.perf_counter()
+    resultado = funcion()
+    segundos = time.perf_counter() - inicio
+    assert len(resultado) == filas, f"{nombre}: {len(resultado)} filas"
+    tasa = filas / segundos
+    print(f"  {nombre:<38} {segundos:8.3f} s   {tasa:>12,.0f} filas/s")
+    return tasa
+
+
+def comparar(db: DatabaseConnection, tabla: str, filas: int, legacy, mapper) -> None:
+    query = f"SELECT * FROM {tabla}"  # nosec B608
+    print(f"\n📦 {tabla} ({filas:,} filas)")
+
+    dicts = db.execute_query(query)
+    columnas, tuplas = db.execute_query_rows(query)
+    antes = medir("hidratación antes (dict)", filas, lambda: [legacy(r) for r in dicts])
+    despues = medir("hidratación después (tupla compilada)", filas, lambda: mapper.mapear(columnas, tuplas))
+    print(f"  → {despues / antes:.2f}x")
+    dicts = tuplas = None  # liberar memoria antes del recorrido completo
+
+    antes = medir("consulta + hidratación antes", filas, lambda: [legacy(r) for r in db.execute_query(query)])
+    despues = medir("consulta + hidratación después", filas, lambda: mapper.mapear(*db.execute_query_rows(query)))
+    print(f"  → {despues / antes:.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--filas", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp()
+    try:
+        db_path = os.path.join(directorio, "benchmark.db")
+        print(f"🧪 Generando {args.filas:,} préstamos e items...")
+        poblar(db_path, args.filas)
+
+        db = DatabaseConnection(db_path)
+        comparar(db, "prestamos", args.filas, prestamo_legacy, PrestamoRepository._mapper)
+        comparar(db, "items_biblioteca", args.filas, item_legacy, ItemBibliotecaRepository._mapper)
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark del límite de préstamos simultáneos: cuánto agrega el
+conteo de préstamos activos del usuario a un préstamo en el mostrador.
+
+    python scripts/benchmark_limites.py            # 1.000.000 de préstamos
+    python scripts/benchmark_limites.py --filas 100000 --muestras 2000
+
+Se mide el COUNT solo (`contar_activos_por_usuario`, resuelto con el índice
+parcial idx_prestamos_usuario_activos) y `realizar_prestamo` completo con y
+sin límite configurado, sobre usuarios al azar.
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Agregar el path del proyecto al sistema
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.application.services import PrestamoService
+from src.infrastructure.database import ORM, DatabaseConnection
+from src.infrastructure.repositories import (
+    ItemBibliotecaRepository,
+    MultaRepository,
+    PrestamoRepository,
+    UnidadDeTrabajo,
+    UsuarioRepository,
+)
+
+USUARIOS = 50_000
+
+
+def poblar(db_path: str, filas: int, items: int) -> None:
+    ORM(DatabaseConnection(db_path)).create_tables()
+    base = int(datetime(2024, 1, 1).timestamp())
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany(
+            "INSERT INTO usuarios (nombre, apellido, email, tipo, numero_identificacion) VALUES (?, ?, ?, ?, ?)",
+            ((f"Usuario {i}", "Bench", f"u{i}@bench.com", "alumno", str(i)) for i in range(USUARIOS)),
+        )
+        # Un préstamo de cada 20 sigue activo: ~1 activo por usuario, el resto es historial
+        conn.executemany(
+            "INSERT INTO prestamos (usuario_id, item_id, empleado_id, fecha_prestamo, fecha_devolucion_esperada,"
+            " fecha_devolucion_real, activo) VALUES (?, ?, 1, ?, ?, ?, ?)",
+            (
+                (
+                    i % USUARIOS + 1,
+                    i % 20000 + 1,
+                    base + i * 60,
+                    base + i * 60 + 15 * 86400,
+                    None if i % 20 == 0 else base + i * 60 + 10 * 86400,
+                    i % 20 == 0,
+                )
+                for i in range(filas)
+            ),
+        )
+        conn.executemany(
+            "INSERT INTO items_biblioteca (titulo, categoria, estado) VALUES (?, 'libro', 'disponible')",
+            ((f"Titulo {i}",) for i in range(items)),
+        )
+        conn.execute("ANALYZE")
+
+
+def percentiles(nombre: str, tiempos) -> float:
+    ms = sorted(t * 1000 for t in tiempos)
+    p50, p99 = statistics.median(ms), ms[int(len(ms) * 0.99) - 1]
+    print(f"  {nombre:<34} p50 {p50:7.3f} ms   p99 {p99:7.3f} ms")
+    return p50
+
+
+def cronometrar(funcion, argumentos):
+    tiempos = []
+    for args in argumentos:
+        inicio = time.perf_counter()
+        funcion(*args)
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--filas", type=int, default=1_000_000)
+    parser.add_argument("--muestras", type=int, default=1000)
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp()
+    try:
+        db_path = os.path.join(directorio, "benchmark.db")
+        print(f"🧪 Generando {args.filas:,} préstamos de {USUARIOS:,} usuarios...")
+        poblar(db_path, args.filas, 2 * args.muestras)
+
+        orm = ORM(DatabaseConnection(db_path))
+        orm.create_tables()
+        prestamo_repo = PrestamoRepository(orm)
+        repos = (prestamo_repo, ItemBibliotecaRepository(orm), UsuarioRepository(orm), MultaRepository(orm))
+
+        def servicio(maximo):
+            return PrestamoService(*repos, UnidadDeTrabajo(orm), max_prestamos_simultaneos=maximo)
+
+        azar = random.Random(42)  # nosec B311 - datos de benchmark
+        usuarios = [azar.randint(1, USUARIOS) for _ in range(args.muestras)]
+
+        print(f"\n⏱️  {args.muestras:,} muestras")
+        percentiles("COUNT préstamos activos", cronometrar(prestamo_repo.contar_activos_por_usuario, [(u,) for u in usuarios]))
+        # 1000 de cupo: se mide el costo del conteo, no rechazos
+        con_limite = cronometrar(servicio(1000).realizar_prestamo, [(u, i + 1, 1) for i, u in enumerate(usuarios)])
+        sin_limite = cronometrar(
+            servicio(None).realizar_prestamo, [(u, args.muestras + i + 1, 1) for i, u in enumerate(usuarios)]
+        )
+        antes = percentiles("realizar_prestamo sin límite", sin_limite)
+        despues = percentiles("realizar_prestamo con límite", con_limite)
+        print(f"  → el límite agrega {despues - antes:+.3f} ms (p50)")
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark de memoria de las entidades de dominio: bytes por instancia con
+y sin __slots__, medidos con tracemalloc sobre 1.000.000 de instancias.
+
+    python scripts/benchmark_memoria.py
+    python scripts/benchmark_memoria.py --instancias 100000
+
+La variante "sin slots" es la misma dataclass regenerada sin `slots=True`,
+es decir, como estaban definidas las entidades antes. Los valores de los
+campos se comparten entre instancias para medir solo el costo del objeto.
+"""
+
+import argparse
+import dataclasses
+import gc
+import os
+import sys
+import tracemalloc
+from datetime import datetime
+
+# Agregar el path del proyecto al sistema
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.domain.entities import ItemBiblioteca, Multa, Prestamo, Reserva, Usuario
+
+
+def sin_slots(cls: type) -> type:
+    """Recrea la dataclass con los mismos campos pero con __dict__ por instancia"""
+    campos = []
+    for f in dataclasses.fields(cls):
+        opciones = {"init": f.init, "repr": f.repr, "compare": f.compare}
+        if f.default is not dataclasses.MISSING:
+            opciones["default"] = f.default
+        if f.default_factory is not dataclasses.MISSING:
+            opciones["default_factory"] = f.default_factory
+        campos.append((f.name, f.type, dataclasses.field(**opciones)))
+    metodos = {k: v for k, v in vars(cls).items() if callable(v) and not k.startswith("__")}
+    return dataclasses.make_dataclass(f"{cls.__name__}SinSlots", campos, namespace=metodos)
+
+
+def bytes_por_instancia(fabrica, instancias: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    inicial = tracemalloc.get_traced_memory()[0]
+    objetos = [fabrica(i) for i in range(instancias)]
+    final = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # La lista que los contiene cuesta 8 bytes por puntero; no es parte de la entidad
+    total = final - inicial - sys.getsizeof(objetos)
+    del objetos
+    return total / instancias
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes por entidad con y sin __slots__")
+    parser.add_argument("--instancias", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    fecha = datetime(2024, 1, 1, 12, 0)
+    fabricas = {
+        Prestamo: lambda cls: lambda i: cls(
+            id=i, usuario_id=1, item_id=2, empleado_id=3, fecha_prestamo=fecha, fecha_devolucion_esperada=fecha
+        ),
+        Multa: lambda cls: lambda i: cls(id=i, usuario_id=1, prestamo_id=2, empleado_id=3, monto=10.0, fecha_multa=fecha),
+        Reserva: lambda cls: lambda i: cls(id=i, usuario_id=1, item_id=2, empleado_id=3, fecha_reserva=fecha),
+        ItemBiblioteca: lambda cls: lambda i: cls(id=i, titulo="Titulo", autor="Autor", fecha_adquisicion=fecha),
+        Usuario: lambda cls: lambda i: cls(id=i, nombre="Ana", apellido="Pérez", email="ana@test.com"),
+    }
+
+    print(f"🧪 {args.instancias:,} instancias por entidad\n")
+    print(f"  {'Entidad':<16} {'sin slots':>12} {'con slots':>12} {'ahorro':>8}")
+    for entidad, fabrica in fabricas.items():
+        antes = bytes_por_instancia(fabrica(sin_slots(entidad)), args.instancias)
+        despues = bytes_por_instancia(fabrica(entidad), args.instancias)
+        print(f"  {entidad.__name__:<16} {antes:>10.1f} B {despues:>10.1f} B {1 - despues / antes:>7.0%}")
+
+
+if __name__ == "__main__":
+    main()
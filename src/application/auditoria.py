@@ -0,0 +1,189 @@
+"""
+Registro de auditoría de las modificaciones hechas por los servicios.
+
+Cada mutación exitosa deja una entrada (empleado, operación, entidad y los
+campos que cambiaron, antes y después) en un buffer en memoria; un hilo
+escritor la persiste en lotes con un único INSERT cada `intervalo` segundos,
+o antes si se juntan `lote` entradas. Así la operación del mostrador no paga
+una escritura extra por cada cambio. Si el hilo no está en marcha (scripts,
+tests), al llenarse el lote se escribe en el hilo que registra.
+
+Si la escritura falla, las entradas vuelven al frente del buffer y se
+reintentan en el próximo vaciado; pasado `maximo_pendientes` se descartan las
+más antiguas para no crecer sin límite mientras la base no responde.
+"""
+
+import threading
+from dataclasses import fields
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional
+
+from ..shared.logger import get_logger
+from ..shared.metrics import get_metrics
+from .interfaces import IAuditoriaRepository
+from .read_models import EntradaAuditoria
+
+_entradas_auditoria = get_metrics().counter(
+    "biblioteca_audit_entries_total", "Entradas de auditoría por resultado", ("resultado",)
+)
+
+# Campos que no se copian a la auditoría; si cambian se registra solo que cambiaron
+CAMPOS_OCULTOS = frozenset({"password_hash"})
+OCULTO = "***"
+
+
+def _valor(valor: Any) -> Any:
+    """Lleva un valor de campo a algo que se guarda tal cual en JSON"""
+    if valor is None or isinstance(valor, (bool, int, float, str)):
+        return valor
+    if isinstance(valor, Enum):
+        return valor.value
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    return str(valor)
+
+
+def instantanea(entidad: Any) -> Dict[str, Any]:
+    """
+    Campos de una entidad de dominio (dataclass) con sus valores listos para
+    comparar y guardar. Los campos privados (`_...`) son estado cargado en
+    memoria, como el saldo de multas de un usuario, y no se auditan.
+    """
+    return {
+        campo.name: OCULTO if campo.name in CAMPOS_OCULTOS else _valor(getattr(entidad, campo.name))
+        for campo in fields(entidad)
+        if not campo.name.startswith("_")
+    }
+
+
+def diferencias(antes: Optional[Dict[str, Any]], despues: Optional[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """
+    campo -> [antes, después] de los campos que cambiaron. Sin `antes` es un
+    alta (se listan los campos con valor); sin `despues`, una baja.
+    """
+    antes, despues = antes or {}, despues or {}
+    cambios = {}
+    for campo in dict.fromkeys([*antes, *despues]):
+        if campo == "id":
+            continue
+        previo, nuevo = antes.get(campo), despues.get(campo)
+        if previo != nuevo:
+            cambios[campo] = [previo, nuevo]
+    return cambios
+
+
+def auditar(
+    auditoria: Optional["RegistroAuditoria"],
+    operacion: str,
+    entidad: Any,
+    antes: Optional[Dict[str, Any]] = None,
+    empleado_id: Optional[int] = None,
+    sistema: bool = False,
+) -> None:
+    """Encola el cambio de `entidad` respecto de la `instantanea` previa (sin `antes`, un alta); sin registro no hace nada"""
+    if auditoria:
+        cambios = diferencias(antes, instantanea(entidad))
+        auditoria.registrar(operacion, type(entidad).__name__, entidad.id, cambios, empleado_id, sistema)
+
+
+class RegistroAuditoria:
+    def __init__(
+        self,
+        auditoria_repo: IAuditoriaRepository,
+        lote: int = 200,
+        intervalo: float = 1.0,
+        empleado_actual: Optional[Callable[[], Optional[int]]] = None,
+        maximo_pendientes: Optional[int] = None,
+        reloj: Callable[[], datetime] = datetime.now,
+    ):
+        if lote < 1:
+            raise ValueError("El tamaño de lote debe ser mayor a cero")
+        self.auditoria_repo = auditoria_repo
+        self.lote = lote
+        self.intervalo = intervalo
+        self.maximo_pendientes = maximo_pendientes or 50 * lote
+        self.logger = get_logger()
+        # Servicios sin argumento empleado_id (p. ej. pagar una multa) auditan al empleado en sesión
+        self._empleado_actual = empleado_actual
+        self._reloj = reloj
+        self._pendientes: List[EntradaAuditoria] = []
+        self._lock = threading.Lock()
+        # Un vaciado a la vez: las entradas llegan a la base en el orden en que se registraron
+        self._escritura = threading.Lock()
+        self._despertar = threading.Event()
+        self._detenido = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    @property
+    def pendientes(self) -> int:
+        with self._lock:
+            return len(self._pendientes)
+
+    def registrar(
+        self,
+        operacion: str,
+        entidad: str,
+        entidad_id: Optional[int],
+        cambios: Dict[str, List[Any]],
+        empleado_id: Optional[int] = None,
+        sistema: bool = False,
+    ) -> None:
+        """Encola una entrada; `sistema` marca las tareas automáticas, que no se atribuyen al empleado en sesión"""
+        if empleado_id is None and not sistema and self._empleado_actual:
+            empleado_id = self._empleado_actual()
+        entrada = EntradaAuditoria(operacion, entidad, entidad_id, self._reloj(), empleado_id, cambios)
+        with self._lock:
+            self._pendientes.append(entrada)
+            lleno = len(self._pendientes) >= self.lote
+        if lleno:
+            if self._hilo and self._hilo.is_alive():
+                self._despertar.set()
+            else:
+                self.vaciar()
+
+    def vaciar(self) -> int:
+        """Escribe todo lo pendiente en un solo INSERT y devuelve cuántas entradas se guardaron"""
+        with self._escritura:
+            with self._lock:
+                entradas, self._pendientes = self._pendientes, []
+            if not entradas:
+                return 0
+            try:
+                self.auditoria_repo.registrar_muchas(entradas)
+            except Exception as e:
+                self.logger.error("No se pudieron escribir %d entradas de auditoría: %s", len(entradas), e)
+                with self._lock:
+                    self._pendientes[:0] = entradas
+                    self._descartar_excedente()
+                return 0
+        _entradas_auditoria.labels("escrita").inc(len(entradas))
+        return len(entradas)
+
+    def _descartar_excedente(self) -> None:
+        excedente = len(self._pendientes) - self.maximo_pendientes
+        if excedente > 0:
+            del self._pendientes[:excedente]
+            _entradas_auditoria.labels("descartada").inc(excedente)
+            self.logger.error("Auditoría: se descartaron las %d entradas más antiguas sin escribir", excedente)
+
+    def iniciar(self) -> None:
+        if self._hilo and self._hilo.is_alive():
+            return
+        self._detenido.clear()
+        self._hilo = threading.Thread(target=self._bucle, name="auditoria", daemon=True)
+        self._hilo.start()
+
+    def detener(self, timeout: float = 5.0) -> None:
+        """Detiene el hilo escritor y escribe lo que haya quedado en el buffer"""
+        self._detenido.set()
+        self._despertar.set()
+        if self._hilo:
+            self._hilo.join(timeout)
+        self.vaciar()
+
+    def _bucle(self) -> None:
+        while not self._detenido.is_set():
+            self._despertar.wait(self.intervalo)
+            self._despertar.clear()
+            self.vaciar()
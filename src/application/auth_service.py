@@ -1,18 +1,32 @@
 import hashlib
 from datetime import datetime
-from typing import Optional
+from typing import Dict, Iterable, Optional
 
 from ..domain.entities import Empleado, SesionEmpleado
 from ..shared.logger import get_logger
+from ..shared.operation_log import instrumentar_servicio
+from .auditoria import OCULTO, RegistroAuditoria, auditar
 from .interfaces import IEmpleadoRepository
 
 
+def _empleado_en_sesion(servicio: "AuthService") -> Optional[int]:
+    sesion = servicio._sesion_actual
+    return sesion.empleado.id if sesion and sesion.activa else None
+
+
+@instrumentar_servicio(empleado_actual=_empleado_en_sesion)
 class AuthService:
-    def __init__(self, empleado_repo: IEmpleadoRepository):
+    def __init__(self, empleado_repo: IEmpleadoRepository, auditoria: Optional[RegistroAuditoria] = None):
         self.empleado_repo = empleado_repo
+        self.auditoria = auditoria
         self.logger = get_logger()
         self._sesion_actual: Optional[SesionEmpleado] = None
 
+    @property
+    def empleado_id_en_sesion(self) -> Optional[int]:
+        """ID del empleado logueado; como propiedad no emite un evento de operación en cada consulta"""
+        return _empleado_en_sesion(self)
+
     def hash_password(self, password: str) -> str:
         """Genera hash de contraseña usando SHA-256"""
         return hashlib.sha256(password.encode()).hexdigest()
@@ -36,31 +50,31 @@ class AuthService:
             empleado = self.empleado_repo.obtener_por_usuario_sistema(usuario_sistema)
 
             if not empleado:
-                self.logger.warning(f"Intento de login fallido: usuario '{usuario_sistema}' no encontrado")
+                self.logger.warning("Intento de login fallido: usuario '%s' no encontrado", usuario_sistema)
                 return False
 
             if not empleado.activo:
-                self.logger.warning(f"Intento de login con usuario inactivo: '{usuario_sistema}'")
+                self.logger.warning("Intento de login con usuario inactivo: '%s'", usuario_sistema)
                 return False
 
             if not self.verificar_password(password, empleado.password_hash):
-                self.logger.warning(f"Intento de login fallido: contraseña incorrecta para '{usuario_sistema}'")
+                self.logger.warning("Intento de login fallido: contraseña incorrecta para '%s'", usuario_sistema)
                 return False
 
             # Login exitoso
             self._sesion_actual = SesionEmpleado(empleado=empleado, fecha_login=datetime.now(), activa=True)
 
-            self.logger.info(f"Login exitoso: {empleado.nombre} {empleado.apellido} ({usuario_sistema})")
+            self.logger.info("Login exitoso: %s %s (%s)", empleado.nombre, empleado.apellido, usuario_sistema)
             return True
 
         except Exception as e:
-            self.logger.error(f"Error durante login: {str(e)}")
+            self.logger.error("Error durante login: %s", e)
             return False
 
     def logout(self):
         """Cierra la sesión actual"""
         if self._sesion_actual:
-            self.logger.info(f"Logout: {self._sesion_actual.empleado.nombre} {self._sesion_actual.empleado.apellido}")
+            self.logger.info("Logout: %s %s", self._sesion_actual.empleado.nombre, self._sesion_actual.empleado.apellido)
             self._sesion_actual.activa = False
             self._sesion_actual = None
 
@@ -123,7 +137,8 @@ class AuthService:
         )
 
         empleado_creado = self.empleado_repo.crear(empleado)
-        self.logger.info(f"Empleado creado: {nombre} {apellido} ({usuario_sistema})")
+        auditar(self.auditoria, "AuthService.crear_empleado", empleado_creado)
+        self.logger.info("Empleado creado: %s %s (%s)", nombre, apellido, usuario_sistema)
 
         return empleado_creado
 
@@ -131,6 +146,10 @@ class AuthService:
         """Lista todos los empleados activos"""
         return self.empleado_repo.listar_activos()
 
+    def obtener_empleados_por_ids(self, ids: Iterable[int]) -> Dict[int, Empleado]:
+        """Obtiene varios empleados en una sola consulta, indexados por ID"""
+        return self.empleado_repo.obtener_por_ids(ids)
+
     def cambiar_password(self, empleado_id: int, password_actual: str, password_nuevo: str) -> bool:
         """
         Cambia la contraseña de un empleado
@@ -155,10 +174,14 @@ class AuthService:
             # Actualizar contraseña
             empleado.password_hash = self.hash_password(password_nuevo)
             self.empleado_repo.actualizar(empleado)
+            if self.auditoria:
+                self.auditoria.registrar(
+                    "AuthService.cambiar_password", "Empleado", empleado_id, {"password_hash": [OCULTO, OCULTO]}, empleado_id
+                )
 
-            self.logger.info(f"Contraseña cambiada para empleado: {empleado.nombre} {empleado.apellido}")
+            self.logger.info("Contraseña cambiada para empleado: %s %s", empleado.nombre, empleado.apellido)
             return True
 
         except Exception as e:
-            self.logger.error(f"Error al cambiar contraseña: {str(e)}")
+            self.logger.error("Error al cambiar contraseña: %s", e)
             return False
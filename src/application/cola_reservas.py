@@ -0,0 +1,131 @@
+"""
+Cola de espera por item para las reservas.
+
+Cuando se devuelve un item con reservas activas, el ejemplar se aparta para
+la primera reserva de su cola en lugar de volver a quedar disponible. Cada
+item tiene un min-heap en memoria ordenado por (prioridad, fecha de reserva,
+id): con la prioridad docente habilitada los docentes pasan primero y, dentro
+de cada prioridad, se respeta el orden de llegada. Las colas se cargan de la
+base con una sola consulta al crear la cola; desde ahí encolar y elegir al
+siguiente cuestan O(log n) sin recorrer `reservas`.
+
+El heap es un caché de la base, no la fuente de verdad: con varios procesos de
+mostrador, una reserva creada en otro no llega a este. Si un item devuelto no
+tiene entradas en memoria (o ninguna seguía en espera), su cola se vuelve a
+leer de la base por el índice (item_id, activa, fecha_reserva) antes de darlo
+por libre.
+
+Una reserva cancelada o expirada no se busca dentro del heap: la asignación es
+un UPDATE condicional que no afecta filas si la reserva ya no está en espera,
+y en ese caso se descarta y se prueba con la siguiente.
+"""
+
+import heapq
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ..domain.entities import Reserva, TipoUsuario
+from .interfaces import IReservaRepository
+
+PRIORIDAD_DOCENTE = 0
+PRIORIDAD_GENERAL = 1
+
+
+class ColaReservas:
+    def __init__(self, reserva_repo: IReservaRepository, prioridad_docente: bool = True):
+        self.reserva_repo = reserva_repo
+        self.prioridad_docente = prioridad_docente
+        self._colas: Dict[int, List[Tuple[int, float, int]]] = {}
+        self._lock = threading.Lock()
+        self.recargar()
+
+    def recargar(self, item_ids: Optional[Iterable[int]] = None) -> None:
+        """
+        Reconstruye las colas desde la base: todas o solo las de `item_ids` (p. ej.
+        tras revertir una transacción que asignó, o para ver lo que encoló otro proceso)
+        """
+        ids = None if item_ids is None else list(dict.fromkeys(item_ids))
+        if ids == []:
+            return
+        colas: Dict[int, List[Tuple[int, float, int]]] = {}
+        for reserva in self.reserva_repo.listar_en_espera(ids):
+            entrada = self._entrada(reserva.id, reserva.tipo_usuario, reserva.fecha_reserva)
+            colas.setdefault(reserva.item_id, []).append(entrada)
+        for cola in colas.values():
+            heapq.heapify(cola)
+        with self._lock:
+            if ids is None:
+                self._colas = colas
+                return
+            for item_id in ids:
+                if item_id in colas:
+                    self._colas[item_id] = colas[item_id]
+                else:
+                    self._colas.pop(item_id, None)
+
+    def _entrada(
+        self, reserva_id: int, tipo_usuario: TipoUsuario, fecha_reserva: Optional[datetime]
+    ) -> Tuple[int, float, int]:
+        docente = self.prioridad_docente and tipo_usuario == TipoUsuario.DOCENTE
+        return (
+            PRIORIDAD_DOCENTE if docente else PRIORIDAD_GENERAL,
+            fecha_reserva.timestamp() if fecha_reserva else 0.0,
+            reserva_id,
+        )
+
+    def encolar(self, reserva: Reserva, tipo_usuario: TipoUsuario) -> None:
+        entrada = self._entrada(reserva.id, tipo_usuario, reserva.fecha_reserva)
+        with self._lock:
+            heapq.heappush(self._colas.setdefault(reserva.item_id, []), entrada)
+
+    def en_espera(self, item_id: int) -> List[int]:
+        """IDs de las reservas en espera del item, en el orden en que se asignarían"""
+        with self._lock:
+            return [reserva_id for _, _, reserva_id in sorted(self._colas.get(item_id, ()))]
+
+    def asignar_siguiente(self, item_id: int, fecha: datetime, plazo_retiro: timedelta) -> Optional[int]:
+        """
+        Asigna el ejemplar devuelto a la primera reserva que siga en espera, con
+        `plazo_retiro` para retirarlo, y devuelve su ID (None si no hay ninguna)
+        """
+        return self.asignar_siguientes([item_id], fecha, plazo_retiro).get(item_id)
+
+    def asignar_siguientes(self, item_ids: Iterable[int], fecha: datetime, plazo_retiro: timedelta) -> Dict[int, int]:
+        """
+        asignar_siguiente para un lote. Los items que la memoria no resuelve se releen
+        de la base en una sola consulta y se prueban otra vez. Devuelve item -> reserva
+        """
+        pendientes = list(dict.fromkeys(item_ids))
+        asignadas = self._asignar_desde_memoria(pendientes, fecha, plazo_retiro)
+        sin_asignar = [item_id for item_id in pendientes if item_id not in asignadas]
+        if sin_asignar:
+            self.recargar(sin_asignar)
+            asignadas.update(self._asignar_desde_memoria(sin_asignar, fecha, plazo_retiro))
+        return asignadas
+
+    def _asignar_desde_memoria(self, item_ids: List[int], fecha: datetime, plazo_retiro: timedelta) -> Dict[int, int]:
+        asignadas = {}
+        for item_id in item_ids:
+            reserva_id = self._asignar_de_cola(item_id, fecha, plazo_retiro)
+            if reserva_id is not None:
+                asignadas[item_id] = reserva_id
+        return asignadas
+
+    def _asignar_de_cola(self, item_id: int, fecha: datetime, plazo_retiro: timedelta) -> Optional[int]:
+        while True:
+            with self._lock:
+                cola = self._colas.get(item_id)
+                if not cola:
+                    self._colas.pop(item_id, None)
+                    return None
+                entrada = heapq.heappop(cola)
+            # El UPDATE corre fuera del lock: las demás colas no esperan a la base
+            try:
+                asignada = self.reserva_repo.asignar_si_en_espera(entrada[2], fecha, fecha + plazo_retiro)
+            except Exception:
+                with self._lock:
+                    heapq.heappush(self._colas.setdefault(item_id, []), entrada)
+                raise
+            if asignada:
+                return entrada[2]
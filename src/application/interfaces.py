@@ -4,7 +4,8 @@ Following the Dependency Inversion Principle - high-level modules depend on abst
 """
 
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from datetime import datetime
+from typing import ContextManager, Dict, Iterable, List, Optional, Sequence
 
 from ..domain.entities import (
     CategoriaItem,
@@ -17,6 +18,16 @@ from ..domain.entities import (
     TipoUsuario,
     Usuario,
 )
+from .read_models import (
+    EntradaAuditoria,
+    MultaDetalle,
+    PrestamoDetalle,
+    ReservaDetalle,
+    ReservaEnEspera,
+    ResumenCuenta,
+    ResumenDevengo,
+    ResumenPagoMultas,
+)
 
 
 class IUsuarioRepository(ABC):
@@ -32,6 +43,11 @@ class IUsuarioRepository(ABC):
         """Get user by ID"""
         pass
 
+    @abstractmethod
+    def obtener_por_ids(self, ids: Iterable[int]) -> Dict[int, Usuario]:
+        """Get users by a batch of IDs, keyed by ID (missing IDs are omitted)"""
+        pass
+
     @abstractmethod
     def obtener_por_email(self, email: str) -> Optional[Usuario]:
         """Get user by email address"""
@@ -62,6 +78,11 @@ class IUsuarioRepository(ABC):
         """Search users by name (partial match)"""
         pass
 
+    @abstractmethod
+    def resumen_cuenta(self, usuario_id: int, ahora: datetime) -> Optional[ResumenCuenta]:
+        """Loan, reservation and fine counters of a user in a single query (None if the user does not exist)"""
+        pass
+
 
 class IItemBibliotecaRepository(ABC):
     """Interface for ItemBiblioteca data access operations"""
@@ -76,6 +97,11 @@ class IItemBibliotecaRepository(ABC):
         """Get item by ID"""
         pass
 
+    @abstractmethod
+    def obtener_por_ids(self, ids: Iterable[int]) -> Dict[int, ItemBiblioteca]:
+        """Get items by a batch of IDs, keyed by ID (missing IDs are omitted)"""
+        pass
+
     @abstractmethod
     def listar_todos(self) -> List[ItemBiblioteca]:
         """Get all library items"""
@@ -111,6 +137,46 @@ class IItemBibliotecaRepository(ABC):
         """Update existing item"""
         pass
 
+    @abstractmethod
+    def reservar_si_disponible(self, item_id: int) -> bool:
+        """Atomically mark the item as lent if it is available; False if it was not (or does not exist)"""
+        pass
+
+    @abstractmethod
+    def reservar_si_disponibles(self, item_ids: Iterable[int]) -> int:
+        """Set-based reservar_si_disponible for a batch of items; returns how many were marked as lent"""
+        pass
+
+    @abstractmethod
+    def liberar_si_prestado(self, item_id: int) -> bool:
+        """Atomically mark the item as available if it is lent; False if it was not (or does not exist)"""
+        pass
+
+    @abstractmethod
+    def liberar_si_prestados(self, item_ids: Iterable[int]) -> int:
+        """Set-based liberar_si_prestado for a batch of items; returns how many were released"""
+        pass
+
+    @abstractmethod
+    def apartar_si_prestado(self, item_id: int) -> bool:
+        """Atomically move a loaned item to reserved for the next holder; False if it was not loaned"""
+        pass
+
+    @abstractmethod
+    def apartar_si_prestados(self, item_ids: Iterable[int]) -> int:
+        """Atomically move every loaned item of the batch to reserved; return how many were changed"""
+        pass
+
+    @abstractmethod
+    def liberar_si_reservado(self, item_id: int) -> bool:
+        """Atomically make a reserved item available again; False if it was not reserved"""
+        pass
+
+    @abstractmethod
+    def prestar_si_reservado(self, item_id: int) -> bool:
+        """Atomically move a reserved item to loaned (pickup of a held copy); False if it was not reserved"""
+        pass
+
     @abstractmethod
     def eliminar(self, id: int) -> bool:
         """Delete item by ID"""
@@ -125,11 +191,21 @@ class IPrestamoRepository(ABC):
         """Create a new loan"""
         pass
 
+    @abstractmethod
+    def crear_muchos(self, prestamos: List[Prestamo]) -> int:
+        """Create a batch of loans in a single statement (IDs are not assigned back)"""
+        pass
+
     @abstractmethod
     def obtener_por_id(self, id: int) -> Optional[Prestamo]:
         """Get loan by ID"""
         pass
 
+    @abstractmethod
+    def obtener_por_ids(self, ids: Iterable[int]) -> Dict[int, Prestamo]:
+        """Get loans by a batch of IDs, keyed by ID (missing IDs are omitted)"""
+        pass
+
     @abstractmethod
     def listar_todos(self) -> List[Prestamo]:
         """Get all loans"""
@@ -140,11 +216,21 @@ class IPrestamoRepository(ABC):
         """Get all active (not returned) loans"""
         pass
 
+    @abstractmethod
+    def listar_activos_detalle(self) -> List[PrestamoDetalle]:
+        """Get active loans joined with user, item and employee, ordered by due date"""
+        pass
+
     @abstractmethod
     def listar_por_usuario(self, usuario_id: int) -> List[Prestamo]:
         """Get all loans for a specific user"""
         pass
 
+    @abstractmethod
+    def contar_activos_por_usuario(self, usuario_id: int) -> int:
+        """Count the user's active loans"""
+        pass
+
     @abstractmethod
     def listar_por_item(self, item_id: int) -> List[Prestamo]:
         """Get loan history for a specific item"""
@@ -155,6 +241,16 @@ class IPrestamoRepository(ABC):
         """Get all overdue loans"""
         pass
 
+    @abstractmethod
+    def listar_activos_por_items(self, item_ids: Iterable[int]) -> List[Prestamo]:
+        """Get the active loans of a batch of items"""
+        pass
+
+    @abstractmethod
+    def marcar_devueltos(self, ids: Iterable[int], fecha: datetime, observaciones: Optional[str] = None) -> int:
+        """Set-based return of a batch of active loans; returns how many were updated"""
+        pass
+
     @abstractmethod
     def actualizar(self, prestamo: Prestamo) -> Prestamo:
         """Update existing loan"""
@@ -179,6 +275,11 @@ class IReservaRepository(ABC):
         """Get reservation by ID"""
         pass
 
+    @abstractmethod
+    def obtener_por_ids(self, ids: Iterable[int]) -> Dict[int, Reserva]:
+        """Get reservations by a batch of IDs, keyed by ID (missing IDs are omitted)"""
+        pass
+
     @abstractmethod
     def listar_todas(self) -> List[Reserva]:
         """Get all reservations"""
@@ -189,11 +290,21 @@ class IReservaRepository(ABC):
         """Get all active reservations"""
         pass
 
+    @abstractmethod
+    def listar_activas_detalle(self) -> List[ReservaDetalle]:
+        """Get active reservations joined with user, item and employee, ordered by expiration"""
+        pass
+
     @abstractmethod
     def listar_por_usuario(self, usuario_id: int) -> List[Reserva]:
         """Get reservations for a specific user"""
         pass
 
+    @abstractmethod
+    def contar_activas_por_usuario(self, usuario_id: int) -> int:
+        """Count the user's active reservations"""
+        pass
+
     @abstractmethod
     def listar_por_item(self, item_id: int) -> List[Reserva]:
         """Get reservations for a specific item"""
@@ -204,6 +315,26 @@ class IReservaRepository(ABC):
         """Get all expired reservations"""
         pass
 
+    @abstractmethod
+    def desactivar_expiradas(self, corte: datetime, limite: int) -> List[int]:
+        """Deactivate up to `limite` active reservations expired before `corte`; return their IDs"""
+        pass
+
+    @abstractmethod
+    def listar_en_espera(self, item_ids: Optional[Iterable[int]] = None) -> List[ReservaEnEspera]:
+        """Get active reservations not yet assigned a returned copy (all items or only `item_ids`), with the user type, in arrival order"""
+        pass
+
+    @abstractmethod
+    def cerrar_si_vigente(self, id: int, fecha: datetime) -> bool:
+        """Deactivate the reservation only if it is still active and not expired at `fecha`"""
+        pass
+
+    @abstractmethod
+    def asignar_si_en_espera(self, id: int, fecha_asignacion: datetime, fecha_expiracion: datetime) -> bool:
+        """Assign a returned copy to the reservation if it is still active, unassigned and unexpired"""
+        pass
+
     @abstractmethod
     def actualizar(self, reserva: Reserva) -> Reserva:
         """Update existing reservation"""
@@ -223,11 +354,21 @@ class IMultaRepository(ABC):
         """Create a new fine"""
         pass
 
+    @abstractmethod
+    def crear_muchas(self, multas: List[Multa]) -> int:
+        """Create a batch of fines in a single statement (IDs are not assigned back)"""
+        pass
+
     @abstractmethod
     def obtener_por_id(self, id: int) -> Optional[Multa]:
         """Get fine by ID"""
         pass
 
+    @abstractmethod
+    def obtener_por_ids(self, ids: Iterable[int]) -> Dict[int, Multa]:
+        """Get fines by a batch of IDs, keyed by ID (missing IDs are omitted)"""
+        pass
+
     @abstractmethod
     def listar_todas(self) -> List[Multa]:
         """Get all fines"""
@@ -243,11 +384,36 @@ class IMultaRepository(ABC):
         """Get all unpaid fines"""
         pass
 
+    @abstractmethod
+    def listar_pendientes_detalle(self) -> List[MultaDetalle]:
+        """Get unpaid fines joined with user, loaned item and employee, oldest first"""
+        pass
+
     @abstractmethod
     def listar_pagadas(self) -> List[Multa]:
         """Get all paid fines"""
         pass
 
+    @abstractmethod
+    def devengar_atrasos(self, corte: datetime, monto_por_dia: float) -> ResumenDevengo:
+        """Recompute the accrued fine of every overdue active loan as of `corte` (idempotent for the same `corte`)"""
+        pass
+
+    @abstractmethod
+    def total_devengado_usuario(self, usuario_id: int) -> float:
+        """Accrued (not yet charged) fines of the user's overdue active loans"""
+        pass
+
+    @abstractmethod
+    def saldo_pendiente(self, usuario_id: int) -> float:
+        """Total of the user's unpaid fines, read from the per-user balance ledger"""
+        pass
+
+    @abstractmethod
+    def pagar_pendientes_usuario(self, usuario_id: int, hasta_monto: Optional[float] = None) -> ResumenPagoMultas:
+        """Mark the user's unpaid fines as paid, oldest first, without exceeding `hasta_monto` (all if None)"""
+        pass
+
     @abstractmethod
     def actualizar(self, multa: Multa) -> Multa:
         """Update existing fine"""
@@ -272,6 +438,11 @@ class IEmpleadoRepository(ABC):
         """Get employee by ID"""
         pass
 
+    @abstractmethod
+    def obtener_por_ids(self, ids: Iterable[int]) -> Dict[int, Empleado]:
+        """Get employees by a batch of IDs, keyed by ID (missing IDs are omitted)"""
+        pass
+
     @abstractmethod
     def obtener_por_usuario_sistema(self, usuario_sistema: str) -> Optional[Empleado]:
         """Get employee by system username"""
@@ -296,3 +467,46 @@ class IEmpleadoRepository(ABC):
     def eliminar(self, id: int) -> bool:
         """Delete employee by ID"""
         pass
+
+
+class IUnidadDeTrabajo(ABC):
+    """Interface for grouping repository operations in a single transaction"""
+
+    @abstractmethod
+    def transaccion(self) -> ContextManager[None]:
+        """Commit on normal exit, roll back on exception; a nested block joins the outer transaction"""
+        pass
+
+
+class IEstadoTareasRepository(ABC):
+    """Interface for the persisted run history of scheduled maintenance jobs"""
+
+    @abstractmethod
+    def ultimas_ejecuciones(self) -> Dict[str, datetime]:
+        """Get the start time of the last run of every job that ran at least once, keyed by job name"""
+        pass
+
+    @abstractmethod
+    def registrar_ejecucion(self, nombre: str, inicio: datetime, duracion: float, error: Optional[str] = None) -> None:
+        """Record a finished run (duration in seconds; `error` is None when it succeeded)"""
+        pass
+
+
+class IAuditoriaRepository(ABC):
+    """Interface for the append-only audit trail of entity changes"""
+
+    @abstractmethod
+    def registrar_muchas(self, entradas: Sequence[EntradaAuditoria]) -> int:
+        """Insert a batch of audit entries in a single statement and return how many were written"""
+        pass
+
+    @abstractmethod
+    def listar_por_empleado(
+        self,
+        empleado_id: int,
+        desde: Optional[datetime] = None,
+        hasta: Optional[datetime] = None,
+        limite: int = 100,
+    ) -> List[EntradaAuditoria]:
+        """Get an employee's entries in [desde, hasta), most recent first, up to `limite`"""
+        pass
@@ -0,0 +1,79 @@
+"""
+Carga por lotes (estilo DataLoader) de entidades referenciadas por ID.
+
+Una pantalla que lista préstamos, reservas o multas necesita el nombre del
+usuario, el título del item y el empleado de cada fila. En lugar de buscar
+cada uno por separado (N+1), la pantalla encola primero todos los IDs que va
+a mostrar y la primera lectura resuelve la cola completa con un solo
+`obtener_por_ids`. Los resultados quedan en caché durante la vida del
+cargador, que se crea por cada acción de consola y se descarta al terminar.
+"""
+
+from typing import Callable, Dict, Generic, Hashable, Iterable, List, Optional, TypeVar
+
+from ..shared.metrics import registrar_acceso_cache
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class DataLoader(Generic[K, V]):
+    """Agrupa las lecturas por clave pendientes en un único lote y cachea el resultado"""
+
+    def __init__(self, nombre: str, cargar_lote: Callable[[List[K]], Dict[K, V]]):
+        self.nombre = nombre
+        self._cargar_lote = cargar_lote
+        self._cache: Dict[K, Optional[V]] = {}
+        self._pendientes: Dict[K, None] = {}
+        self.lotes = 0
+
+    def encolar(self, claves: Iterable[K]) -> None:
+        """Anota claves para la próxima carga, sin consultar todavía"""
+        for clave in claves:
+            if clave is not None and clave not in self._cache:
+                self._pendientes[clave] = None
+
+    def cargar(self, clave: K) -> Optional[V]:
+        """Devuelve la entidad de `clave` (None si no existe), resolviendo la cola si hace falta"""
+        if clave in self._cache:
+            registrar_acceso_cache(self.nombre, True)
+            return self._cache[clave]
+        registrar_acceso_cache(self.nombre, False)
+        self._pendientes[clave] = None
+        self._despachar()
+        return self._cache.get(clave)
+
+    def cargar_muchos(self, claves: Iterable[K]) -> Dict[K, V]:
+        """Devuelve las entidades existentes de `claves` con a lo sumo una consulta"""
+        claves = list(claves)
+        self.encolar(claves)
+        if self._pendientes:
+            self._despachar()
+        resultado: Dict[K, V] = {}
+        for clave in claves:
+            valor = self._cache.get(clave)
+            if valor is not None:
+                resultado[clave] = valor
+        return resultado
+
+    def limpiar(self) -> None:
+        self._cache.clear()
+        self._pendientes.clear()
+
+    def _despachar(self) -> None:
+        claves = list(self._pendientes)
+        self._pendientes.clear()
+        encontrados = self._cargar_lote(claves)
+        self.lotes += 1
+        for clave in claves:
+            # Las claves inexistentes también se cachean para no volver a consultarlas
+            self._cache[clave] = encontrados.get(clave)
+
+
+class Cargadores:
+    """Cargadores de usuarios, items y empleados compartidos por una acción de consola"""
+
+    def __init__(self, usuario_service, item_service, auth_service):
+        self.usuarios = DataLoader("usuarios", usuario_service.obtener_usuarios_por_ids)
+        self.items = DataLoader("items", item_service.obtener_items_por_ids)
+        self.empleados = DataLoader("empleados", auth_service.obtener_empleados_por_ids)
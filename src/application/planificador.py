@@ -0,0 +1,159 @@
+"""
+Planificador de tareas de mantenimiento en segundo plano.
+
+Un hilo despachador guarda los turnos en un min-heap ordenado por próxima
+ejecución y duerme hasta el más cercano (o hasta que se registre una tarea
+nueva o se lo detenga). Cada corrida se lanza en su propio hilo, así una
+tarea lenta no atrasa a las demás; si al llegar su turno la corrida anterior
+de la misma tarea sigue en curso, el turno se saltea y no hay corridas
+superpuestas. A cada turno se le suma un jitter al azar para que las tareas
+con el mismo intervalo no caigan siempre en el mismo instante.
+
+La última ejecución de cada tarea se persiste: al reiniciar la aplicación,
+una tarea diaria que ya corrió hoy espera a mañana en lugar de repetirse.
+"""
+
+import heapq
+import itertools
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..shared.logger import get_logger
+from ..shared.metrics import get_metrics
+from .interfaces import IEstadoTareasRepository
+
+# Las tareas duran de milisegundos (barrido vacío) a minutos (VACUUM de una base grande)
+_BUCKETS_TAREAS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0)
+_duracion_tareas = get_metrics().histogram(
+    "biblioteca_job_seconds", "Duración de tareas programadas", ("tarea",), _BUCKETS_TAREAS
+)
+_corridas_tareas = get_metrics().counter(
+    "biblioteca_job_runs_total", "Corridas de tareas programadas por resultado", ("tarea", "resultado")
+)
+
+# Tope de cada espera del despachador: acota el efecto de un cambio de hora del sistema
+ESPERA_MAXIMA = 60.0
+
+
+@dataclass(frozen=True)
+class TareaProgramada:
+    nombre: str
+    intervalo: float  # Segundos entre corridas
+    accion: Callable[[], Any]
+    jitter: float = 0.1  # Fracción del intervalo que se suma al azar a cada turno
+
+
+class Planificador:
+    def __init__(
+        self,
+        estado_repo: IEstadoTareasRepository,
+        reloj: Callable[[], float] = time.time,
+        azar: Optional[random.Random] = None,
+    ):
+        self.estado_repo = estado_repo
+        self.logger = get_logger()
+        self._reloj = reloj
+        self._azar = azar or random.Random()  # nosec B311 - jitter de calendario, no criptografía
+        self._ultimas = {nombre: fecha.timestamp() for nombre, fecha in estado_repo.ultimas_ejecuciones().items()}
+        self._tareas: Dict[str, TareaProgramada] = {}
+        self._turnos: List[Tuple[float, int, str]] = []
+        self._secuencia = itertools.count()
+        self._en_curso: Dict[str, threading.Thread] = {}
+        self._lock = threading.Lock()
+        self._despertar = threading.Event()
+        self._detenido = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def registrar(self, tarea: TareaProgramada) -> None:
+        """Agrega una tarea; su primer turno parte de la última ejecución persistida (o de ahora)"""
+        if tarea.intervalo <= 0:
+            raise ValueError("El intervalo de una tarea debe ser mayor a cero")
+        with self._lock:
+            if tarea.nombre in self._tareas:
+                raise ValueError(f"Ya existe una tarea llamada '{tarea.nombre}'")
+            self._tareas[tarea.nombre] = tarea
+            ultima = self._ultimas.get(tarea.nombre)
+            self._programar(tarea, ultima + tarea.intervalo if ultima is not None else self._reloj())
+        self._despertar.set()
+
+    def _programar(self, tarea: TareaProgramada, desde: float) -> None:
+        proximo = max(desde, self._reloj()) + self._azar.uniform(0, tarea.jitter * tarea.intervalo)
+        heapq.heappush(self._turnos, (proximo, next(self._secuencia), tarea.nombre))
+
+    def proximas_ejecuciones(self) -> Dict[str, datetime]:
+        with self._lock:
+            return {nombre: datetime.fromtimestamp(proximo) for proximo, _, nombre in sorted(self._turnos)}
+
+    def ejecutar_pendientes(self) -> List[threading.Thread]:
+        """Lanza las tareas cuyo turno venció y las reprograma; devuelve los hilos lanzados"""
+        lanzadas = []
+        with self._lock:
+            ahora = self._reloj()
+            while self._turnos and self._turnos[0][0] <= ahora:
+                _, _, nombre = heapq.heappop(self._turnos)
+                tarea = self._tareas[nombre]
+                self._programar(tarea, ahora + tarea.intervalo)
+                if nombre in self._en_curso:
+                    _corridas_tareas.labels(nombre, "omitida").inc()
+                    self.logger.warning("Tarea '%s' omitida: la corrida anterior sigue en curso", nombre)
+                    continue
+                hilo = threading.Thread(target=self._correr, args=(tarea,), name=f"tarea-{nombre}", daemon=True)
+                self._en_curso[nombre] = hilo
+                lanzadas.append(hilo)
+        for hilo in lanzadas:
+            hilo.start()
+        return lanzadas
+
+    def _correr(self, tarea: TareaProgramada) -> None:
+        inicio = self._reloj()
+        cronometro = time.perf_counter()
+        error = None
+        try:
+            tarea.accion()
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            self.logger.error("Tarea '%s' falló: %s", tarea.nombre, e)
+        duracion = time.perf_counter() - cronometro
+        _duracion_tareas.labels(tarea.nombre).observe(duracion)
+        _corridas_tareas.labels(tarea.nombre, "error" if error else "ok").inc()
+        try:
+            self.estado_repo.registrar_ejecucion(tarea.nombre, datetime.fromtimestamp(inicio), duracion, error)
+        except Exception as e:
+            self.logger.error("No se pudo registrar la ejecución de la tarea '%s': %s", tarea.nombre, e)
+        finally:
+            with self._lock:
+                self._en_curso.pop(tarea.nombre, None)
+
+    def iniciar(self) -> None:
+        if self._hilo and self._hilo.is_alive():
+            return
+        self._detenido.clear()
+        self._hilo = threading.Thread(target=self._bucle, name="planificador", daemon=True)
+        self._hilo.start()
+
+    def detener(self, timeout: float = 5.0) -> None:
+        """Detiene el despachador y espera hasta `timeout` segundos a las corridas en curso"""
+        self._detenido.set()
+        self._despertar.set()
+        if self._hilo:
+            self._hilo.join(timeout)
+        with self._lock:
+            en_curso = list(self._en_curso.values())
+        for hilo in en_curso:
+            hilo.join(timeout)
+
+    def _bucle(self) -> None:
+        while not self._detenido.is_set():
+            self._despertar.clear()
+            self.ejecutar_pendientes()
+            self._despertar.wait(self._espera())
+
+    def _espera(self) -> float:
+        with self._lock:
+            if not self._turnos:
+                return ESPERA_MAXIMA
+            return min(max(self._turnos[0][0] - self._reloj(), 0.0), ESPERA_MAXIMA)
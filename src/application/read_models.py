@@ -0,0 +1,155 @@
+"""
+Modelos de lectura (DTOs planos) para reportes y listados.
+
+Se obtienen con una sola consulta que une la tabla principal con usuarios,
+items y empleados, de modo que una pantalla puede mostrar nombres y títulos
+sin una lectura adicional por fila. Son de solo lectura: para modificar una
+entidad se usa su repositorio.
+
+También se definen acá los resúmenes que devuelven las operaciones por lote.
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..domain.entities import TipoUsuario
+
+
+@dataclass(frozen=True)
+class PrestamoDetalle:
+    id: int
+    usuario_id: int
+    usuario_nombre: Optional[str]
+    usuario_email: Optional[str]
+    item_id: int
+    item_titulo: Optional[str]
+    item_autor: Optional[str]
+    empleado_id: int
+    empleado_nombre: Optional[str]
+    fecha_prestamo: Optional[datetime]
+    fecha_devolucion_esperada: Optional[datetime]
+
+    def dias_restantes(self, ahora: Optional[datetime] = None) -> Optional[int]:
+        if not self.fecha_devolucion_esperada:
+            return None
+        return (self.fecha_devolucion_esperada - (ahora or datetime.now())).days
+
+
+@dataclass(frozen=True)
+class ReservaDetalle:
+    id: int
+    usuario_id: int
+    usuario_nombre: Optional[str]
+    item_id: int
+    item_titulo: Optional[str]
+    empleado_id: int
+    empleado_nombre: Optional[str]
+    fecha_reserva: Optional[datetime]
+    fecha_expiracion: Optional[datetime]
+
+
+@dataclass(frozen=True)
+class ReservaEnEspera:
+    """Reserva activa todavía sin ejemplar asignado, con el tipo de usuario para priorizarla"""
+
+    id: int
+    item_id: int
+    usuario_id: int
+    tipo_usuario: TipoUsuario
+    fecha_reserva: Optional[datetime]
+
+
+@dataclass(frozen=True)
+class ResumenCuenta:
+    """Estado de cuenta de un usuario para decidir un préstamo en el mostrador (`UsuarioService.resumen_cuenta`)"""
+
+    usuario_id: int
+    nombre: str
+    apellido: str
+    tipo: TipoUsuario
+    activo: bool
+    prestamos_activos: int
+    prestamos_vencidos: int
+    proximo_vencimiento: Optional[datetime]  # El préstamo activo que vence primero
+    reservas_activas: int
+    reservas_para_retirar: int  # Reservas con un ejemplar ya apartado
+    multas_pendientes: int
+    saldo_pendiente: float
+
+
+@dataclass(frozen=True)
+class MultaDetalle:
+    id: int
+    usuario_id: int
+    usuario_nombre: Optional[str]
+    prestamo_id: int
+    item_titulo: Optional[str]
+    empleado_id: int
+    empleado_nombre: Optional[str]
+    monto: float
+    descripcion: str
+    fecha_multa: Optional[datetime]
+
+
+@dataclass(frozen=True)
+class ResultadoDevolucion:
+    """Resultado de un elemento de `PrestamoService.devolver_items`"""
+
+    prestamo_id: Optional[int]
+    item_id: Optional[int]
+    devuelto: bool
+    motivo: Optional[str] = None  # Por qué no se devolvió
+    multa: Optional[float] = None  # Monto de la multa generada por atraso
+    reserva_id: Optional[int] = None  # Reserva a la que se apartó el ejemplar devuelto
+
+
+@dataclass(frozen=True)
+class ResumenDevengo:
+    """Resultado de `MultaService.devengar_multas_por_atraso`"""
+
+    fecha_corte: datetime
+    actualizados: int  # Préstamos cuya multa devengada se creó o cambió en esta corrida
+    eliminados: int  # Devengos de préstamos ya devueltos (o que dejaron de estar vencidos)
+    prestamos_vencidos: int
+    total_devengado: float
+
+
+@dataclass(frozen=True)
+class ResumenPagoMultas:
+    """Resultado de `MultaService.pagar_multas_usuario`"""
+
+    usuario_id: int
+    multa_ids: Tuple[int, ...]  # Multas pagadas, de la más antigua a la más reciente
+    monto_pagado: float
+    saldo_restante: float
+
+    @property
+    def pagadas(self) -> int:
+        return len(self.multa_ids)
+
+
+@dataclass(frozen=True)
+class ResumenExpiracion:
+    """Resultado de `ReservaService.expirar_reservas`"""
+
+    fecha_corte: datetime
+    reserva_ids: Tuple[int, ...]  # Reservas desactivadas en esta corrida
+    lotes: int
+
+    @property
+    def desactivadas(self) -> int:
+        return len(self.reserva_ids)
+
+
+@dataclass(frozen=True)
+class EntradaAuditoria:
+    """Una modificación de una entidad: quién, cuándo, con qué operación y qué campos cambiaron"""
+
+    operacion: str  # Servicio.metodo, como en el log de operaciones
+    entidad: str
+    entidad_id: Optional[int]
+    fecha: datetime
+    empleado_id: Optional[int] = None  # None: tarea del sistema (expiraciones del planificador)
+    cambios: Dict[str, List[Any]] = field(default_factory=dict)  # campo -> [antes, después]
+    id: Optional[int] = None
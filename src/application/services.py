@@ -1,5 +1,6 @@
-from datetime import datetime, timedelta
-from typing import List, Optional
+from contextlib import contextmanager, nullcontext
+from datetime import date, datetime, time, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
 
 from ..domain.entities import (
     CategoriaItem,
@@ -11,18 +12,77 @@ from ..domain.entities import (
     TipoUsuario,
     Usuario,
 )
+from ..shared.exceptions import ItemsNoDisponiblesException
+from ..shared.operation_log import instrumentar_servicio
+from .auditoria import RegistroAuditoria, auditar, instantanea
+from .cola_reservas import ColaReservas
 from .interfaces import (
+    IAuditoriaRepository,
     IItemBibliotecaRepository,
     IMultaRepository,
     IPrestamoRepository,
     IReservaRepository,
+    IUnidadDeTrabajo,
     IUsuarioRepository,
 )
+from .read_models import (
+    EntradaAuditoria,
+    MultaDetalle,
+    PrestamoDetalle,
+    ReservaDetalle,
+    ResultadoDevolucion,
+    ResumenCuenta,
+    ResumenDevengo,
+    ResumenExpiracion,
+    ResumenPagoMultas,
+)
+
+MULTA_POR_DIA_ATRASO = 50.0  # $50 por día de atraso
+LOTE_EXPIRACION_RESERVAS = 500  # Reservas desactivadas por transacción
+DIAS_RETIRO_RESERVA = 3  # Plazo para retirar un ejemplar apartado por reserva
+
+
+def _verificar_limite(maximo: Optional[int], contar: Callable[[], int], nuevos: int, descripcion: str) -> None:
+    """Rechaza la operación si el usuario pasaría de `maximo` (None: sin límite, no se consulta la base)"""
+    if maximo is None:
+        return
+    activos = contar()
+    if activos + nuevos > maximo:
+        if nuevos == 1:
+            raise ValueError(f"El usuario ya tiene {activos} {descripcion} (máximo {maximo})")
+        raise ValueError(f"El usuario tiene {activos} {descripcion}; con {nuevos} más superaría el máximo de {maximo}")
+
+
+@contextmanager
+def _recargar_cola_si_falla(cola_reservas: Optional[ColaReservas]) -> Iterator[None]:
+    """Si la transacción del bloque se revierte, las reservas que ya salieron de la cola en memoria se releen de la base"""
+    try:
+        yield
+    except Exception:
+        if cola_reservas:
+            cola_reservas.recargar()
+        raise
+
+
+def _maximo_prestamos(usuario: Usuario, general: Optional[int], por_tipo: Optional[Dict[TipoUsuario, int]]) -> Optional[int]:
+    """Límite de préstamos simultáneos del usuario: el de su tipo si tiene uno propio, si no el general"""
+    return (por_tipo or {}).get(usuario.tipo, general)
 
 
+def _verificar_habilitado(usuario: Usuario, multa_repo: Optional[IMultaRepository]) -> None:
+    """Un usuario inactivo o con multas impagas no puede llevarse items (sin repositorio de multas, solo se mira `activo`)"""
+    saldo = multa_repo.saldo_pendiente(usuario.id) if multa_repo else 0.0
+    usuario.cargar_saldo_multas(saldo)
+    if not usuario.puede_hacer_prestamo():
+        motivo = f"tiene multas pendientes por ${saldo:.2f}" if usuario.activo else "está inactivo"
+        raise ValueError(f"El usuario {motivo}")
+
+
+@instrumentar_servicio
 class UsuarioService:
-    def __init__(self, usuario_repo: IUsuarioRepository):
+    def __init__(self, usuario_repo: IUsuarioRepository, auditoria: Optional[RegistroAuditoria] = None):
         self.usuario_repo = usuario_repo
+        self.auditoria = auditoria
 
     def registrar_usuario(
         self,
@@ -46,7 +106,9 @@ class UsuarioService:
             fecha_registro=datetime.now(),
         )
 
-        return self.usuario_repo.crear(usuario)
+        usuario = self.usuario_repo.crear(usuario)
+        auditar(self.auditoria, "UsuarioService.registrar_usuario", usuario)
+        return usuario
 
     def buscar_usuario_por_email(self, email: str) -> Optional[Usuario]:
         return self.usuario_repo.obtener_por_email(email)
@@ -54,13 +116,29 @@ class UsuarioService:
     def listar_usuarios(self) -> List[Usuario]:
         return self.usuario_repo.listar_todos()
 
+    def obtener_usuarios_por_ids(self, ids: Iterable[int]) -> Dict[int, Usuario]:
+        return self.usuario_repo.obtener_por_ids(ids)
+
     def actualizar_usuario(self, usuario: Usuario) -> Usuario:
-        return self.usuario_repo.actualizar(usuario)
+        # El estado previo solo se lee si hay auditoría que lo necesite para el diff
+        previo = self.usuario_repo.obtener_por_id(usuario.id) if self.auditoria else None
+        usuario = self.usuario_repo.actualizar(usuario)
+        auditar(self.auditoria, "UsuarioService.actualizar_usuario", usuario, instantanea(previo) if previo else None)
+        return usuario
+
+    def resumen_cuenta(self, usuario_id: int) -> ResumenCuenta:
+        """Préstamos, reservas y multas del usuario en una sola consulta, para decidir en el mostrador"""
+        resumen = self.usuario_repo.resumen_cuenta(usuario_id, datetime.now())
+        if not resumen:
+            raise ValueError(f"No se encontró el usuario con ID: {usuario_id}")
+        return resumen
 
 
+@instrumentar_servicio
 class ItemBibliotecaService:
-    def __init__(self, item_repo: IItemBibliotecaRepository):
+    def __init__(self, item_repo: IItemBibliotecaRepository, auditoria: Optional[RegistroAuditoria] = None):
         self.item_repo = item_repo
+        self.auditoria = auditoria
 
     def agregar_item(
         self,
@@ -88,7 +166,9 @@ class ItemBibliotecaService:
             valor_reposicion=valor_reposicion,
         )
 
-        return self.item_repo.crear(item)
+        item = self.item_repo.crear(item)
+        auditar(self.auditoria, "ItemBibliotecaService.agregar_item", item)
+        return item
 
     def buscar_por_titulo(self, titulo: str) -> List[ItemBiblioteca]:
         return self.item_repo.buscar_por_titulo(titulo)
@@ -100,6 +180,9 @@ class ItemBibliotecaService:
         categoria_enum = CategoriaItem(categoria) if isinstance(categoria, str) else categoria
         return self.item_repo.listar_por_categoria(categoria_enum)
 
+    def obtener_items_por_ids(self, ids: Iterable[int]) -> Dict[int, ItemBiblioteca]:
+        return self.item_repo.obtener_por_ids(ids)
+
     def listar_disponibles(self) -> List[ItemBiblioteca]:
         items = self.item_repo.listar_todos()
         return [item for item in items if item.estado == EstadoItem.DISPONIBLE]
@@ -109,10 +192,14 @@ class ItemBibliotecaService:
         if not item:
             raise ValueError(f"No se encontró el item con ID: {item_id}")
 
+        antes = instantanea(item)
         item.estado = nuevo_estado
-        return self.item_repo.actualizar(item)
+        item = self.item_repo.actualizar(item)
+        auditar(self.auditoria, "ItemBibliotecaService.cambiar_estado_item", item, antes)
+        return item
 
 
+@instrumentar_servicio
 class PrestamoService:
     def __init__(
         self,
@@ -120,129 +207,456 @@ class PrestamoService:
         item_repo: IItemBibliotecaRepository,
         usuario_repo: IUsuarioRepository,
         multa_repo: IMultaRepository,
+        unidad_trabajo: Optional[IUnidadDeTrabajo] = None,
+        cola_reservas: Optional[ColaReservas] = None,
+        max_prestamos_simultaneos: Optional[int] = None,
+        auditoria: Optional[RegistroAuditoria] = None,
+        max_prestamos_por_tipo: Optional[Dict[TipoUsuario, int]] = None,
     ):
         self.prestamo_repo = prestamo_repo
         self.item_repo = item_repo
         self.usuario_repo = usuario_repo
         self.multa_repo = multa_repo
+        # Sin unidad de trabajo cada operación del repositorio confirma por separado
+        self._transaccion = unidad_trabajo.transaccion if unidad_trabajo else nullcontext
+        # Sin cola de reservas los items devueltos siempre vuelven a estar disponibles
+        self.cola_reservas = cola_reservas
+        self.max_prestamos_simultaneos = max_prestamos_simultaneos
+        self.max_prestamos_por_tipo = max_prestamos_por_tipo
+        self.auditoria = auditoria
 
     def realizar_prestamo(self, usuario_id: int, item_id: int, empleado_id: int, dias_prestamo: int = 15) -> Prestamo:
-        usuario = self.usuario_repo.obtener_por_id(usuario_id)
-        if not usuario:
-            raise ValueError(f"No se encontró el usuario con ID: {usuario_id}")
-
-        item = self.item_repo.obtener_por_id(item_id)
-        if not item:
-            raise ValueError(f"No se encontró el item con ID: {item_id}")
+        # La transacción serializa el conteo de préstamos activos con el alta: dos mostradores no pasan juntos el límite
+        with self._transaccion():
+            usuario = self.usuario_repo.obtener_por_id(usuario_id)
+            if not usuario:
+                raise ValueError(f"No se encontró el usuario con ID: {usuario_id}")
+            _verificar_habilitado(usuario, self.multa_repo)
+            self._verificar_limite_prestamos(usuario)
+
+            # El UPDATE condicional toma el item sin leerlo antes; si otro mostrador ganó, no afecta filas
+            if not self.item_repo.reservar_si_disponible(item_id):
+                item = self.item_repo.obtener_por_id(item_id)
+                if not item:
+                    raise ValueError(f"No se encontró el item con ID: {item_id}")
+                raise ValueError(f"El item '{item.titulo}' no está disponible")
+
+            fecha_devolucion = datetime.now() + timedelta(days=dias_prestamo)
+
+            prestamo = Prestamo(
+                usuario_id=usuario_id,
+                item_id=item_id,
+                empleado_id=empleado_id,
+                fecha_prestamo=datetime.now(),
+                fecha_devolucion_esperada=fecha_devolucion,
+            )
 
-        if item.estado != EstadoItem.DISPONIBLE:
-            raise ValueError(f"El item '{item.titulo}' no está disponible")
+            try:
+                prestamo = self.prestamo_repo.crear(prestamo)
+            except Exception:
+                self.item_repo.liberar_si_prestado(item_id)
+                raise
 
-        fecha_devolucion = datetime.now() + timedelta(days=dias_prestamo)
+        auditar(self.auditoria, "PrestamoService.realizar_prestamo", prestamo, empleado_id=empleado_id)
+        return prestamo
 
-        prestamo = Prestamo(
-            usuario_id=usuario_id,
-            item_id=item_id,
-            empleado_id=empleado_id,
-            fecha_prestamo=datetime.now(),
-            fecha_devolucion_esperada=fecha_devolucion,
+    def _verificar_limite_prestamos(self, usuario: Usuario, nuevos: int = 1) -> None:
+        _verificar_limite(
+            _maximo_prestamos(usuario, self.max_prestamos_simultaneos, self.max_prestamos_por_tipo),
+            lambda: self.prestamo_repo.contar_activos_por_usuario(usuario.id),
+            nuevos,
+            "préstamos activos",
         )
 
-        prestamo = self.prestamo_repo.crear(prestamo)
-
-        item.estado = EstadoItem.PRESTADO
-        self.item_repo.actualizar(item)
+    def realizar_prestamos(
+        self, usuario_id: int, item_ids: Iterable[int], empleado_id: int, dias_prestamo: int = 15
+    ) -> List[Prestamo]:
+        """
+        Préstamo de varios items a un usuario en una transacción: valida el usuario
+        una vez, toma todos los items con un UPDATE condicional y da de alta los
+        préstamos con un solo INSERT. Si algún item no se puede prestar no se presta
+        ninguno y ItemsNoDisponiblesException indica cuáles y por qué.
+        """
+        claves = list(dict.fromkeys(item_ids))
+        if not claves:
+            raise ValueError("Debe indicar al menos un item")
+
+        with self._transaccion():
+            usuario = self.usuario_repo.obtener_por_id(usuario_id)
+            if not usuario:
+                raise ValueError(f"No se encontró el usuario con ID: {usuario_id}")
+            _verificar_habilitado(usuario, self.multa_repo)
+            self._verificar_limite_prestamos(usuario, len(claves))
+
+            # Dentro de la transacción (con el lock de escritura tomado) lo leído no cambia hasta el COMMIT
+            items = self.item_repo.obtener_por_ids(claves)
+            fallidos = {}
+            for item_id in claves:
+                item = items.get(item_id)
+                if not item:
+                    fallidos[item_id] = "No se encontró el item"
+                elif item.estado != EstadoItem.DISPONIBLE:
+                    fallidos[item_id] = f"'{item.titulo}' no está disponible ({item.estado.value})"
+            if fallidos:
+                raise ItemsNoDisponiblesException(fallidos)
+
+            if self.item_repo.reservar_si_disponibles(claves) != len(claves):
+                # Solo posible sin unidad de trabajo: otro mostrador tomó alguno entre la lectura y el UPDATE
+                raise ValueError("Otro préstamo tomó alguno de los items durante la operación; intente nuevamente")
+
+            ahora = datetime.now()
+            self.prestamo_repo.crear_muchos(
+                [
+                    Prestamo(
+                        usuario_id=usuario_id,
+                        item_id=item_id,
+                        empleado_id=empleado_id,
+                        fecha_prestamo=ahora,
+                        fecha_devolucion_esperada=ahora + timedelta(days=dias_prestamo),
+                    )
+                    for item_id in claves
+                ]
+            )
+            creados = {p.item_id: p for p in self.prestamo_repo.listar_activos_por_items(claves)}
 
-        return prestamo
+        prestamos = [creados[item_id] for item_id in claves]
+        for prestamo in prestamos:
+            auditar(self.auditoria, "PrestamoService.realizar_prestamos", prestamo, empleado_id=empleado_id)
+        return prestamos
 
     def devolver_item(self, prestamo_id: int, observaciones: Optional[str] = None) -> Prestamo:
-        prestamo = self.prestamo_repo.obtener_por_id(prestamo_id)
-        if not prestamo:
-            raise ValueError(f"No se encontró el préstamo con ID: {prestamo_id}")
-
-        if not prestamo.activo:
-            raise ValueError("Este préstamo ya fue devuelto")
-
-        prestamo.fecha_devolucion_real = datetime.now()
-        prestamo.observaciones = observaciones
-        prestamo.activo = False
-
-        item = self.item_repo.obtener_por_id(prestamo.item_id)
-        if item:
-            item.estado = EstadoItem.DISPONIBLE
-            self.item_repo.actualizar(item)
-
-        if prestamo.fecha_devolucion_real > prestamo.fecha_devolucion_esperada:
-            dias_atraso = (prestamo.fecha_devolucion_real - prestamo.fecha_devolucion_esperada).days
-            monto_multa = dias_atraso * 50.0  # $50 por día de atraso
-
-            multa = Multa(
-                usuario_id=prestamo.usuario_id,
-                prestamo_id=prestamo.id,
-                empleado_id=prestamo.empleado_id,  # El mismo empleado que procesó el préstamo
-                monto=monto_multa,
-                descripcion=f"Devolución tardía: {dias_atraso} días de atraso",
-                fecha_multa=datetime.now(),
-            )
-            self.multa_repo.crear(multa)
+        # Una transacción: si guardar el préstamo da conflicto (otro mostrador lo devolvió) no quedan la multa,
+        # el cambio de estado del item ni la reserva asignada
+        with _recargar_cola_si_falla(self.cola_reservas), self._transaccion():
+            prestamo = self.prestamo_repo.obtener_por_id(prestamo_id)
+            if not prestamo:
+                raise ValueError(f"No se encontró el préstamo con ID: {prestamo_id}")
+
+            if not prestamo.activo:
+                raise ValueError("Este préstamo ya fue devuelto")
+
+            antes = instantanea(prestamo)
+            prestamo.fecha_devolucion_real = datetime.now()
+            prestamo.observaciones = observaciones
+            prestamo.activo = False
+
+            item = self.item_repo.obtener_por_id(prestamo.item_id)
+            if item:
+                apartados = self._apartar_para_reservas([item.id], prestamo.fecha_devolucion_real)
+                item.estado = EstadoItem.RESERVADO if apartados else EstadoItem.DISPONIBLE
+                self.item_repo.actualizar(item)
+
+            multa = self._multa_por_atraso(prestamo, prestamo.fecha_devolucion_real)
+            if multa:
+                multa = self.multa_repo.crear(multa)
+
+            prestamo = self.prestamo_repo.actualizar(prestamo)
+
+        if multa:
+            auditar(self.auditoria, "PrestamoService.devolver_item", multa)
+        auditar(self.auditoria, "PrestamoService.devolver_item", prestamo, antes)
+        return prestamo
 
-        return self.prestamo_repo.actualizar(prestamo)
+    def devolver_items(
+        self,
+        prestamo_ids: Optional[Iterable[int]] = None,
+        item_ids: Optional[Iterable[int]] = None,
+        observaciones: Optional[str] = None,
+    ) -> List[ResultadoDevolucion]:
+        """
+        Devuelve un lote de préstamos (por ID de préstamo o de item, p. ej. el buzón
+        de devoluciones) en una transacción: una lectura, un UPDATE por tabla y un
+        único INSERT para las multas por atraso. Los items con reservas en espera
+        quedan apartados para la siguiente de su cola. Devuelve un resultado por
+        elemento pedido, en el mismo orden.
+        """
+        if (prestamo_ids is None) == (item_ids is None):
+            raise ValueError("Debe indicar los IDs de préstamo o los IDs de item a devolver")
+        por_prestamo = prestamo_ids is not None
+
+        ahora = datetime.now()
+        with _recargar_cola_si_falla(self.cola_reservas):
+            return self._devolver_lote(por_prestamo, prestamo_ids if por_prestamo else item_ids, observaciones, ahora)
+
+    def _devolver_lote(
+        self, por_prestamo: bool, ids: Iterable[int], observaciones: Optional[str], ahora: datetime
+    ) -> List[ResultadoDevolucion]:
+        with self._transaccion():
+            claves = list(dict.fromkeys(ids))
+            if por_prestamo:
+                encontrados = self.prestamo_repo.obtener_por_ids(claves)
+            else:
+                encontrados = {p.item_id: p for p in self.prestamo_repo.listar_activos_por_items(claves)}
+
+            resultados: Dict[int, ResultadoDevolucion] = {}
+            a_devolver: List[Prestamo] = []
+            for clave in claves:
+                prestamo = encontrados.get(clave)
+                if prestamo is None and por_prestamo:
+                    resultados[clave] = ResultadoDevolucion(clave, None, False, "No se encontró el préstamo")
+                elif prestamo is None:
+                    resultados[clave] = ResultadoDevolucion(None, clave, False, "El item no tiene un préstamo activo")
+                elif not prestamo.activo:
+                    motivo = "Este préstamo ya fue devuelto"
+                    resultados[clave] = ResultadoDevolucion(prestamo.id, prestamo.item_id, False, motivo)
+                else:
+                    a_devolver.append(prestamo)
+
+            apartados: Dict[int, int] = {}
+            if a_devolver:
+                self.prestamo_repo.marcar_devueltos([p.id for p in a_devolver], ahora, observaciones)
+                apartados = self._apartar_para_reservas([p.item_id for p in a_devolver], ahora)
+                libres = [p.item_id for p in a_devolver if p.item_id not in apartados]
+                if libres:
+                    self.item_repo.liberar_si_prestados(libres)
+                if apartados:
+                    self.item_repo.apartar_si_prestados(list(apartados))
+
+            multas = []
+            for prestamo in a_devolver:
+                multa = self._multa_por_atraso(prestamo, ahora)
+                if multa:
+                    multas.append(multa)
+                clave = prestamo.id if por_prestamo else prestamo.item_id
+                monto = multa.monto if multa else None
+                reserva_id = apartados.get(prestamo.item_id)
+                resultados[clave] = ResultadoDevolucion(
+                    prestamo.id, prestamo.item_id, True, multa=monto, reserva_id=reserva_id
+                )
+            if multas:
+                self.multa_repo.crear_muchas(multas)
+
+        if self.auditoria:
+            for prestamo in a_devolver:
+                antes = instantanea(prestamo)
+                prestamo.fecha_devolucion_real, prestamo.observaciones, prestamo.activo = ahora, observaciones, False
+                auditar(self.auditoria, "PrestamoService.devolver_items", prestamo, antes)
+            # El INSERT en bloque no devuelve IDs: la multa queda identificada por su prestamo_id en el diff
+            for multa in multas:
+                auditar(self.auditoria, "PrestamoService.devolver_items", multa)
+        return [resultados[clave] for clave in claves]
+
+    def _apartar_para_reservas(self, item_ids: List[int], fecha: datetime) -> Dict[int, int]:
+        """Asigna cada item devuelto al siguiente de su cola de reservas; devuelve item -> reserva"""
+        if not self.cola_reservas:
+            return {}
+        return self.cola_reservas.asignar_siguientes(item_ids, fecha, timedelta(days=DIAS_RETIRO_RESERVA))
+
+    @staticmethod
+    def _multa_por_atraso(prestamo: Prestamo, fecha_devolucion: datetime) -> Optional[Multa]:
+        if fecha_devolucion <= prestamo.fecha_devolucion_esperada:
+            return None
+        dias_atraso = (fecha_devolucion - prestamo.fecha_devolucion_esperada).days
+        return Multa(
+            usuario_id=prestamo.usuario_id,
+            prestamo_id=prestamo.id,
+            empleado_id=prestamo.empleado_id,  # El mismo empleado que procesó el préstamo
+            monto=dias_atraso * MULTA_POR_DIA_ATRASO,
+            descripcion=f"Devolución tardía: {dias_atraso} días de atraso",
+            fecha_multa=datetime.now(),
+        )
 
     def listar_prestamos_activos(self) -> List[Prestamo]:
         return self.prestamo_repo.listar_activos()
 
+    def listar_prestamos_activos_detalle(self) -> List[PrestamoDetalle]:
+        return self.prestamo_repo.listar_activos_detalle()
+
     def listar_prestamos_usuario(self, usuario_id: int) -> List[Prestamo]:
         return self.prestamo_repo.listar_por_usuario(usuario_id)
 
 
+@instrumentar_servicio
 class ReservaService:
     def __init__(
-        self, reserva_repo: IReservaRepository, item_repo: IItemBibliotecaRepository, usuario_repo: IUsuarioRepository
+        self,
+        reserva_repo: IReservaRepository,
+        item_repo: IItemBibliotecaRepository,
+        usuario_repo: IUsuarioRepository,
+        cola_reservas: Optional[ColaReservas] = None,
+        prestamo_repo: Optional[IPrestamoRepository] = None,
+        unidad_trabajo: Optional[IUnidadDeTrabajo] = None,
+        max_reservas_simultaneas: Optional[int] = None,
+        max_prestamos_simultaneos: Optional[int] = None,
+        multa_repo: Optional[IMultaRepository] = None,
+        auditoria: Optional[RegistroAuditoria] = None,
+        max_prestamos_por_tipo: Optional[Dict[TipoUsuario, int]] = None,
     ):
         self.reserva_repo = reserva_repo
         self.item_repo = item_repo
         self.usuario_repo = usuario_repo
+        self.cola_reservas = cola_reservas
+        self.prestamo_repo = prestamo_repo
+        self._transaccion = unidad_trabajo.transaccion if unidad_trabajo else nullcontext
+        self.max_reservas_simultaneas = max_reservas_simultaneas
+        # Retirar una reserva es un préstamo más: respeta el mismo límite y las multas que PrestamoService
+        self.max_prestamos_simultaneos = max_prestamos_simultaneos
+        self.max_prestamos_por_tipo = max_prestamos_por_tipo
+        self.multa_repo = multa_repo
+        self.auditoria = auditoria
 
     def realizar_reserva(self, usuario_id: int, item_id: int, empleado_id: int, dias_expiracion: int = 3) -> Reserva:
-        usuario = self.usuario_repo.obtener_por_id(usuario_id)
-        if not usuario:
-            raise ValueError(f"No se encontró el usuario con ID: {usuario_id}")
+        with self._transaccion():
+            usuario = self.usuario_repo.obtener_por_id(usuario_id)
+            if not usuario:
+                raise ValueError(f"No se encontró el usuario con ID: {usuario_id}")
+            _verificar_limite(
+                self.max_reservas_simultaneas,
+                lambda: self.reserva_repo.contar_activas_por_usuario(usuario_id),
+                1,
+                "reservas activas",
+            )
 
-        item = self.item_repo.obtener_por_id(item_id)
-        if not item:
-            raise ValueError(f"No se encontró el item con ID: {item_id}")
+            item = self.item_repo.obtener_por_id(item_id)
+            if not item:
+                raise ValueError(f"No se encontró el item con ID: {item_id}")
 
-        if item.estado == EstadoItem.DISPONIBLE:
-            raise ValueError(f"El item '{item.titulo}' está disponible, no necesita reserva")
+            if item.estado == EstadoItem.DISPONIBLE:
+                raise ValueError(f"El item '{item.titulo}' está disponible, no necesita reserva")
 
-        fecha_expiracion = datetime.now() + timedelta(days=dias_expiracion)
+            fecha_expiracion = datetime.now() + timedelta(days=dias_expiracion)
 
-        reserva = Reserva(
-            usuario_id=usuario_id,
-            item_id=item_id,
-            empleado_id=empleado_id,
-            fecha_reserva=datetime.now(),
-            fecha_expiracion=fecha_expiracion,
-        )
+            reserva = Reserva(
+                usuario_id=usuario_id,
+                item_id=item_id,
+                empleado_id=empleado_id,
+                fecha_reserva=datetime.now(),
+                fecha_expiracion=fecha_expiracion,
+            )
 
-        return self.reserva_repo.crear(reserva)
+            reserva = self.reserva_repo.crear(reserva)
+        if self.cola_reservas:
+            self.cola_reservas.encolar(reserva, usuario.tipo)
+        auditar(self.auditoria, "ReservaService.realizar_reserva", reserva, empleado_id=empleado_id)
+        return reserva
 
     def cancelar_reserva(self, reserva_id: int) -> Reserva:
-        reserva = self.reserva_repo.obtener_por_id(reserva_id)
-        if not reserva:
-            raise ValueError(f"No se encontró la reserva con ID: {reserva_id}")
+        # La baja y la cesión del ejemplar apartado van juntas: si la cesión falla no queda RESERVADO sin titular
+        with _recargar_cola_si_falla(self.cola_reservas), self._transaccion():
+            reserva = self.reserva_repo.obtener_por_id(reserva_id)
+            if not reserva:
+                raise ValueError(f"No se encontró la reserva con ID: {reserva_id}")
+
+            apartada = reserva.activa and reserva.fecha_asignacion is not None
+            antes = instantanea(reserva)
+            reserva.activa = False
+            reserva = self.reserva_repo.actualizar(reserva)
+            if apartada:
+                self._ceder_ejemplar(reserva.item_id, datetime.now())
+        auditar(self.auditoria, "ReservaService.cancelar_reserva", reserva, antes)
+        return reserva
+
+    def convertir_en_prestamo(self, reserva_id: int, empleado_id: int, dias_prestamo: int = 15) -> Prestamo:
+        """
+        Retiro en el mostrador: cierra la reserva, toma el item y da de alta el
+        préstamo en una sola transacción. Cierre y toma son UPDATE condicionales;
+        si alguno no afecta filas no queda nada a medias.
+        """
+        if not self.prestamo_repo:
+            raise ValueError("El servicio de reservas no tiene acceso a préstamos")
+
+        ahora = datetime.now()
+        with self._transaccion():
+            reserva = self.reserva_repo.obtener_por_id(reserva_id)
+            if not reserva:
+                raise ValueError(f"No se encontró la reserva con ID: {reserva_id}")
+            if not reserva.activa:
+                raise ValueError("Esta reserva ya no está activa")
+            usuario = self.usuario_repo.obtener_por_id(reserva.usuario_id)
+            if not usuario:
+                raise ValueError(f"No se encontró el usuario con ID: {reserva.usuario_id}")
+            _verificar_habilitado(usuario, self.multa_repo)
+            _verificar_limite(
+                _maximo_prestamos(usuario, self.max_prestamos_simultaneos, self.max_prestamos_por_tipo),
+                lambda: self.prestamo_repo.contar_activos_por_usuario(reserva.usuario_id),
+                1,
+                "préstamos activos",
+            )
+            if not self.reserva_repo.cerrar_si_vigente(reserva_id, ahora):
+                raise ValueError("La reserva está vencida")
+
+            # Un ejemplar apartado para esta reserva está RESERVADO; si no, solo se puede retirar uno disponible
+            if reserva.fecha_asignacion is not None:
+                tomado = self.item_repo.prestar_si_reservado(reserva.item_id)
+            else:
+                tomado = self.item_repo.reservar_si_disponible(reserva.item_id)
+            if not tomado:
+                raise ValueError("El item de la reserva todavía no está disponible para retirar")
+
+            prestamo = self.prestamo_repo.crear(
+                Prestamo(
+                    usuario_id=reserva.usuario_id,
+                    item_id=reserva.item_id,
+                    empleado_id=empleado_id,
+                    fecha_prestamo=ahora,
+                    fecha_devolucion_esperada=ahora + timedelta(days=dias_prestamo),
+                )
+            )
 
-        reserva.activa = False
-        return self.reserva_repo.actualizar(reserva)
+        if self.auditoria:
+            antes = instantanea(reserva)
+            reserva.activa = False
+            auditar(self.auditoria, "ReservaService.convertir_en_prestamo", reserva, antes, empleado_id)
+            auditar(self.auditoria, "ReservaService.convertir_en_prestamo", prestamo, empleado_id=empleado_id)
+        return prestamo
+
+    def _ceder_ejemplar(self, item_id: int, fecha: datetime) -> None:
+        """El ejemplar apartado para una reserva que ya no lo retira pasa al siguiente de la cola o se libera"""
+        plazo = timedelta(days=DIAS_RETIRO_RESERVA)
+        if not (self.cola_reservas and self.cola_reservas.asignar_siguiente(item_id, fecha, plazo)):
+            self.item_repo.liberar_si_reservado(item_id)
 
     def listar_reservas_activas(self) -> List[Reserva]:
         return self.reserva_repo.listar_activas()
 
-
+    def listar_reservas_activas_detalle(self) -> List[ReservaDetalle]:
+        return self.reserva_repo.listar_activas_detalle()
+
+    def expirar_reservas(self, fecha: Optional[datetime] = None, lote: int = LOTE_EXPIRACION_RESERVAS) -> ResumenExpiracion:
+        """
+        Desactiva las reservas activas vencidas antes de `fecha` (ahora por defecto).
+        Trabaja en lotes de `lote` reservas, cada uno en su propia transacción, para
+        que los préstamos y reservas del mostrador no esperen a que termine el barrido.
+        """
+        if lote < 1:
+            raise ValueError("El tamaño de lote debe ser mayor a cero")
+
+        corte = fecha or datetime.now()
+        desactivadas: List[int] = []
+        lotes = 0
+        while True:
+            ids = self.reserva_repo.desactivar_expiradas(corte, lote)
+            lotes += 1
+            desactivadas.extend(ids)
+            if len(ids) < lote:
+                break
+
+        if desactivadas:
+            # Las reservas que vencieron sin retirar su ejemplar apartado lo ceden
+            for reserva in self.reserva_repo.obtener_por_ids(desactivadas).values():
+                if reserva.fecha_asignacion is not None:
+                    with _recargar_cola_si_falla(self.cola_reservas), self._transaccion():
+                        self._ceder_ejemplar(reserva.item_id, corte)
+            if self.auditoria:
+                # Tarea del planificador: no se atribuye al empleado que tenga la sesión abierta
+                for reserva_id in desactivadas:
+                    self.auditoria.registrar(
+                        "ReservaService.expirar_reservas", "Reserva", reserva_id, {"activa": [True, False]}, sistema=True
+                    )
+        return ResumenExpiracion(corte, tuple(desactivadas), lotes)
+
+
+@instrumentar_servicio
 class MultaService:
-    def __init__(self, multa_repo: IMultaRepository, usuario_repo: IUsuarioRepository):
+    def __init__(
+        self,
+        multa_repo: IMultaRepository,
+        usuario_repo: IUsuarioRepository,
+        auditoria: Optional[RegistroAuditoria] = None,
+    ):
         self.multa_repo = multa_repo
         self.usuario_repo = usuario_repo
+        self.auditoria = auditoria
 
     def pagar_multa(self, multa_id: int) -> Multa:
         multa = self.multa_repo.obtener_por_id(multa_id)
@@ -252,11 +666,70 @@ class MultaService:
         if multa.pagada:
             raise ValueError("Esta multa ya fue pagada")
 
+        antes = instantanea(multa)
         multa.pagada = True
-        return self.multa_repo.actualizar(multa)
+        multa = self.multa_repo.actualizar(multa)
+        auditar(self.auditoria, "MultaService.pagar_multa", multa, antes)
+        return multa
+
+    def pagar_multas_usuario(self, usuario_id: int, hasta_monto: Optional[float] = None) -> ResumenPagoMultas:
+        """
+        Cancela en una transacción las multas impagas del usuario (p. ej. al cerrar
+        el cuatrimestre). Con `hasta_monto` paga de la más antigua a la más reciente
+        mientras el total no supere ese monto; una multa no se paga en partes.
+        """
+        if hasta_monto is not None and hasta_monto <= 0:
+            raise ValueError("El monto a pagar debe ser mayor a cero")
+        if not self.usuario_repo.obtener_por_id(usuario_id):
+            raise ValueError(f"No se encontró el usuario con ID: {usuario_id}")
+        pago = self.multa_repo.pagar_pendientes_usuario(usuario_id, hasta_monto)
+        if self.auditoria:
+            for multa_id in pago.multa_ids:
+                self.auditoria.registrar("MultaService.pagar_multas_usuario", "Multa", multa_id, {"pagada": [False, True]})
+        return pago
 
     def listar_multas_pendientes(self) -> List[Multa]:
         return self.multa_repo.listar_no_pagadas()
 
+    def listar_multas_pendientes_detalle(self) -> List[MultaDetalle]:
+        return self.multa_repo.listar_pendientes_detalle()
+
     def listar_multas_usuario(self, usuario_id: int) -> List[Multa]:
         return self.multa_repo.listar_por_usuario(usuario_id)
+
+    def devengar_multas_por_atraso(self, fecha: Optional[date] = None) -> ResumenDevengo:
+        """
+        Job nocturno: recalcula en bloque la multa acumulada de cada préstamo vencido
+        que sigue activo, sin esperar a la devolución. El corte es la medianoche de
+        `fecha` (hoy por defecto), así que correrlo varias veces el mismo día no cambia nada.
+        """
+        corte = datetime.combine(fecha or date.today(), time.min)
+        return self.multa_repo.devengar_atrasos(corte, MULTA_POR_DIA_ATRASO)
+
+    def total_devengado_usuario(self, usuario_id: int) -> float:
+        return self.multa_repo.total_devengado_usuario(usuario_id)
+
+    def saldo_pendiente(self, usuario_id: int) -> float:
+        """Lo que el usuario adeuda en multas impagas (sin contar lo devengado por atrasos en curso)"""
+        return self.multa_repo.saldo_pendiente(usuario_id)
+
+
+@instrumentar_servicio
+class AuditoriaService:
+    def __init__(self, auditoria_repo: IAuditoriaRepository, registro: Optional[RegistroAuditoria] = None):
+        self.auditoria_repo = auditoria_repo
+        self.registro = registro
+
+    def listar_por_empleado(
+        self,
+        empleado_id: int,
+        desde: Optional[datetime] = None,
+        hasta: Optional[datetime] = None,
+        limite: int = 50,
+    ) -> List[EntradaAuditoria]:
+        """Modificaciones del empleado, de la más reciente a la más antigua (incluye las que aún estaban en el buffer)"""
+        if limite < 1:
+            raise ValueError("El límite debe ser mayor a cero")
+        if self.registro:
+            self.registro.vaciar()
+        return self.auditoria_repo.listar_por_empleado(empleado_id, desde, hasta, limite)
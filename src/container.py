@@ -1,16 +1,35 @@
+from typing import Dict, List, Optional
+
+from .application.auditoria import RegistroAuditoria
 from .application.auth_service import AuthService
-from .application.services import ItemBibliotecaService, MultaService, PrestamoService, ReservaService, UsuarioService
+from .application.cola_reservas import ColaReservas
+from .application.planificador import Planificador, TareaProgramada
+from .application.services import (
+    AuditoriaService,
+    ItemBibliotecaService,
+    MultaService,
+    PrestamoService,
+    ReservaService,
+    UsuarioService,
+)
+from .domain.entities import TipoUsuario
 from .infrastructure.database import ORM, DatabaseConnection
 from .infrastructure.repositories import (
+    AuditoriaRepository,
     EmpleadoRepository,
+    EstadoTareasRepository,
     ItemBibliotecaRepository,
     MultaRepository,
     PrestamoRepository,
     ReservaRepository,
+    UnidadDeTrabajo,
     UsuarioRepository,
 )
 from .presentation.console_ui import ConsoleUI
 from .shared.config import get_config
+from .shared.metrics import iniciar_servidor_metricas
+
+SEGUNDOS_POR_DIA = 86400
 
 
 class Container:
@@ -21,12 +40,78 @@ class Container:
         self._repositories = {}
         self._services = {}
         self._console_ui = None
+        self._metrics_server = None
+        self._planificador = None
+        self._cola_reservas = None
+        self._auditoria = None
 
     def get_db_connection(self) -> DatabaseConnection:
         if not self._db_connection:
-            self._db_connection = DatabaseConnection(self._config.database.path)
+            self._db_connection = DatabaseConnection(
+                self._config.database.path, slow_query_ms=self._config.database.slow_query_ms
+            )
         return self._db_connection
 
+    def get_metrics_server(self):
+        """Levanta el endpoint /metrics si METRICS_PORT está configurado"""
+        if not self._metrics_server and self._config.metrics.port:
+            self._metrics_server = iniciar_servidor_metricas(self._config.metrics.port, self._config.metrics.host)
+        return self._metrics_server
+
+    def get_planificador(self) -> Optional[Planificador]:
+        """Arranca las tareas de mantenimiento en segundo plano si SCHEDULER_ENABLED no es false"""
+        if not self._planificador and self._config.planificador.habilitado:
+            self._planificador = Planificador(EstadoTareasRepository(self.get_orm()))
+            for tarea in self._tareas_mantenimiento():
+                self._planificador.registrar(tarea)
+            self._planificador.iniciar()
+        return self._planificador
+
+    def detener_planificador(self) -> None:
+        if self._planificador:
+            self._planificador.detener()
+            self._planificador = None
+
+    def get_auditoria(self) -> Optional[RegistroAuditoria]:
+        """Buffer de auditoría compartido por los servicios (None si AUDIT_ENABLED es false)"""
+        config = self._config.auditoria
+        if not self._auditoria and config.habilitada:
+            self._auditoria = RegistroAuditoria(
+                self.get_auditoria_repository(),
+                config.lote,
+                config.intervalo,
+                empleado_actual=lambda: self.get_auth_service().empleado_id_en_sesion,
+            )
+        return self._auditoria
+
+    def iniciar_auditoria(self) -> Optional[RegistroAuditoria]:
+        """Arranca el hilo que vacía el buffer de auditoría; sin él se escribe al completar cada lote"""
+        auditoria = self.get_auditoria()
+        if auditoria:
+            auditoria.iniciar()
+        return auditoria
+
+    def detener_auditoria(self) -> None:
+        if self._auditoria:
+            self._auditoria.detener()
+
+    def _tareas_mantenimiento(self) -> List[TareaProgramada]:
+        config = self._config.planificador
+        orm = self.get_orm()
+        return [
+            TareaProgramada(
+                "devengar_multas", SEGUNDOS_POR_DIA, self.get_multa_service().devengar_multas_por_atraso, config.jitter
+            ),
+            TareaProgramada(
+                "expirar_reservas",
+                config.minutos_expiracion_reservas * 60,
+                self.get_reserva_service().expirar_reservas,
+                config.jitter,
+            ),
+            TareaProgramada("analizar_db", SEGUNDOS_POR_DIA, orm.analizar, config.jitter),
+            TareaProgramada("compactar_db", 7 * SEGUNDOS_POR_DIA, orm.compactar, config.jitter),
+        ]
+
     def get_orm(self) -> ORM:
         if not self._orm:
             self._orm = ORM(self.get_db_connection())
@@ -63,14 +148,34 @@ class Container:
             self._repositories["empleado"] = EmpleadoRepository(self.get_orm())
         return self._repositories["empleado"]
 
+    def get_auditoria_repository(self) -> AuditoriaRepository:
+        if "auditoria" not in self._repositories:
+            self._repositories["auditoria"] = AuditoriaRepository(self.get_orm())
+        return self._repositories["auditoria"]
+
+    def get_cola_reservas(self) -> ColaReservas:
+        """Una sola cola en memoria compartida por préstamos (devoluciones) y reservas"""
+        if not self._cola_reservas:
+            self._cola_reservas = ColaReservas(
+                self.get_reserva_repository(), self._config.biblioteca.prioridad_reserva_docente
+            )
+        return self._cola_reservas
+
+    def _max_prestamos_por_tipo(self) -> Dict[TipoUsuario, int]:
+        biblioteca = self._config.biblioteca
+        return {
+            TipoUsuario.DOCENTE: biblioteca.max_prestamos_docente,
+            TipoUsuario.BIBLIOTECARIO: biblioteca.max_prestamos_bibliotecario,
+        }
+
     def get_usuario_service(self) -> UsuarioService:
         if "usuario" not in self._services:
-            self._services["usuario"] = UsuarioService(self.get_usuario_repository())
+            self._services["usuario"] = UsuarioService(self.get_usuario_repository(), self.get_auditoria())
         return self._services["usuario"]
 
     def get_item_service(self) -> ItemBibliotecaService:
         if "item" not in self._services:
-            self._services["item"] = ItemBibliotecaService(self.get_item_repository())
+            self._services["item"] = ItemBibliotecaService(self.get_item_repository(), self.get_auditoria())
         return self._services["item"]
 
     def get_prestamo_service(self) -> PrestamoService:
@@ -80,26 +185,48 @@ class Container:
                 self.get_item_repository(),
                 self.get_usuario_repository(),
                 self.get_multa_repository(),
+                UnidadDeTrabajo(self.get_orm()),
+                self.get_cola_reservas(),
+                self._config.biblioteca.max_prestamos_simultaneos,
+                self.get_auditoria(),
+                self._max_prestamos_por_tipo(),
             )
         return self._services["prestamo"]
 
     def get_reserva_service(self) -> ReservaService:
         if "reserva" not in self._services:
             self._services["reserva"] = ReservaService(
-                self.get_reserva_repository(), self.get_item_repository(), self.get_usuario_repository()
+                self.get_reserva_repository(),
+                self.get_item_repository(),
+                self.get_usuario_repository(),
+                self.get_cola_reservas(),
+                self.get_prestamo_repository(),
+                UnidadDeTrabajo(self.get_orm()),
+                self._config.biblioteca.max_reservas_simultaneas,
+                self._config.biblioteca.max_prestamos_simultaneos,
+                self.get_multa_repository(),
+                self.get_auditoria(),
+                self._max_prestamos_por_tipo(),
             )
         return self._services["reserva"]
 
     def get_multa_service(self) -> MultaService:
         if "multa" not in self._services:
-            self._services["multa"] = MultaService(self.get_multa_repository(), self.get_usuario_repository())
+            self._services["multa"] = MultaService(
+                self.get_multa_repository(), self.get_usuario_repository(), self.get_auditoria()
+            )
         return self._services["multa"]
 
     def get_auth_service(self) -> AuthService:
         if "auth" not in self._services:
-            self._services["auth"] = AuthService(self.get_empleado_repository())
+            self._services["auth"] = AuthService(self.get_empleado_repository(), self.get_auditoria())
         return self._services["auth"]
 
+    def get_auditoria_service(self) -> AuditoriaService:
+        if "auditoria" not in self._services:
+            self._services["auditoria"] = AuditoriaService(self.get_auditoria_repository(), self.get_auditoria())
+        return self._services["auditoria"]
+
     def get_console_ui(self) -> ConsoleUI:
         if not self._console_ui:
             self._console_ui = ConsoleUI(
@@ -109,5 +236,7 @@ class Container:
                 self.get_reserva_service(),
                 self.get_multa_service(),
                 self.get_auth_service(),
+                self.get_auditoria_service(),
+                query_stats=self.get_db_connection().query_stats,
             )
         return self._console_ui
@@ -17,6 +17,7 @@ class EstadoItem(Enum):
     PRESTADO = "prestado"
     EN_REPARACION = "en_reparacion"
     PERDIDO = "perdido"
+    RESERVADO = "reservado"  # Devuelto y apartado para el primero de la cola de reservas
 
 
 class CategoriaItem(Enum):
@@ -28,8 +29,18 @@ class CategoriaItem(Enum):
     OTRO = "otro"
 
 
-@dataclass
-class Empleado:
+class _Persistible:
+    """
+    Slot donde el repositorio guarda la última fila leída o escrita de la entidad,
+    para que `actualizar` escriba solo las columnas que cambiaron. No es un campo
+    de la dataclass: no participa de __init__, __eq__ ni __repr__.
+    """
+
+    __slots__ = ("_persistido",)
+
+
+@dataclass(slots=True)
+class Empleado(_Persistible):
     """Empleados que operan el sistema (bibliotecarios/administradores)"""
 
     id: Optional[int] = None
@@ -44,8 +55,8 @@ class Empleado:
     fecha_registro: Optional[datetime] = None
 
 
-@dataclass
-class Usuario:
+@dataclass(slots=True)
+class Usuario(_Persistible):
     """Usuarios registrados de la biblioteca (alumnos, docentes, etc.)"""
 
     id: Optional[int] = None
@@ -57,7 +68,11 @@ class Usuario:
     telefono: Optional[str] = None
     activo: bool = True
     fecha_registro: Optional[datetime] = None
-    _multas_pendientes: List["Multa"] = field(default_factory=list, init=False)
+    # Estado cargado por los servicios, no datos del usuario: no participa de __eq__ ni de la auditoría
+    # Solo se materializa si se cargan multas; la mayoría de los usuarios hidratados no las necesita
+    _multas_pendientes: Optional[List["Multa"]] = field(default=None, init=False, repr=False, compare=False)
+    # Alternativa sin materializar multas: el saldo impago leído del libro de saldos
+    _saldo_multas: Optional[float] = field(default=None, init=False, repr=False, compare=False)
 
     def nombre_completo(self) -> str:
         """Retorna el nombre completo del usuario"""
@@ -69,11 +84,17 @@ class Usuario:
 
     def tiene_multas_pendientes(self) -> bool:
         """Verifica si el usuario tiene multas sin pagar"""
-        return any(not multa.pagada for multa in self._multas_pendientes)
+        if self._saldo_multas is not None:
+            return self._saldo_multas > 0
+        return any(not multa.pagada for multa in self._multas_pendientes or ())
+
+    def cargar_saldo_multas(self, saldo: float) -> None:
+        """Registra el saldo impago del usuario para las verificaciones de préstamo"""
+        self._saldo_multas = saldo
 
 
-@dataclass
-class ItemBiblioteca:
+@dataclass(slots=True)
+class ItemBiblioteca(_Persistible):
     id: Optional[int] = None
     titulo: str = ""
     autor: Optional[str] = None
@@ -86,8 +107,8 @@ class ItemBiblioteca:
     valor_reposicion: Optional[float] = None
 
 
-@dataclass
-class Prestamo:
+@dataclass(slots=True)
+class Prestamo(_Persistible):
     id: Optional[int] = None
     usuario_id: int = 0
     item_id: int = 0
@@ -99,8 +120,8 @@ class Prestamo:
     activo: bool = True
 
 
-@dataclass
-class Reserva:
+@dataclass(slots=True)
+class Reserva(_Persistible):
     id: Optional[int] = None
     usuario_id: int = 0
     item_id: int = 0
@@ -108,10 +129,11 @@ class Reserva:
     fecha_reserva: Optional[datetime] = None
     fecha_expiracion: Optional[datetime] = None
     activa: bool = True
+    fecha_asignacion: Optional[datetime] = None  # Cuándo se le apartó un ejemplar devuelto
 
 
-@dataclass
-class Multa:
+@dataclass(slots=True)
+class Multa(_Persistible):
     id: Optional[int] = None
     usuario_id: int = 0
     prestamo_id: int = 0
@@ -122,7 +144,7 @@ class Multa:
     pagada: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class SesionEmpleado:
     """Sesión actual del empleado logueado"""
 
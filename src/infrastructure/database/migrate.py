@@ -0,0 +1,245 @@
+"""
+Migraciones de esquema versionadas con `PRAGMA user_version`.
+
+`ORM.create_tables` crea el esquema base (versión 0) y luego aplica, en
+orden y cada una en su propia transacción, las migraciones pendientes.
+También puede ejecutarse a mano:
+
+    python -m src.infrastructure.database.migrate [--hasta N] [--db ruta]
+"""
+
+import argparse
+import sqlite3
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+# Columnas de fecha con predicados de rango (vencimientos, expiraciones, multas por período).
+# Las fechas de alta (usuarios, empleados, items) las completa el DEFAULT de SQLite y quedan como texto.
+COLUMNAS_FECHA_EPOCH = {
+    "prestamos": ("fecha_prestamo", "fecha_devolucion_esperada", "fecha_devolucion_real"),
+    "reservas": ("fecha_reserva", "fecha_expiracion"),
+    "multas": ("fecha_multa",),
+}
+
+# Tablas con columna `version` para control de concurrencia optimista en `actualizar`
+TABLAS_VERSIONADAS = ("items_biblioteca", "prestamos", "reservas", "multas")
+
+
+@dataclass(frozen=True)
+class Migracion:
+    version: int
+    descripcion: str
+    aplicar: Callable[[sqlite3.Connection], None]
+
+
+def _fechas_a_epoch(conn: sqlite3.Connection) -> None:
+    for tabla, columnas in COLUMNAS_FECHA_EPOCH.items():
+        for columna in columnas:
+            # El texto ISO es hora local sin zona (datetime.now().isoformat()); 'utc' lo interpreta así
+            conn.execute(
+                f"UPDATE {tabla} SET {columna} = CAST(strftime('%s', {columna}, 'utc') AS INTEGER)"  # nosec B608
+                f" WHERE typeof({columna}) = 'text'"
+            )
+    # execute y no executescript: este último confirma la transacción en curso
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_prestamos_fecha ON prestamos(fecha_prestamo)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_reservas_fecha ON reservas(fecha_reserva)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_multas_fecha ON multas(fecha_multa)")
+
+
+def _columna_version(conn: sqlite3.Connection) -> None:
+    for tabla in TABLAS_VERSIONADAS:
+        conn.execute(f"ALTER TABLE {tabla} ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
+
+def _multas_devengadas(conn: sqlite3.Connection) -> None:
+    # Una fila por préstamo vencido y todavía activo: lo que adeudaría si se devolviera hoy
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS multas_devengadas (
+            prestamo_id INTEGER PRIMARY KEY REFERENCES prestamos(id),
+            usuario_id INTEGER NOT NULL REFERENCES usuarios(id),
+            dias_atraso INTEGER NOT NULL,
+            monto REAL NOT NULL,
+            fecha_calculo INTEGER NOT NULL
+        )
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_multas_devengadas_usuario ON multas_devengadas(usuario_id)")
+
+
+def _tareas_programadas(conn: sqlite3.Connection) -> None:
+    # Última corrida de cada tarea del planificador: al reiniciar se retoma el calendario en lugar de repetir todo
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS tareas_programadas (
+            nombre TEXT PRIMARY KEY,
+            ultima_ejecucion INTEGER NOT NULL,
+            duracion_ms REAL NOT NULL,
+            ejecuciones INTEGER NOT NULL DEFAULT 0,
+            ultimo_error TEXT
+        )
+        """
+    )
+
+
+def _cola_reservas(conn: sqlite3.Connection) -> None:
+    conn.execute("ALTER TABLE reservas ADD COLUMN fecha_asignacion INTEGER")
+    # Cola de espera de cada item en orden de llegada (ColaReservas la carga al iniciar)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_reservas_cola ON reservas(item_id, activa, fecha_reserva)")
+
+
+def _activos_por_usuario(conn: sqlite3.Connection) -> None:
+    # Índices parciales que cubren el COUNT del límite por usuario (la columna del filtro va en la clave: si no,
+    # SQLite lee la fila para verificarla); el conteo recorre solo las entradas activas del usuario
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_prestamos_usuario_activos ON prestamos(usuario_id, activo) WHERE activo = 1")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_reservas_usuario_activas ON reservas(usuario_id, activa) WHERE activa = 1")
+
+
+# Montos en centavos enteros: el saldo se suma y resta sin arrastrar errores de redondeo de REAL
+_CENTAVOS = "CAST(ROUND({}.monto * 100) AS INTEGER)"
+
+
+def _saldos_multas(conn: sqlite3.Connection) -> None:
+    # Libro de saldos por usuario: lo mantienen los triggers de multas en la misma transacción que el cambio,
+    # así consultar lo que debe un usuario es una lectura por clave primaria sin recorrer sus multas
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS saldos_multas (
+            usuario_id INTEGER PRIMARY KEY REFERENCES usuarios(id),
+            saldo_centavos INTEGER NOT NULL DEFAULT 0,
+            multas_pendientes INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    conn.execute(
+        f"""
+        INSERT INTO saldos_multas (usuario_id, saldo_centavos, multas_pendientes)
+        SELECT usuario_id, SUM({_CENTAVOS.format("multas")}), COUNT(*) FROM multas WHERE pagada = 0 GROUP BY usuario_id
+        """  # nosec B608
+    )
+    sumar = f"""
+            INSERT INTO saldos_multas (usuario_id, saldo_centavos, multas_pendientes)
+            SELECT NEW.usuario_id, {_CENTAVOS.format("NEW")}, 1 WHERE NEW.pagada = 0
+            ON CONFLICT(usuario_id) DO UPDATE SET
+                saldo_centavos = saldo_centavos + excluded.saldo_centavos, multas_pendientes = multas_pendientes + 1;
+    """  # nosec B608
+    restar = f"""
+            UPDATE saldos_multas
+            SET saldo_centavos = saldo_centavos - {_CENTAVOS.format("OLD")}, multas_pendientes = multas_pendientes - 1
+            WHERE usuario_id = OLD.usuario_id AND OLD.pagada = 0;
+    """  # nosec B608
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS trg_multas_saldo_alta AFTER INSERT ON multas BEGIN {sumar} END")
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS trg_multas_saldo_baja AFTER DELETE ON multas BEGIN {restar} END")
+    # `actualizar` reescribe la fila completa: solo se toca el saldo si cambió algo que lo afecta
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_multas_saldo_cambio AFTER UPDATE OF usuario_id, monto, pagada ON multas
+        WHEN OLD.usuario_id IS NOT NEW.usuario_id OR OLD.monto IS NOT NEW.monto OR OLD.pagada IS NOT NEW.pagada
+        BEGIN {restar} {sumar} END
+        """
+    )
+
+
+def _resumen_cuenta(conn: sqlite3.Connection) -> None:
+    # Mismos índices parciales por usuario con una columna más al final: el resumen de cuenta saca el próximo
+    # vencimiento y las reservas listas para retirar del índice, sin leer filas de préstamos ni de reservas
+    conn.execute("DROP INDEX IF EXISTS idx_prestamos_usuario_activos")
+    conn.execute(
+        "CREATE INDEX idx_prestamos_usuario_activos ON prestamos(usuario_id, activo, fecha_devolucion_esperada)"
+        " WHERE activo = 1"
+    )
+    conn.execute("DROP INDEX IF EXISTS idx_reservas_usuario_activas")
+    conn.execute(
+        "CREATE INDEX idx_reservas_usuario_activas ON reservas(usuario_id, activa, fecha_asignacion) WHERE activa = 1"
+    )
+
+
+def _auditoria(conn: sqlite3.Connection) -> None:
+    # Registro de solo alta: una fila por entidad modificada, con el diff antes/después en JSON
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS auditoria (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fecha INTEGER NOT NULL,
+            empleado_id INTEGER REFERENCES empleados(id),
+            operacion TEXT NOT NULL,
+            entidad TEXT NOT NULL,
+            entidad_id INTEGER,
+            cambios TEXT NOT NULL DEFAULT '{}'
+        )
+        """
+    )
+    # La auditoría de un empleado en un período recorre solo su rango del índice, ya ordenado por fecha
+    # (el rowid va implícito al final, así que ORDER BY fecha, id tampoco ordena en memoria)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_auditoria_empleado_fecha ON auditoria(empleado_id, fecha)")
+    for evento in ("UPDATE", "DELETE"):
+        conn.execute(
+            f"CREATE TRIGGER IF NOT EXISTS trg_auditoria_sin_{evento.lower()} BEFORE {evento} ON auditoria"
+            " BEGIN SELECT RAISE(ABORT, 'La auditoría no admite cambios ni bajas'); END"
+        )
+
+
+MIGRACIONES: List[Migracion] = [
+    Migracion(1, "Fechas de préstamos, reservas y multas como segundos epoch (INTEGER)", _fechas_a_epoch),
+    Migracion(2, "Columna version en items, préstamos, reservas y multas (concurrencia optimista)", _columna_version),
+    Migracion(3, "Tabla multas_devengadas: multa acumulada por préstamo vencido", _multas_devengadas),
+    Migracion(4, "Tabla tareas_programadas: última ejecución de cada tarea del planificador", _tareas_programadas),
+    Migracion(
+        5, "Cola de reservas por item: columna fecha_asignacion e índice (item_id, activa, fecha_reserva)", _cola_reservas
+    ),
+    Migracion(6, "Índices parciales de préstamos y reservas activos por usuario (límites simultáneos)", _activos_por_usuario),
+    Migracion(7, "Tabla saldos_multas: saldo impago por usuario mantenido por triggers de multas", _saldos_multas),
+    Migracion(8, "Índices por usuario con vencimiento y asignación: resumen de cuenta sin leer filas", _resumen_cuenta),
+    Migracion(9, "Tabla auditoria de solo alta con índice (empleado_id, fecha)", _auditoria),
+]
+
+VERSION_FECHAS_EPOCH = 1
+
+
+def version_actual(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrar(db_path: str, hasta: Optional[int] = None) -> int:
+    """Aplica las migraciones pendientes hasta `hasta` (todas por defecto) y devuelve la versión final"""
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        version = version_actual(conn)
+        for migracion in MIGRACIONES:
+            if migracion.version <= version or (hasta is not None and migracion.version > hasta):
+                continue
+            conn.execute("BEGIN IMMEDIATE")
+            # Con el lock de escritura tomado se vuelve a leer: otro proceso pudo migrar desde la primera lectura
+            version = version_actual(conn)
+            if migracion.version <= version:
+                conn.execute("COMMIT")
+                continue
+            try:
+                migracion.aplicar(conn)
+                conn.execute(f"PRAGMA user_version = {int(migracion.version)}")
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            version = migracion.version
+        return version
+    finally:
+        conn.close()
+
+
+def main():
+    from ...shared.config import DatabaseConfig
+    from .orm import ORM, DatabaseConnection
+
+    parser = argparse.ArgumentParser(description="Aplica las migraciones de esquema pendientes")
+    parser.add_argument("--db", default=DatabaseConfig.from_env().path)
+    parser.add_argument("--hasta", type=int, default=None)
+    args = parser.parse_args()
+
+    orm = ORM(DatabaseConnection(args.db))
+    orm.create_tables(migrar_hasta=args.hasta)
+    print(f"🗄️  {args.db}: esquema en versión {orm.version_esquema}")
+
+
+if __name__ == "__main__":
+    main()
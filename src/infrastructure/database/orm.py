@@ -1,11 +1,27 @@
 import os
 import sqlite3
-from typing import Any, Dict, List, Optional
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from ...shared.instrumentation import registrar_consulta
+from ...shared.metrics import get_metrics
+from .query_stats import QueryStats, SlowQueryLog, fingerprint
+
+_duracion_sql = get_metrics().histogram("biblioteca_db_query_seconds", "Duración de sentencias SQL", ("tipo",))
+_duracion_query = _duracion_sql.labels("query")
+_duracion_non_query = _duracion_sql.labels("non_query")
+_duracion_script = _duracion_sql.labels("script")
 
 
 class DatabaseConnection:
-    def __init__(self, db_path: str = "data/biblioteca.db"):
+    def __init__(self, db_path: str = "data/biblioteca.db", slow_query_ms: Optional[float] = None):
         self.db_path = db_path
+        self.query_stats = QueryStats()
+        self.slow_query_log = SlowQueryLog(slow_query_ms) if slow_query_ms is not None else None
+        self._local = threading.local()
         self._ensure_directory()
 
     def _ensure_directory(self):
@@ -18,29 +34,139 @@ class DatabaseConnection:
         conn.row_factory = sqlite3.Row
         return conn
 
-    def execute_query(self, query: str, params: tuple = ()) -> List[Dict[str, Any]]:
+    @contextmanager
+    def transaccion(self) -> Iterator[sqlite3.Connection]:
+        """
+        Agrupa en una sola transacción todas las sentencias que el hilo actual
+        ejecute dentro del bloque: confirma al salir, revierte ante una excepción.
+        Toma el lock de escritura al empezar (BEGIN IMMEDIATE), así lo leído dentro
+        del bloque no cambia hasta el COMMIT. Un bloque anidado se suma al externo.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            yield conn
+            return
+        conn = self.get_connection()
+        conn.execute("BEGIN IMMEDIATE")
+        self._local.conn = conn
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._local.conn = None
+            conn.close()
+
+    @contextmanager
+    def _conexion(self) -> Iterator[sqlite3.Connection]:
+        """La conexión de la transacción en curso o, fuera de ella, una nueva que confirma al salir"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            yield conn
+            return
         with self.get_connection() as conn:
+            yield conn
+
+    @contextmanager
+    def _medir(self, conn: sqlite3.Connection, query: str, params: tuple, huella: str, serie) -> Iterator[None]:
+        """
+        Alimenta el histograma global y las estadísticas por huella, también si la
+        sentencia falla. El log de consultas lentas (que corre un EXPLAIN en la misma
+        conexión) solo se alimenta si terminó bien: tras un error el plan no aporta y
+        la transacción puede estar revirtiéndose.
+        """
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            segundos = time.perf_counter() - inicio
+            serie.observe(segundos)
+            self.query_stats.registrar(huella, segundos)
+        if self.slow_query_log and self.slow_query_log.es_lenta(segundos):
+            self.slow_query_log.registrar(conn, query, params, segundos)
+
+    def execute_query(self, query: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        huella = fingerprint(query)
+        registrar_consulta(huella)
+        with self._conexion() as conn, self._medir(conn, query, params, huella, _duracion_query):
             cursor = conn.cursor()
             cursor.execute(query, params)
             return [dict(row) for row in cursor.fetchall()]
 
+    def execute_query_rows(self, query: str, params: tuple = ()) -> Tuple[Tuple[str, ...], List[tuple]]:
+        """Como execute_query, pero devuelve (columnas, filas como tuplas) sin copiar a dicts"""
+        huella = fingerprint(query)
+        registrar_consulta(huella)
+        with self._conexion() as conn, self._medir(conn, query, params, huella, _duracion_query):
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            cursor.execute(query, params)
+            filas = cursor.fetchall()
+            return tuple(d[0] for d in cursor.description or ()), filas
+
     def execute_non_query(self, query: str, params: tuple = ()) -> int:
-        with self.get_connection() as conn:
+        """
+        Para INSERT de una fila: devuelve su rowid. `lastrowid` es el último rowid
+        insertado en la conexión, no en esta sentencia: dentro de una transacción un
+        UPDATE o DELETE posterior a un INSERT lo arrastra, así que esas sentencias
+        usan execute_rowcount.
+        """
+        cursor = self._ejecutar_escritura(query, params)
+        return cursor.lastrowid or cursor.rowcount
+
+    def execute_rowcount(self, query: str, params: tuple = ()) -> int:
+        """Filas afectadas por la sentencia (UPDATE, DELETE, INSERT ... SELECT, UPSERT)"""
+        return self._ejecutar_escritura(query, params).rowcount
+
+    def _ejecutar_escritura(self, query: str, params: tuple) -> sqlite3.Cursor:
+        huella = fingerprint(query)
+        registrar_consulta(huella)
+        with self._conexion() as conn, self._medir(conn, query, params, huella, _duracion_non_query):
             cursor = conn.cursor()
             cursor.execute(query, params)
-            conn.commit()
-            return cursor.lastrowid or cursor.rowcount
+            return cursor
+
+    def execute_many(self, query: str, params_seq: Iterable[tuple]) -> int:
+        huella = fingerprint(query)
+        registrar_consulta(huella)
+        with self._conexion() as conn, self._medir(conn, query, (), huella, _duracion_non_query):
+            cursor = conn.cursor()
+            cursor.executemany(query, params_seq)
+            return cursor.rowcount
 
     def execute_script(self, script: str) -> None:
-        with self.get_connection() as conn:
-            conn.executescript(script)
+        registrar_consulta(fingerprint(script))
+        inicio = time.perf_counter()
+        try:
+            with self.get_connection() as conn:
+                conn.executescript(script)
+        finally:
+            _duracion_script.observe(time.perf_counter() - inicio)
+
+
+# Límite de parámetros por sentencia en SQLite < 3.32 (SQLITE_MAX_VARIABLE_NUMBER); se usa un margen
+MAX_VARIABLES_POR_SENTENCIA = 900
 
 
 class ORM:
     def __init__(self, db_connection: DatabaseConnection):
         self.db = db_connection
+        self.version_esquema: Optional[int] = None
         # Whitelist of allowed table names for security
-        self._allowed_tables = {"usuarios", "items_biblioteca", "empleados", "prestamos", "reservas", "multas"}
+        self._allowed_tables = {
+            "usuarios",
+            "items_biblioteca",
+            "empleados",
+            "prestamos",
+            "reservas",
+            "multas",
+            "multas_devengadas",
+            "tareas_programadas",
+            "saldos_multas",
+            "auditoria",
+        }
 
     def _validate_table_name(self, table: str) -> None:
         """Validate table name against whitelist to prevent SQL injection."""
@@ -57,7 +183,7 @@ class ORM:
             sanitized.append(col)
         return sanitized
 
-    def create_tables(self):
+    def create_tables(self, migrar_hasta: Optional[int] = None):
         schema = """
         CREATE TABLE IF NOT EXISTS usuarios (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -151,10 +277,44 @@ class ORM:
         CREATE INDEX IF NOT EXISTS idx_reservas_empleado ON reservas(empleado_id);
         CREATE INDEX IF NOT EXISTS idx_multas_usuario ON multas(usuario_id);
         CREATE INDEX IF NOT EXISTS idx_multas_empleado ON multas(empleado_id);
+        CREATE INDEX IF NOT EXISTS idx_prestamos_activos ON prestamos(fecha_devolucion_esperada) WHERE activo = 1;
+        CREATE INDEX IF NOT EXISTS idx_reservas_activas ON reservas(fecha_expiracion) WHERE activa = 1;
+        CREATE INDEX IF NOT EXISTS idx_multas_pendientes ON multas(fecha_multa) WHERE pagada = 0;
         """
 
         self.db.execute_script(schema)
 
+        # Importación diferida: migrate también se ejecuta como script (python -m ...migrate)
+        from .migrate import migrar
+
+        self.version_esquema = migrar(self.db.db_path, migrar_hasta)
+
+    def transaccion(self):
+        return self.db.transaccion()
+
+    def analizar(self) -> None:
+        """Actualiza las estadísticas del planificador de consultas de SQLite (sqlite_stat1)"""
+        self.db.execute_script("ANALYZE")
+
+    def compactar(self) -> None:
+        """Reescribe el archivo sin páginas libres; toma un lock exclusivo mientras dura"""
+        self.db.execute_script("VACUUM")
+
+    @property
+    def fechas_epoch(self) -> bool:
+        """True si el esquema guarda las fechas de préstamos, reservas y multas como segundos epoch"""
+        from .migrate import VERSION_FECHAS_EPOCH
+
+        if self.version_esquema is None:
+            self.version_esquema = self.db.execute_query("PRAGMA user_version")[0]["user_version"]
+        return self.version_esquema >= VERSION_FECHAS_EPOCH
+
+    def valor_fecha(self, fecha: Optional[datetime]) -> Any:
+        """Convierte una fecha al formato de almacenamiento del esquema (epoch o texto ISO)"""
+        if fecha is None:
+            return None
+        return int(fecha.timestamp()) if self.fechas_epoch else fecha.isoformat()
+
     def insert(self, table: str, data: Dict[str, Any]) -> int:
         self._validate_table_name(table)
         columns = self._sanitize_column_names(list(data.keys()))
@@ -174,21 +334,124 @@ class ORM:
 
         return self.db.execute_query(query, params)
 
-    def update(self, table: str, data: Dict[str, Any], where: str, params: tuple = ()) -> int:
+    def select_rows(self, table: str, where: Optional[str] = None, params: tuple = ()) -> Tuple[Tuple[str, ...], List[tuple]]:
+        """Como select, pero devuelve (columnas, filas) para los mappers compilados"""
+        self._validate_table_name(table)
+        # Safe to use f-string here as table name is validated
+        query = f"SELECT * FROM {table}"  # nosec B608
+        if where:
+            query += f" WHERE {where}"
+
+        return self.db.execute_query_rows(query, params)
+
+    def select_in(
+        self,
+        table: str,
+        column: str,
+        values: Iterable[Any],
+        chunk_size: int = MAX_VARIABLES_POR_SENTENCIA,
+        where: Optional[str] = None,
+        params: tuple = (),
+    ) -> List[Dict[str, Any]]:
+        """SELECT ... WHERE column IN (...) [AND where] partido en lotes que respetan el límite de variables de SQLite."""
+        rows: List[Dict[str, Any]] = []
+        for query, lote in self._consultas_in(table, column, values, chunk_size, where):
+            rows.extend(self.db.execute_query(query, lote + tuple(params)))
+        return rows
+
+    def select_in_rows(
+        self,
+        table: str,
+        column: str,
+        values: Iterable[Any],
+        chunk_size: int = MAX_VARIABLES_POR_SENTENCIA,
+        where: Optional[str] = None,
+        params: tuple = (),
+    ) -> Tuple[Tuple[str, ...], List[tuple]]:
+        """Como select_in, pero devuelve (columnas, filas) para los mappers compilados"""
+        columnas: Tuple[str, ...] = ()
+        filas: List[tuple] = []
+        for query, lote in self._consultas_in(table, column, values, chunk_size, where):
+            columnas, parcial = self.db.execute_query_rows(query, lote + tuple(params))
+            filas.extend(parcial)
+        return columnas, filas
+
+    def _consultas_in(
+        self, table: str, column: str, values: Iterable[Any], chunk_size: int, where: Optional[str] = None
+    ) -> Iterator[Tuple[str, tuple]]:
+        self._validate_table_name(table)
+        for condicion, lote in self._condiciones_in(column, values, chunk_size):
+            if where:
+                condicion += f" AND {where}"
+            # Safe to use f-string here as table and column are validated
+            yield f"SELECT * FROM {table} WHERE {condicion}", lote  # nosec B608
+
+    def _condiciones_in(self, column: str, values: Iterable[Any], chunk_size: int) -> Iterator[Tuple[str, tuple]]:
+        """`column IN (?, ...)` por lote de valores únicos, con sus parámetros"""
+        (column,) = self._sanitize_column_names([column])
+        unicos = list(dict.fromkeys(values))
+        for inicio in range(0, len(unicos), chunk_size):
+            lote = unicos[inicio : inicio + chunk_size]
+            yield f"{column} IN ({', '.join('?' for _ in lote)})", tuple(lote)
+
+    def update(self, table: str, data: Dict[str, Any], where: str, params: tuple = (), incrementar: Sequence[str] = ()) -> int:
+        """
+        Devuelve las filas que cumplieron `where` (rowcount de esta sentencia; 0 si
+        ninguna); cada columna de `incrementar` se actualiza como `columna = columna + 1`
+        """
         self._validate_table_name(table)
         columns = self._sanitize_column_names(list(data.keys()))
-        set_clause = ", ".join([f"{key} = ?" for key in columns])
+        incrementos = self._sanitize_column_names(list(incrementar))
+        set_clause = ", ".join([f"{key} = ?" for key in columns] + [f"{key} = {key} + 1" for key in incrementos])
         values = list(data.values()) + list(params)
 
         # Safe to use f-string here as table and columns are validated
         query = f"UPDATE {table} SET {set_clause} WHERE {where}"  # nosec B608
-        return self.db.execute_non_query(query, tuple(values))
+        return self.db.execute_rowcount(query, tuple(values))
+
+    def update_in(
+        self,
+        table: str,
+        data: Dict[str, Any],
+        column: str,
+        values: Iterable[Any],
+        where: Optional[str] = None,
+        params: tuple = (),
+        incrementar: Sequence[str] = (),
+        chunk_size: int = MAX_VARIABLES_POR_SENTENCIA - 50,  # margen para los parámetros de SET y de `where`
+    ) -> int:
+        """UPDATE ... WHERE column IN (...) [AND where] por lotes; devuelve el total de filas afectadas"""
+        total = 0
+        for condicion, lote in self._condiciones_in(column, values, chunk_size):
+            if where:
+                condicion += f" AND {where}"
+            total += self.update(table, data, condicion, lote + tuple(params), incrementar=incrementar)
+        return total
+
+    def insert_many(self, table: str, rows: Sequence[Dict[str, Any]]) -> int:
+        """INSERT con executemany; todas las filas deben tener las mismas columnas que la primera"""
+        if not rows:
+            return 0
+        self._validate_table_name(table)
+        columns = self._sanitize_column_names(list(rows[0].keys()))
+        placeholders = ", ".join(["?" for _ in columns])
+
+        # Safe to use f-string here as table and columns are validated
+        query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"  # nosec B608
+        return self.db.execute_many(query, [tuple(row[column] for column in columns) for row in rows])
 
     def delete(self, table: str, where: str, params: tuple = ()) -> int:
         self._validate_table_name(table)
         # Safe to use f-string here as table name is validated
         query = f"DELETE FROM {table} WHERE {where}"  # nosec B608
-        return self.db.execute_non_query(query, params)
+        return self.db.execute_rowcount(query, params)
 
     def execute_custom_query(self, query: str, params: tuple = ()) -> List[Dict[str, Any]]:
         return self.db.execute_query(query, params)
+
+    def execute_custom_query_rows(self, query: str, params: tuple = ()) -> Tuple[Tuple[str, ...], List[tuple]]:
+        return self.db.execute_query_rows(query, params)
+
+    def execute_custom_non_query(self, query: str, params: tuple = ()) -> int:
+        """Sentencia de escritura armada a mano; devuelve las filas afectadas"""
+        return self.db.execute_rowcount(query, params)
@@ -0,0 +1,157 @@
+"""
+Huellas (fingerprints) de consultas SQL, estadísticas por huella y log de consultas lentas.
+
+La huella normaliza una sentencia quitando literales y listas de parámetros,
+de modo que todas las invocaciones de un mismo `ORM.select` (misma tabla y
+mismo WHERE) se agrupan en una sola entrada, sin importar los valores.
+"""
+
+import logging
+import math
+import re
+import sys
+import threading
+from collections import deque
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Deque, Dict, List, Optional
+
+from ...shared import metrics
+from ...shared.logger import crear_canal
+
+_RE_STRING = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMERO = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_LISTA = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_RE_ESPACIOS = re.compile(r"\s+")
+
+MUESTRAS_POR_HUELLA = 512
+
+# Frames que no identifican al llamador real: la propia capa de base de datos y los wrappers de medición
+_MODULOS_OMITIDOS = (__name__.rsplit(".", 1)[0], "contextlib", metrics.__name__)
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql: str) -> str:
+    """Normaliza una sentencia SQL: literales -> ?, listas IN (?, ?, ...) -> (...), espacios colapsados"""
+    normalizada = _RE_STRING.sub("?", sql)
+    normalizada = _RE_NUMERO.sub("?", normalizada)
+    normalizada = _RE_ESPACIOS.sub(" ", normalizada).strip()
+    normalizada = _RE_LISTA.sub("(...)", normalizada)
+    return normalizada
+
+
+def _percentil(ordenadas: List[float], p: float) -> float:
+    if not ordenadas:
+        return 0.0
+    indice = min(len(ordenadas) - 1, max(0, math.ceil(p / 100.0 * len(ordenadas)) - 1))
+    return ordenadas[indice]
+
+
+@dataclass
+class ResumenHuella:
+    huella: str
+    llamadas: int
+    total_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+
+
+class _EstadisticaHuella:
+    __slots__ = ("llamadas", "total", "maximo", "muestras")
+
+    def __init__(self):
+        self.llamadas = 0
+        self.total = 0.0
+        self.maximo = 0.0
+        self.muestras: Deque[float] = deque(maxlen=MUESTRAS_POR_HUELLA)
+
+
+class QueryStats:
+    """Conteo de llamadas y percentiles de latencia (sobre las últimas muestras) por huella"""
+
+    def __init__(self):
+        self._huellas: Dict[str, _EstadisticaHuella] = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, huella: str, segundos: float) -> None:
+        with self._lock:
+            estadistica = self._huellas.get(huella)
+            if estadistica is None:
+                estadistica = self._huellas[huella] = _EstadisticaHuella()
+            estadistica.llamadas += 1
+            estadistica.total += segundos
+            if segundos > estadistica.maximo:
+                estadistica.maximo = segundos
+            estadistica.muestras.append(segundos)
+
+    def resumen(self, limite: Optional[int] = None) -> List[ResumenHuella]:
+        """Huellas ordenadas por tiempo total acumulado (las que dominan la carga primero)"""
+        with self._lock:
+            copia = [(h, e.llamadas, e.total, e.maximo, sorted(e.muestras)) for h, e in self._huellas.items()]
+
+        resumen = [
+            ResumenHuella(
+                huella=huella,
+                llamadas=llamadas,
+                total_ms=total * 1000,
+                p50_ms=_percentil(muestras, 50) * 1000,
+                p95_ms=_percentil(muestras, 95) * 1000,
+                p99_ms=_percentil(muestras, 99) * 1000,
+                max_ms=maximo * 1000,
+            )
+            for huella, llamadas, total, maximo, muestras in copia
+        ]
+        resumen.sort(key=lambda r: r.total_ms, reverse=True)
+        return resumen[:limite] if limite else resumen
+
+    def reiniciar(self) -> None:
+        with self._lock:
+            self._huellas.clear()
+
+
+def _sitio_de_llamada() -> str:
+    """Primer frame fuera del paquete de base de datos (típicamente el método del repositorio)"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        modulo = frame.f_globals.get("__name__", "")
+        if not modulo.startswith(_MODULOS_OMITIDOS):
+            return f"{modulo}.{frame.f_code.co_name}:{frame.f_lineno}"
+        frame = frame.f_back
+    return "desconocido"
+
+
+class SlowQueryLog:
+    """Escribe en logs/slow_queries_YYYYMMDD.log las sentencias que superan el umbral, con su plan"""
+
+    def __init__(self, umbral_ms: float):
+        self.umbral_ms = umbral_ms
+        self._logger: Optional[logging.Logger] = None
+
+    def _canal(self) -> logging.Logger:
+        if self._logger is None:
+            self._logger = crear_canal("slow_queries", "slow_queries", logging.Formatter("%(asctime)s - %(message)s"))
+        return self._logger
+
+    def es_lenta(self, segundos: float) -> bool:
+        return segundos * 1000 >= self.umbral_ms
+
+    def registrar(self, conn, sql: str, params: tuple, segundos: float) -> None:
+        plan = self._plan(conn, sql, params)
+        self._canal().warning(
+            "%.2f ms | %s | %s\n  SQL: %s\n  PLAN:\n%s",
+            segundos * 1000,
+            _sitio_de_llamada(),
+            fingerprint(sql),
+            _RE_ESPACIOS.sub(" ", sql).strip(),
+            plan,
+        )
+
+    @staticmethod
+    def _plan(conn, sql: str, params: tuple) -> str:
+        try:
+            filas = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+        except Exception as e:  # el plan es informativo; nunca debe romper la consulta original
+            return f"    (sin plan: {e})"
+        return "\n".join(f"    {fila[0]}|{fila[1]}|{fila[3]}" for fila in filas) or "    (vacío)"
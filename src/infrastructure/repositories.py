@@ -1,14 +1,28 @@
+import json
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, ContextManager, Dict, Iterable, List, Optional, Sequence
 
 from ..application.interfaces import (
+    IAuditoriaRepository,
     IEmpleadoRepository,
+    IEstadoTareasRepository,
     IItemBibliotecaRepository,
     IMultaRepository,
     IPrestamoRepository,
     IReservaRepository,
+    IUnidadDeTrabajo,
     IUsuarioRepository,
 )
+from ..application.read_models import (
+    EntradaAuditoria,
+    MultaDetalle,
+    PrestamoDetalle,
+    ReservaDetalle,
+    ReservaEnEspera,
+    ResumenCuenta,
+    ResumenDevengo,
+    ResumenPagoMultas,
+)
 from ..domain.entities import (
     CategoriaItem,
     Empleado,
@@ -20,26 +34,110 @@ from ..domain.entities import (
     TipoUsuario,
     Usuario,
 )
+from ..shared.exceptions import ConflictoConcurrenciaException
+from ..shared.metrics import medir_metodos_publicos
 from .database import ORM
-
-
+from .database.mappers import BOOL, FECHA, JSON, RowMapper
+from .database.orm import MAX_VARIABLES_POR_SENTENCIA
+
+SEGUNDOS_POR_DIA = 86400
+
+medir_repositorio = medir_metodos_publicos("biblioteca_repository_seconds", "Duración de llamadas a repositorios")
+
+
+def _rastrear(entidad: Any, datos: Dict[str, Any]) -> Any:
+    """
+    Recuerda `datos` (columna -> valor tal como quedó en la base) como último estado
+    persistido. Toda fila leída pasa por acá o por `_hidratar`: sin la versión leída,
+    `actualizar` no podría detectar una escritura concurrente.
+    """
+    entidad._persistido = datos
+    return entidad
+
+
+def _hidratar(mapper: RowMapper, columnas: Sequence[str], filas: Sequence[tuple]) -> List[Any]:
+    """
+    `mapper.mapear` que recuerda la versión leída de cada fila, así `actualizar` de
+    una entidad obtenida en lote también exige esa versión. Se guarda solo la
+    versión (sin armar un dict por fila): `actualizar` escribe entonces todas las columnas.
+    """
+    entidades = mapper.mapear(columnas, filas)
+    if "version" in columnas:
+        posicion = list(columnas).index("version")
+        for entidad, fila in zip(entidades, filas):
+            entidad._persistido = {"version": fila[posicion]}
+    return entidades
+
+
+def _columnas_modificadas(entidad: Any, datos: Dict[str, Any]) -> Dict[str, Any]:
+    """Columnas de `datos` que difieren del último estado persistido; todas si la entidad no se leyó ni escribió acá"""
+    previo = getattr(entidad, "_persistido", None)
+    if previo is None:
+        return datos
+    return {columna: valor for columna, valor in datos.items() if columna not in previo or previo[columna] != valor}
+
+
+def _actualizar_versionado(orm: ORM, tabla: str, entidad: Any, datos: Dict[str, Any]) -> Any:
+    """
+    `actualizar` con concurrencia optimista para las tablas con columna `version`:
+    si la entidad se leyó de la base, el UPDATE exige la versión leída y la
+    incrementa; si otra operación escribió la fila entretanto no afecta filas y
+    se lanza ConflictoConcurrenciaException. Sin versión conocida (entidad armada
+    a mano) la fila se actualiza sin condición, pero igual incrementa la versión.
+    """
+    cambios = _columnas_modificadas(entidad, datos)
+    if not cambios:
+        return entidad
+    version = (getattr(entidad, "_persistido", None) or {}).get("version")
+    if version is None:
+        orm.update(tabla, cambios, "id = ?", (entidad.id,), incrementar=("version",))
+        return _rastrear(entidad, datos)
+    if orm.update(tabla, cambios, "id = ? AND version = ?", (entidad.id, version), incrementar=("version",)) == 0:
+        raise ConflictoConcurrenciaException(tabla, entidad.id, version)
+    return _rastrear(entidad, {**datos, "version": version + 1})
+
+
+@medir_repositorio
 class UsuarioRepository(IUsuarioRepository):
+    _mapper = RowMapper(
+        Usuario,
+        {
+            "id": None,
+            "nombre": None,
+            "apellido": None,
+            "email": None,
+            "tipo": TipoUsuario,
+            "numero_identificacion": None,
+            "telefono": None,
+            "activo": BOOL,
+            "fecha_registro": FECHA,
+        },
+    )
+
+    _resumen = RowMapper(
+        ResumenCuenta,
+        {
+            "usuario_id": None,
+            "nombre": None,
+            "apellido": None,
+            "tipo": TipoUsuario,
+            "activo": BOOL,
+            "prestamos_activos": None,
+            "prestamos_vencidos": None,
+            "proximo_vencimiento": FECHA,
+            "reservas_activas": None,
+            "reservas_para_retirar": None,
+            "multas_pendientes": None,
+            "saldo_pendiente": None,
+        },
+    )
+
     def __init__(self, orm: ORM):
         self.orm = orm
         self.table = "usuarios"
 
     def _row_to_entity(self, row: Dict[str, Any]) -> Usuario:
-        return Usuario(
-            id=row["id"],
-            nombre=row["nombre"],
-            apellido=row["apellido"],
-            email=row["email"],
-            tipo=TipoUsuario(row["tipo"]),
-            numero_identificacion=row["numero_identificacion"],
-            telefono=row["telefono"],
-            activo=bool(row["activo"]),
-            fecha_registro=datetime.fromisoformat(row["fecha_registro"]) if row["fecha_registro"] else None,
-        )
+        return _rastrear(self._mapper.desde_dict(row), row)
 
     def _entity_to_dict(self, usuario: Usuario) -> Dict[str, Any]:
         data = {
@@ -58,12 +156,16 @@ class UsuarioRepository(IUsuarioRepository):
         data = self._entity_to_dict(usuario)
         usuario_id = self.orm.insert(self.table, data)
         usuario.id = usuario_id
-        return usuario
+        return _rastrear(usuario, data)
 
     def obtener_por_id(self, id: int) -> Optional[Usuario]:
         rows = self.orm.select(self.table, "id = ?", (id,))
         return self._row_to_entity(rows[0]) if rows else None
 
+    def obtener_por_ids(self, ids: Iterable[int]) -> Dict[int, Usuario]:
+        entidades = _hidratar(self._mapper, *self.orm.select_in_rows(self.table, "id", ids))
+        return {entidad.id: entidad for entidad in entidades}
+
     def obtener_por_email(self, email: str) -> Optional[Usuario]:
         rows = self.orm.select(self.table, "email = ?", (email,))
         return self._row_to_entity(rows[0]) if rows else None
@@ -74,8 +176,10 @@ class UsuarioRepository(IUsuarioRepository):
 
     def actualizar(self, usuario: Usuario) -> Usuario:
         data = self._entity_to_dict(usuario)
-        self.orm.update(self.table, data, "id = ?", (usuario.id,))
-        return usuario
+        cambios = _columnas_modificadas(usuario, data)
+        if cambios:
+            self.orm.update(self.table, cambios, "id = ?", (usuario.id,))
+        return _rastrear(usuario, data)
 
     def eliminar(self, id: int) -> bool:
         affected_rows = self.orm.delete(self.table, "id = ?", (id,))
@@ -91,25 +195,57 @@ class UsuarioRepository(IUsuarioRepository):
         rows = self.orm.select(self.table, "tipo = ?", (tipo.value,))
         return [self._row_to_entity(row) for row in rows]
 
+    def resumen_cuenta(self, usuario_id: int, ahora: datetime) -> Optional[ResumenCuenta]:
+        # Cada subconsulta correlacionada recorre solo las entradas activas del usuario en su índice parcial
+        # (idx_prestamos_usuario_activos, idx_reservas_usuario_activas) y el saldo es una lectura por clave
+        resumen = self._resumen.mapear(
+            *self.orm.execute_custom_query_rows(
+                """
+                SELECT u.id AS usuario_id, u.nombre, u.apellido, u.tipo, u.activo,
+                    (SELECT COUNT(*) FROM prestamos p WHERE p.usuario_id = u.id AND p.activo = 1) AS prestamos_activos,
+                    (SELECT COUNT(*) FROM prestamos p
+                     WHERE p.usuario_id = u.id AND p.activo = 1 AND p.fecha_devolucion_esperada < ?) AS prestamos_vencidos,
+                    (SELECT MIN(p.fecha_devolucion_esperada) FROM prestamos p
+                     WHERE p.usuario_id = u.id AND p.activo = 1) AS proximo_vencimiento,
+                    (SELECT COUNT(*) FROM reservas r WHERE r.usuario_id = u.id AND r.activa = 1) AS reservas_activas,
+                    (SELECT COUNT(r.fecha_asignacion) FROM reservas r
+                     WHERE r.usuario_id = u.id AND r.activa = 1) AS reservas_para_retirar,
+                    COALESCE(s.multas_pendientes, 0) AS multas_pendientes,
+                    COALESCE(s.saldo_centavos, 0) / 100.0 AS saldo_pendiente
+                FROM usuarios u
+                LEFT JOIN saldos_multas s ON s.usuario_id = u.id
+                WHERE u.id = ?
+                """,
+                (self.orm.valor_fecha(ahora), usuario_id),
+            )
+        )
+        return resumen[0] if resumen else None
+
 
+@medir_repositorio
 class ItemBibliotecaRepository(IItemBibliotecaRepository):
+    _mapper = RowMapper(
+        ItemBiblioteca,
+        {
+            "id": None,
+            "titulo": None,
+            "autor": None,
+            "isbn": None,
+            "categoria": CategoriaItem,
+            "estado": EstadoItem,
+            "descripcion": None,
+            "ubicacion": None,
+            "fecha_adquisicion": FECHA,
+            "valor_reposicion": None,
+        },
+    )
+
     def __init__(self, orm: ORM):
         self.orm = orm
         self.table = "items_biblioteca"
 
     def _row_to_entity(self, row: Dict[str, Any]) -> ItemBiblioteca:
-        return ItemBiblioteca(
-            id=row["id"],
-            titulo=row["titulo"],
-            autor=row["autor"],
-            isbn=row["isbn"],
-            categoria=CategoriaItem(row["categoria"]),
-            estado=EstadoItem(row["estado"]),
-            descripcion=row["descripcion"],
-            ubicacion=row["ubicacion"],
-            fecha_adquisicion=datetime.fromisoformat(row["fecha_adquisicion"]) if row["fecha_adquisicion"] else None,
-            valor_reposicion=row["valor_reposicion"],
-        )
+        return _rastrear(self._mapper.desde_dict(row), row)
 
     def _entity_to_dict(self, item: ItemBiblioteca) -> Dict[str, Any]:
         data = {"titulo": item.titulo, "categoria": item.categoria.value, "estado": item.estado.value}
@@ -129,12 +265,16 @@ class ItemBibliotecaRepository(IItemBibliotecaRepository):
         data = self._entity_to_dict(item)
         item_id = self.orm.insert(self.table, data)
         item.id = item_id
-        return item
+        return _rastrear(item, {**data, "version": 0})
 
     def obtener_por_id(self, id: int) -> Optional[ItemBiblioteca]:
         rows = self.orm.select(self.table, "id = ?", (id,))
         return self._row_to_entity(rows[0]) if rows else None
 
+    def obtener_por_ids(self, ids: Iterable[int]) -> Dict[int, ItemBiblioteca]:
+        entidades = _hidratar(self._mapper, *self.orm.select_in_rows(self.table, "id", ids))
+        return {entidad.id: entidad for entidad in entidades}
+
     def buscar_por_titulo(self, titulo: str) -> List[ItemBiblioteca]:
         rows = self.orm.select(self.table, "titulo LIKE ?", (f"%{titulo}%",))
         return [self._row_to_entity(row) for row in rows]
@@ -171,69 +311,134 @@ class ItemBibliotecaRepository(IItemBibliotecaRepository):
         rows = self.orm.select(self.table, "estado = ?", ("disponible",))
         return [self._row_to_entity(row) for row in rows]
 
+    def _cambiar_estado_si(self, item_id: int, actual: EstadoItem, nuevo: EstadoItem) -> bool:
+        """Compare-and-set del estado en una sola sentencia: solo una de dos operaciones concurrentes gana"""
+        filas = self.orm.update(
+            self.table, {"estado": nuevo.value}, "id = ? AND estado = ?", (item_id, actual.value), incrementar=("version",)
+        )
+        return filas == 1
+
+    def reservar_si_disponible(self, item_id: int) -> bool:
+        return self._cambiar_estado_si(item_id, EstadoItem.DISPONIBLE, EstadoItem.PRESTADO)
+
+    def liberar_si_prestado(self, item_id: int) -> bool:
+        return self._cambiar_estado_si(item_id, EstadoItem.PRESTADO, EstadoItem.DISPONIBLE)
+
+    def _cambiar_estados_si(self, item_ids: Iterable[int], actual: EstadoItem, nuevo: EstadoItem) -> int:
+        return self.orm.update_in(
+            self.table, {"estado": nuevo.value}, "id", item_ids, "estado = ?", (actual.value,), incrementar=("version",)
+        )
+
+    def reservar_si_disponibles(self, item_ids: Iterable[int]) -> int:
+        return self._cambiar_estados_si(item_ids, EstadoItem.DISPONIBLE, EstadoItem.PRESTADO)
+
+    def liberar_si_prestados(self, item_ids: Iterable[int]) -> int:
+        return self._cambiar_estados_si(item_ids, EstadoItem.PRESTADO, EstadoItem.DISPONIBLE)
+
+    def apartar_si_prestado(self, item_id: int) -> bool:
+        return self._cambiar_estado_si(item_id, EstadoItem.PRESTADO, EstadoItem.RESERVADO)
+
+    def apartar_si_prestados(self, item_ids: Iterable[int]) -> int:
+        return self._cambiar_estados_si(item_ids, EstadoItem.PRESTADO, EstadoItem.RESERVADO)
+
+    def liberar_si_reservado(self, item_id: int) -> bool:
+        return self._cambiar_estado_si(item_id, EstadoItem.RESERVADO, EstadoItem.DISPONIBLE)
+
+    def prestar_si_reservado(self, item_id: int) -> bool:
+        return self._cambiar_estado_si(item_id, EstadoItem.RESERVADO, EstadoItem.PRESTADO)
+
     def actualizar(self, item: ItemBiblioteca) -> ItemBiblioteca:
-        data = self._entity_to_dict(item)
-        self.orm.update(self.table, data, "id = ?", (item.id,))
-        return item
+        return _actualizar_versionado(self.orm, self.table, item, self._entity_to_dict(item))
 
     def eliminar(self, id: int) -> bool:
         affected_rows = self.orm.delete(self.table, "id = ?", (id,))
         return affected_rows > 0
 
 
+@medir_repositorio
 class PrestamoRepository(IPrestamoRepository):
+    _mapper = RowMapper(
+        Prestamo,
+        {
+            "id": None,
+            "usuario_id": None,
+            "item_id": None,
+            "empleado_id": None,
+            "fecha_prestamo": FECHA,
+            "fecha_devolucion_esperada": FECHA,
+            "fecha_devolucion_real": FECHA,
+            "observaciones": None,
+            "activo": BOOL,
+        },
+    )
+
+    _detalle = RowMapper(
+        PrestamoDetalle,
+        {
+            "id": None,
+            "usuario_id": None,
+            "usuario_nombre": None,
+            "usuario_email": None,
+            "item_id": None,
+            "item_titulo": None,
+            "item_autor": None,
+            "empleado_id": None,
+            "empleado_nombre": None,
+            "fecha_prestamo": FECHA,
+            "fecha_devolucion_esperada": FECHA,
+        },
+    )
+
     def __init__(self, orm: ORM):
         self.orm = orm
         self.table = "prestamos"
 
     def _row_to_entity(self, row: Dict[str, Any]) -> Prestamo:
-        return Prestamo(
-            id=row["id"],
-            usuario_id=row["usuario_id"],
-            item_id=row["item_id"],
-            empleado_id=row["empleado_id"],
-            fecha_prestamo=datetime.fromisoformat(row["fecha_prestamo"]) if row["fecha_prestamo"] else None,
-            fecha_devolucion_esperada=(
-                datetime.fromisoformat(row["fecha_devolucion_esperada"]) if row["fecha_devolucion_esperada"] else None
-            ),
-            fecha_devolucion_real=(
-                datetime.fromisoformat(row["fecha_devolucion_real"]) if row["fecha_devolucion_real"] else None
-            ),
-            observaciones=row["observaciones"],
-            activo=bool(row["activo"]),
-        )
+        return _rastrear(self._mapper.desde_dict(row), row)
 
     def _entity_to_dict(self, prestamo: Prestamo) -> Dict[str, Any]:
         data = {
             "usuario_id": prestamo.usuario_id,
             "item_id": prestamo.item_id,
             "empleado_id": prestamo.empleado_id,
-            "fecha_prestamo": prestamo.fecha_prestamo.isoformat() if prestamo.fecha_prestamo else None,
-            "fecha_devolucion_esperada": (
-                prestamo.fecha_devolucion_esperada.isoformat() if prestamo.fecha_devolucion_esperada else None
-            ),
+            "fecha_prestamo": self.orm.valor_fecha(prestamo.fecha_prestamo),
+            "fecha_devolucion_esperada": self.orm.valor_fecha(prestamo.fecha_devolucion_esperada),
             "activo": prestamo.activo,
         }
         if prestamo.observaciones:
             data["observaciones"] = prestamo.observaciones
         if prestamo.fecha_devolucion_real:
-            data["fecha_devolucion_real"] = prestamo.fecha_devolucion_real.isoformat()
+            data["fecha_devolucion_real"] = self.orm.valor_fecha(prestamo.fecha_devolucion_real)
         return data
 
     def crear(self, prestamo: Prestamo) -> Prestamo:
         data = self._entity_to_dict(prestamo)
         prestamo_id = self.orm.insert(self.table, data)
         prestamo.id = prestamo_id
-        return prestamo
+        return _rastrear(prestamo, {**data, "version": 0})
+
+    def crear_muchos(self, prestamos: List[Prestamo]) -> int:
+        return self.orm.insert_many(self.table, [self._entity_to_dict(prestamo) for prestamo in prestamos])
 
     def obtener_por_id(self, id: int) -> Optional[Prestamo]:
         rows = self.orm.select(self.table, "id = ?", (id,))
         return self._row_to_entity(rows[0]) if rows else None
 
+    def obtener_por_ids(self, ids: Iterable[int]) -> Dict[int, Prestamo]:
+        entidades = _hidratar(self._mapper, *self.orm.select_in_rows(self.table, "id", ids))
+        return {entidad.id: entidad for entidad in entidades}
+
     def listar_por_usuario(self, usuario_id: int) -> List[Prestamo]:
         rows = self.orm.select(self.table, "usuario_id = ?", (usuario_id,))
         return [self._row_to_entity(row) for row in rows]
 
+    def contar_activos_por_usuario(self, usuario_id: int) -> int:
+        # activo = 1 literal: el índice parcial idx_prestamos_usuario_activos cubre el COUNT
+        ((cantidad,),) = self.orm.execute_custom_query_rows(
+            "SELECT COUNT(*) FROM prestamos WHERE usuario_id = ? AND activo = 1", (usuario_id,)
+        )[1]
+        return cantidad
+
     def listar_activos(self) -> List[Prestamo]:
         rows = self.orm.select(self.table, "activo = ?", (True,))
         return [self._row_to_entity(row) for row in rows]
@@ -241,6 +446,25 @@ class PrestamoRepository(IPrestamoRepository):
     def listar_prestamos_activos(self) -> List[Prestamo]:
         return self.listar_activos()
 
+    def listar_activos_detalle(self) -> List[PrestamoDetalle]:
+        # activo = 1 literal: así el planner puede usar el índice parcial idx_prestamos_activos
+        return self._detalle.mapear(
+            *self.orm.execute_custom_query_rows(
+                """
+                SELECT p.id, p.usuario_id, u.nombre || ' ' || u.apellido AS usuario_nombre, u.email AS usuario_email,
+                       p.item_id, i.titulo AS item_titulo, i.autor AS item_autor,
+                       p.empleado_id, e.nombre || ' ' || e.apellido AS empleado_nombre,
+                       p.fecha_prestamo, p.fecha_devolucion_esperada
+                FROM prestamos p
+                LEFT JOIN usuarios u ON u.id = p.usuario_id
+                LEFT JOIN items_biblioteca i ON i.id = p.item_id
+                LEFT JOIN empleados e ON e.id = p.empleado_id
+                WHERE p.activo = 1
+                ORDER BY p.fecha_devolucion_esperada
+                """
+            )
+        )
+
     def listar_todos(self) -> List[Prestamo]:
         """Get all loans"""
         rows = self.orm.select(self.table)
@@ -253,18 +477,24 @@ class PrestamoRepository(IPrestamoRepository):
 
     def listar_vencidos(self) -> List[Prestamo]:
         """Get all overdue loans"""
-        from datetime import datetime
-
-        now = datetime.now().isoformat()
+        # activo = 1 literal para que el planner use el índice parcial idx_prestamos_activos
+        ahora = self.orm.valor_fecha(datetime.now())
         rows = self.orm.select(
-            self.table, "activo = ? AND fecha_devolucion_esperada < ? AND fecha_devolucion_real IS NULL", (True, now)
+            self.table, "activo = 1 AND fecha_devolucion_esperada < ? AND fecha_devolucion_real IS NULL", (ahora,)
         )
         return [self._row_to_entity(row) for row in rows]
 
+    def listar_activos_por_items(self, item_ids: Iterable[int]) -> List[Prestamo]:
+        return _hidratar(self._mapper, *self.orm.select_in_rows(self.table, "item_id", item_ids, where="activo = 1"))
+
+    def marcar_devueltos(self, ids: Iterable[int], fecha: datetime, observaciones: Optional[str] = None) -> int:
+        data = {"activo": False, "fecha_devolucion_real": self.orm.valor_fecha(fecha)}
+        if observaciones:
+            data["observaciones"] = observaciones
+        return self.orm.update_in(self.table, data, "id", ids, "activo = 1", incrementar=("version",))
+
     def actualizar(self, prestamo: Prestamo) -> Prestamo:
-        data = self._entity_to_dict(prestamo)
-        self.orm.update(self.table, data, "id = ?", (prestamo.id,))
-        return prestamo
+        return _actualizar_versionado(self.orm, self.table, prestamo, self._entity_to_dict(prestamo))
 
     def eliminar(self, id: int) -> bool:
         """Delete loan by ID"""
@@ -272,50 +502,107 @@ class PrestamoRepository(IPrestamoRepository):
         return affected_rows > 0
 
 
+@medir_repositorio
 class ReservaRepository(IReservaRepository):
+    _mapper = RowMapper(
+        Reserva,
+        {
+            "id": None,
+            "usuario_id": None,
+            "item_id": None,
+            "empleado_id": None,
+            "fecha_reserva": FECHA,
+            "fecha_expiracion": FECHA,
+            "activa": BOOL,
+            "fecha_asignacion": FECHA,
+        },
+    )
+
+    _detalle = RowMapper(
+        ReservaDetalle,
+        {
+            "id": None,
+            "usuario_id": None,
+            "usuario_nombre": None,
+            "item_id": None,
+            "item_titulo": None,
+            "empleado_id": None,
+            "empleado_nombre": None,
+            "fecha_reserva": FECHA,
+            "fecha_expiracion": FECHA,
+        },
+    )
+
+    _en_espera = RowMapper(
+        ReservaEnEspera,
+        {"id": None, "item_id": None, "usuario_id": None, "tipo_usuario": TipoUsuario, "fecha_reserva": FECHA},
+    )
+
     def __init__(self, orm: ORM):
         self.orm = orm
         self.table = "reservas"
 
     def _row_to_entity(self, row: Dict[str, Any]) -> Reserva:
-        return Reserva(
-            id=row["id"],
-            usuario_id=row["usuario_id"],
-            item_id=row["item_id"],
-            empleado_id=row["empleado_id"],
-            fecha_reserva=datetime.fromisoformat(row["fecha_reserva"]) if row["fecha_reserva"] else None,
-            fecha_expiracion=datetime.fromisoformat(row["fecha_expiracion"]) if row["fecha_expiracion"] else None,
-            activa=bool(row["activa"]),
-        )
+        return _rastrear(self._mapper.desde_dict(row), row)
 
     def _entity_to_dict(self, reserva: Reserva) -> Dict[str, Any]:
         return {
             "usuario_id": reserva.usuario_id,
             "item_id": reserva.item_id,
             "empleado_id": reserva.empleado_id,
-            "fecha_reserva": reserva.fecha_reserva.isoformat() if reserva.fecha_reserva else None,
-            "fecha_expiracion": reserva.fecha_expiracion.isoformat() if reserva.fecha_expiracion else None,
+            "fecha_reserva": self.orm.valor_fecha(reserva.fecha_reserva),
+            "fecha_expiracion": self.orm.valor_fecha(reserva.fecha_expiracion),
             "activa": reserva.activa,
+            "fecha_asignacion": self.orm.valor_fecha(reserva.fecha_asignacion),
         }
 
     def crear(self, reserva: Reserva) -> Reserva:
         data = self._entity_to_dict(reserva)
         reserva_id = self.orm.insert(self.table, data)
         reserva.id = reserva_id
-        return reserva
+        return _rastrear(reserva, {**data, "version": 0})
 
     def obtener_por_id(self, id: int) -> Optional[Reserva]:
         rows = self.orm.select(self.table, "id = ?", (id,))
         return self._row_to_entity(rows[0]) if rows else None
 
+    def obtener_por_ids(self, ids: Iterable[int]) -> Dict[int, Reserva]:
+        entidades = _hidratar(self._mapper, *self.orm.select_in_rows(self.table, "id", ids))
+        return {entidad.id: entidad for entidad in entidades}
+
     def listar_por_usuario(self, usuario_id: int) -> List[Reserva]:
         rows = self.orm.select(self.table, "usuario_id = ?", (usuario_id,))
         return [self._row_to_entity(row) for row in rows]
 
+    def contar_activas_por_usuario(self, usuario_id: int) -> int:
+        # activa = 1 literal: el índice parcial idx_reservas_usuario_activas cubre el COUNT
+        ((cantidad,),) = self.orm.execute_custom_query_rows(
+            "SELECT COUNT(*) FROM reservas WHERE usuario_id = ? AND activa = 1", (usuario_id,)
+        )[1]
+        return cantidad
+
     def listar_activas(self) -> List[Reserva]:
         rows = self.orm.select(self.table, "activa = ?", (True,))
         return [self._row_to_entity(row) for row in rows]
 
+    def listar_activas_detalle(self) -> List[ReservaDetalle]:
+        return self._detalle.mapear(
+            *self.orm.execute_custom_query_rows(
+                """
+                SELECT r.id, r.usuario_id, u.nombre || ' ' || u.apellido AS usuario_nombre,
+                       r.item_id, i.titulo AS item_titulo,
+                       r.empleado_id, e.nombre || ' ' || e.apellido AS empleado_nombre,
+                       r.fecha_reserva, r.fecha_expiracion
+                FROM reservas r
+                LEFT JOIN usuarios u ON u.id = r.usuario_id
+                LEFT JOIN items_biblioteca i ON i.id = r.item_id
+                LEFT JOIN empleados e ON e.id = r.empleado_id
+                WHERE r.activa = 1
+                ORDER BY r.fecha_expiracion
+                """
+            )
+        )
+
     def listar_reservas_activas(self) -> List[Reserva]:
         return self.listar_activas()
 
@@ -333,16 +620,67 @@ class ReservaRepository(IReservaRepository):
 
     def listar_expiradas(self) -> List[Reserva]:
         """Get all expired reservations"""
-        from datetime import datetime
-
-        now = datetime.now().isoformat()
-        rows = self.orm.select(self.table, "activa = ? AND fecha_expiracion < ?", (True, now))
+        ahora = self.orm.valor_fecha(datetime.now())
+        rows = self.orm.select(self.table, "activa = 1 AND fecha_expiracion < ?", (ahora,))
         return [self._row_to_entity(row) for row in rows]
 
+    def desactivar_expiradas(self, corte: datetime, limite: int) -> List[int]:
+        # Un lote por transacción corta: entre lotes se libera el lock de escritura para el mostrador
+        with self.orm.transaccion():
+            ids = [
+                fila[0]
+                for fila in self.orm.execute_custom_query_rows(
+                    "SELECT id FROM reservas WHERE activa = 1 AND fecha_expiracion < ? ORDER BY fecha_expiracion LIMIT ?",
+                    (self.orm.valor_fecha(corte), limite),
+                )[1]
+            ]
+            self.orm.update_in(self.table, {"activa": False}, "id", ids, where="activa = 1", incrementar=("version",))
+        return ids
+
+    def listar_en_espera(self, item_ids: Optional[Iterable[int]] = None) -> List[ReservaEnEspera]:
+        sql = """
+            SELECT r.id, r.item_id, r.usuario_id, u.tipo AS tipo_usuario, r.fecha_reserva
+            FROM reservas r
+            JOIN usuarios u ON u.id = r.usuario_id
+            WHERE r.activa = 1 AND r.fecha_asignacion IS NULL{filtro}
+            ORDER BY r.item_id, r.fecha_reserva
+        """
+        if item_ids is None:
+            return self._en_espera.mapear(*self.orm.execute_custom_query_rows(sql.format(filtro="")))
+        # Las colas de algunos items: recorre idx_reservas_cola (item_id, activa, fecha_reserva) de cada uno
+        ids = list(dict.fromkeys(item_ids))
+        reservas: List[ReservaEnEspera] = []
+        for inicio in range(0, len(ids), MAX_VARIABLES_POR_SENTENCIA):
+            lote = tuple(ids[inicio : inicio + MAX_VARIABLES_POR_SENTENCIA])
+            filtro = f" AND r.item_id IN ({', '.join('?' for _ in lote)})"  # nosec B608
+            reservas.extend(self._en_espera.mapear(*self.orm.execute_custom_query_rows(sql.format(filtro=filtro), lote)))
+        return reservas
+
+    def cerrar_si_vigente(self, id: int, fecha: datetime) -> bool:
+        filas = self.orm.update(
+            self.table,
+            {"activa": False},
+            "id = ? AND activa = 1 AND fecha_expiracion >= ?",
+            (id, self.orm.valor_fecha(fecha)),
+            incrementar=("version",),
+        )
+        return filas == 1
+
+    def asignar_si_en_espera(self, id: int, fecha_asignacion: datetime, fecha_expiracion: datetime) -> bool:
+        filas = self.orm.update(
+            self.table,
+            {
+                "fecha_asignacion": self.orm.valor_fecha(fecha_asignacion),
+                "fecha_expiracion": self.orm.valor_fecha(fecha_expiracion),
+            },
+            "id = ? AND activa = 1 AND fecha_asignacion IS NULL AND fecha_expiracion >= ?",
+            (id, self.orm.valor_fecha(fecha_asignacion)),
+            incrementar=("version",),
+        )
+        return filas == 1
+
     def actualizar(self, reserva: Reserva) -> Reserva:
-        data = self._entity_to_dict(reserva)
-        self.orm.update(self.table, data, "id = ?", (reserva.id,))
-        return reserva
+        return _actualizar_versionado(self.orm, self.table, reserva, self._entity_to_dict(reserva))
 
     def eliminar(self, id: int) -> bool:
         """Delete reservation by ID"""
@@ -350,22 +688,44 @@ class ReservaRepository(IReservaRepository):
         return affected_rows > 0
 
 
+@medir_repositorio
 class MultaRepository(IMultaRepository):
+    _mapper = RowMapper(
+        Multa,
+        {
+            "id": None,
+            "usuario_id": None,
+            "prestamo_id": None,
+            "empleado_id": None,
+            "monto": None,
+            "descripcion": None,
+            "fecha_multa": FECHA,
+            "pagada": BOOL,
+        },
+    )
+
+    _detalle = RowMapper(
+        MultaDetalle,
+        {
+            "id": None,
+            "usuario_id": None,
+            "usuario_nombre": None,
+            "prestamo_id": None,
+            "item_titulo": None,
+            "empleado_id": None,
+            "empleado_nombre": None,
+            "monto": None,
+            "descripcion": None,
+            "fecha_multa": FECHA,
+        },
+    )
+
     def __init__(self, orm: ORM):
         self.orm = orm
         self.table = "multas"
 
     def _row_to_entity(self, row: Dict[str, Any]) -> Multa:
-        return Multa(
-            id=row["id"],
-            usuario_id=row["usuario_id"],
-            prestamo_id=row["prestamo_id"],
-            empleado_id=row["empleado_id"],
-            monto=row["monto"],
-            descripcion=row["descripcion"],
-            fecha_multa=datetime.fromisoformat(row["fecha_multa"]) if row["fecha_multa"] else None,
-            pagada=bool(row["pagada"]),
-        )
+        return _rastrear(self._mapper.desde_dict(row), row)
 
     def _entity_to_dict(self, multa: Multa) -> Dict[str, Any]:
         return {
@@ -374,7 +734,7 @@ class MultaRepository(IMultaRepository):
             "empleado_id": multa.empleado_id,
             "monto": multa.monto,
             "descripcion": multa.descripcion,
-            "fecha_multa": multa.fecha_multa.isoformat() if multa.fecha_multa else None,
+            "fecha_multa": self.orm.valor_fecha(multa.fecha_multa),
             "pagada": multa.pagada,
         }
 
@@ -382,12 +742,19 @@ class MultaRepository(IMultaRepository):
         data = self._entity_to_dict(multa)
         multa_id = self.orm.insert(self.table, data)
         multa.id = multa_id
-        return multa
+        return _rastrear(multa, {**data, "version": 0})
+
+    def crear_muchas(self, multas: List[Multa]) -> int:
+        return self.orm.insert_many(self.table, [self._entity_to_dict(multa) for multa in multas])
 
     def obtener_por_id(self, id: int) -> Optional[Multa]:
         rows = self.orm.select(self.table, "id = ?", (id,))
         return self._row_to_entity(rows[0]) if rows else None
 
+    def obtener_por_ids(self, ids: Iterable[int]) -> Dict[int, Multa]:
+        entidades = _hidratar(self._mapper, *self.orm.select_in_rows(self.table, "id", ids))
+        return {entidad.id: entidad for entidad in entidades}
+
     def listar_por_usuario(self, usuario_id: int) -> List[Multa]:
         rows = self.orm.select(self.table, "usuario_id = ?", (usuario_id,))
         return [self._row_to_entity(row) for row in rows]
@@ -399,6 +766,25 @@ class MultaRepository(IMultaRepository):
     def listar_multas_pendientes(self) -> List[Multa]:
         return self.listar_no_pagadas()
 
+    def listar_pendientes_detalle(self) -> List[MultaDetalle]:
+        return self._detalle.mapear(
+            *self.orm.execute_custom_query_rows(
+                """
+                SELECT m.id, m.usuario_id, u.nombre || ' ' || u.apellido AS usuario_nombre,
+                       m.prestamo_id, i.titulo AS item_titulo,
+                       m.empleado_id, e.nombre || ' ' || e.apellido AS empleado_nombre,
+                       m.monto, m.descripcion, m.fecha_multa
+                FROM multas m
+                LEFT JOIN usuarios u ON u.id = m.usuario_id
+                LEFT JOIN prestamos p ON p.id = m.prestamo_id
+                LEFT JOIN items_biblioteca i ON i.id = p.item_id
+                LEFT JOIN empleados e ON e.id = m.empleado_id
+                WHERE m.pagada = 0
+                ORDER BY m.fecha_multa
+                """
+            )
+        )
+
     def marcar_como_pagada(self, id: int, fecha_pago):
         self.orm.update(self.table, {"pagada": True, "fecha_pago": fecha_pago.isoformat()}, "id = ?", (id,))
 
@@ -412,10 +798,74 @@ class MultaRepository(IMultaRepository):
         rows = self.orm.select(self.table, "pagada = ?", (True,))
         return [self._row_to_entity(row) for row in rows]
 
+    def devengar_atrasos(self, corte: datetime, monto_por_dia: float) -> ResumenDevengo:
+        # Aritmética sobre segundos epoch; el filtro activo = 1 recorre solo el índice parcial idx_prestamos_activos
+        ahora = self.orm.valor_fecha(corte)
+        limite = ahora - SEGUNDOS_POR_DIA  # Al menos un día completo de atraso
+        with self.orm.transaccion():
+            actualizados = self.orm.execute_custom_non_query(
+                f"""
+                INSERT INTO multas_devengadas (prestamo_id, usuario_id, dias_atraso, monto, fecha_calculo)
+                SELECT id, usuario_id, (? - fecha_devolucion_esperada) / {SEGUNDOS_POR_DIA},
+                       ((? - fecha_devolucion_esperada) / {SEGUNDOS_POR_DIA}) * ?, ?
+                FROM prestamos
+                WHERE activo = 1 AND fecha_devolucion_esperada <= ?
+                ON CONFLICT(prestamo_id) DO UPDATE SET
+                    dias_atraso = excluded.dias_atraso, monto = excluded.monto, fecha_calculo = excluded.fecha_calculo
+                WHERE excluded.dias_atraso <> multas_devengadas.dias_atraso OR excluded.monto <> multas_devengadas.monto
+                """,  # nosec B608
+                (ahora, ahora, monto_por_dia, ahora, limite),
+            )
+            eliminados = self.orm.execute_custom_non_query(
+                "DELETE FROM multas_devengadas WHERE prestamo_id NOT IN"
+                " (SELECT id FROM prestamos WHERE activo = 1 AND fecha_devolucion_esperada <= ?)",
+                (limite,),
+            )
+            ((vencidos, total),) = self.orm.execute_custom_query_rows(
+                "SELECT COUNT(*), COALESCE(SUM(monto), 0) FROM multas_devengadas"
+            )[1]
+        return ResumenDevengo(corte, actualizados, eliminados, vencidos, total)
+
+    def total_devengado_usuario(self, usuario_id: int) -> float:
+        # El join con préstamos activos descarta lo ya devuelto aunque el job todavía no haya corrido
+        ((total,),) = self.orm.execute_custom_query_rows(
+            "SELECT COALESCE(SUM(d.monto), 0) FROM multas_devengadas d"
+            " JOIN prestamos p ON p.id = d.prestamo_id AND p.activo = 1 WHERE d.usuario_id = ?",
+            (usuario_id,),
+        )[1]
+        return total
+
+    def saldo_pendiente(self, usuario_id: int) -> float:
+        # Una lectura por clave primaria: los triggers de multas mantienen el saldo al día
+        filas = self.orm.execute_custom_query_rows(
+            "SELECT saldo_centavos FROM saldos_multas WHERE usuario_id = ?", (usuario_id,)
+        )[1]
+        return filas[0][0] / 100 if filas else 0.0
+
+    def pagar_pendientes_usuario(self, usuario_id: int, hasta_monto: Optional[float] = None) -> ResumenPagoMultas:
+        # En centavos, como el libro de saldos: el tope no se pasa por redondeo de REAL
+        tope = None if hasta_monto is None else round(hasta_monto * 100)
+        with self.orm.transaccion():
+            pendientes = self.orm.execute_custom_query_rows(
+                "SELECT id, monto FROM multas WHERE usuario_id = ? AND pagada = 0 ORDER BY fecha_multa, id", (usuario_id,)
+            )[1]
+            ids: List[int] = []
+            pagado = adeudado = 0
+            cortado = False
+            for multa_id, monto in pendientes:
+                centavos = round(monto * 100)
+                adeudado += centavos
+                # Estrictamente de la más antigua a la más reciente: la primera que no entra corta el pago
+                cortado = cortado or (tope is not None and pagado + centavos > tope)
+                if not cortado:
+                    ids.append(multa_id)
+                    pagado += centavos
+            # Un UPDATE para todo el lote; el trigger de multas descuenta cada una del saldo del usuario
+            self.orm.update_in(self.table, {"pagada": True}, "id", ids, where="pagada = 0", incrementar=("version",))
+        return ResumenPagoMultas(usuario_id, tuple(ids), pagado / 100, (adeudado - pagado) / 100)
+
     def actualizar(self, multa: Multa) -> Multa:
-        data = self._entity_to_dict(multa)
-        self.orm.update(self.table, data, "id = ?", (multa.id,))
-        return multa
+        return _actualizar_versionado(self.orm, self.table, multa, self._entity_to_dict(multa))
 
     def eliminar(self, id: int) -> bool:
         """Delete fine by ID"""
@@ -423,24 +873,30 @@ class MultaRepository(IMultaRepository):
         return affected_rows > 0
 
 
+@medir_repositorio
 class EmpleadoRepository(IEmpleadoRepository):
+    _mapper = RowMapper(
+        Empleado,
+        {
+            "id": None,
+            "nombre": None,
+            "apellido": None,
+            "email": None,
+            "usuario_sistema": None,
+            "password_hash": None,
+            "cargo": None,
+            "turno": None,
+            "activo": BOOL,
+            "fecha_registro": FECHA,
+        },
+    )
+
     def __init__(self, orm: ORM):
         self.orm = orm
         self.table = "empleados"
 
     def _row_to_entity(self, row: Dict[str, Any]) -> Empleado:
-        return Empleado(
-            id=row["id"],
-            nombre=row["nombre"],
-            apellido=row["apellido"],
-            email=row["email"],
-            usuario_sistema=row["usuario_sistema"],
-            password_hash=row["password_hash"],
-            cargo=row["cargo"],
-            turno=row["turno"],
-            activo=bool(row["activo"]),
-            fecha_registro=datetime.fromisoformat(row["fecha_registro"]) if row["fecha_registro"] else None,
-        )
+        return _rastrear(self._mapper.desde_dict(row), row)
 
     def _entity_to_dict(self, empleado: Empleado) -> Dict[str, Any]:
         data = {
@@ -460,12 +916,16 @@ class EmpleadoRepository(IEmpleadoRepository):
         data = self._entity_to_dict(empleado)
         empleado_id = self.orm.insert(self.table, data)
         empleado.id = empleado_id
-        return empleado
+        return _rastrear(empleado, data)
 
     def obtener_por_id(self, id: int) -> Optional[Empleado]:
         rows = self.orm.select(self.table, "id = ?", (id,))
         return self._row_to_entity(rows[0]) if rows else None
 
+    def obtener_por_ids(self, ids: Iterable[int]) -> Dict[int, Empleado]:
+        entidades = _hidratar(self._mapper, *self.orm.select_in_rows(self.table, "id", ids))
+        return {entidad.id: entidad for entidad in entidades}
+
     def obtener_por_usuario_sistema(self, usuario_sistema: str) -> Optional[Empleado]:
         """Get employee by system username"""
         rows = self.orm.select(self.table, "usuario_sistema = ?", (usuario_sistema,))
@@ -481,9 +941,97 @@ class EmpleadoRepository(IEmpleadoRepository):
 
     def actualizar(self, empleado: Empleado) -> Empleado:
         data = self._entity_to_dict(empleado)
-        self.orm.update(self.table, data, "id = ?", (empleado.id,))
-        return empleado
+        cambios = _columnas_modificadas(empleado, data)
+        if cambios:
+            self.orm.update(self.table, cambios, "id = ?", (empleado.id,))
+        return _rastrear(empleado, data)
 
     def eliminar(self, id: int) -> bool:
         affected_rows = self.orm.delete(self.table, "id = ?", (id,))
         return affected_rows > 0
+
+
+class UnidadDeTrabajo(IUnidadDeTrabajo):
+    """Transacción SQLite compartida por todos los repositorios que usan el mismo ORM"""
+
+    def __init__(self, orm: ORM):
+        self.orm = orm
+
+    def transaccion(self) -> ContextManager[None]:
+        return self.orm.transaccion()
+
+
+@medir_repositorio
+class EstadoTareasRepository(IEstadoTareasRepository):
+    def __init__(self, orm: ORM):
+        self.orm = orm
+        self.table = "tareas_programadas"
+
+    def ultimas_ejecuciones(self) -> Dict[str, datetime]:
+        return {row["nombre"]: datetime.fromtimestamp(row["ultima_ejecucion"]) for row in self.orm.select(self.table)}
+
+    def registrar_ejecucion(self, nombre: str, inicio: datetime, duracion: float, error: Optional[str] = None) -> None:
+        self.orm.execute_custom_non_query(
+            "INSERT INTO tareas_programadas (nombre, ultima_ejecucion, duracion_ms, ejecuciones, ultimo_error)"
+            " VALUES (?, ?, ?, 1, ?)"
+            " ON CONFLICT(nombre) DO UPDATE SET ultima_ejecucion = excluded.ultima_ejecucion,"
+            " duracion_ms = excluded.duracion_ms, ejecuciones = ejecuciones + 1, ultimo_error = excluded.ultimo_error",
+            (nombre, int(inicio.timestamp()), duracion * 1000, error),
+        )
+
+
+@medir_repositorio
+class AuditoriaRepository(IAuditoriaRepository):
+    _mapper = RowMapper(
+        EntradaAuditoria,
+        {
+            "id": None,
+            "fecha": FECHA,
+            "empleado_id": None,
+            "operacion": None,
+            "entidad": None,
+            "entidad_id": None,
+            "cambios": JSON,
+        },
+    )
+
+    def __init__(self, orm: ORM):
+        self.orm = orm
+        self.table = "auditoria"
+
+    def registrar_muchas(self, entradas: Sequence[EntradaAuditoria]) -> int:
+        return self.orm.insert_many(
+            self.table,
+            [
+                {
+                    "fecha": self.orm.valor_fecha(entrada.fecha),
+                    "empleado_id": entrada.empleado_id,
+                    "operacion": entrada.operacion,
+                    "entidad": entrada.entidad,
+                    "entidad_id": entrada.entidad_id,
+                    "cambios": json.dumps(entrada.cambios, ensure_ascii=False, default=str),
+                }
+                for entrada in entradas
+            ],
+        )
+
+    def listar_por_empleado(
+        self,
+        empleado_id: int,
+        desde: Optional[datetime] = None,
+        hasta: Optional[datetime] = None,
+        limite: int = 100,
+    ) -> List[EntradaAuditoria]:
+        # Rango sobre idx_auditoria_empleado_fecha recorrido hacia atrás: lee `limite` entradas aunque haya años de historia
+        condiciones, params = ["empleado_id = ?"], [empleado_id]
+        if desde is not None:
+            condiciones.append("fecha >= ?")
+            params.append(self.orm.valor_fecha(desde))
+        if hasta is not None:
+            condiciones.append("fecha < ?")
+            params.append(self.orm.valor_fecha(hasta))
+        sql = (
+            "SELECT id, fecha, empleado_id, operacion, entidad, entidad_id, cambios FROM auditoria"
+            f" WHERE {' AND '.join(condiciones)} ORDER BY fecha DESC, id DESC LIMIT ?"  # nosec B608
+        )
+        return self._mapper.mapear(*self.orm.execute_custom_query_rows(sql, tuple(params) + (limite,)))
@@ -1,9 +1,19 @@
 import sys
-from datetime import datetime
+from typing import Optional
 
 from ..application.auth_service import AuthService
-from ..application.services import ItemBibliotecaService, MultaService, PrestamoService, ReservaService, UsuarioService
+from ..application.loaders import Cargadores
+from ..application.services import (
+    AuditoriaService,
+    ItemBibliotecaService,
+    MultaService,
+    PrestamoService,
+    ReservaService,
+    UsuarioService,
+)
 from ..domain.entities import CategoriaItem, TipoUsuario
+from ..shared.exceptions import ItemsNoDisponiblesException
+from ..shared.instrumentation import perfilar_acciones
 from ..shared.logger import get_logger
 from ..shared.menu_utils import (
     MenuItem,
@@ -15,8 +25,10 @@ from ..shared.menu_utils import (
     show_success,
     show_warning,
 )
+from ..shared.metrics import get_metrics
 
 
+@perfilar_acciones(excluir=("ejecutar",))
 class ConsoleUI:
     def __init__(
         self,
@@ -26,6 +38,8 @@ class ConsoleUI:
         reserva_service: ReservaService,
         multa_service: MultaService,
         auth_service: AuthService,
+        auditoria_service: Optional[AuditoriaService] = None,
+        query_stats=None,
     ):
         self.usuario_service = usuario_service
         self.item_service = item_service
@@ -33,8 +47,24 @@ class ConsoleUI:
         self.reserva_service = reserva_service
         self.multa_service = multa_service
         self.auth_service = auth_service
+        self.auditoria_service = auditoria_service
+        self.query_stats = query_stats
         self.logger = get_logger()
 
+    def _nuevos_cargadores(self) -> Cargadores:
+        """Cargadores por lotes con vida limitada a la acción en curso"""
+        return Cargadores(self.usuario_service, self.item_service, self.auth_service)
+
+    @staticmethod
+    def _nombre_usuario(cargadores: Cargadores, usuario_id: int) -> str:
+        usuario = cargadores.usuarios.cargar(usuario_id)
+        return f"{usuario.nombre} {usuario.apellido}" if usuario else f"Usuario #{usuario_id}"
+
+    @staticmethod
+    def _titulo_item(cargadores: Cargadores, item_id: int) -> str:
+        item = cargadores.items.cargar(item_id)
+        return item.titulo if item else f"Item #{item_id}"
+
     def mostrar_menu_principal(self):
         opciones = [
             ("👤 Gestión de Usuarios", "1", "Registrar, buscar y gestionar usuarios del sistema"),
@@ -88,6 +118,8 @@ class ConsoleUI:
             ("Devolver item", "2", "Registrar devolución de item prestado"),
             ("Listar préstamos activos", "3", "Ver todos los préstamos vigentes"),
             ("Historial de préstamos de usuario", "4", "Consultar historial de préstamos"),
+            ("Devolución por lote (buzón)", "5", "Registrar de una vez varios items devueltos"),
+            ("Préstamo múltiple", "6", "Prestar varios items a un mismo usuario"),
             ("Volver al menú principal", "0", "Regresar al menú principal"),
         ]
 
@@ -135,11 +167,11 @@ class ConsoleUI:
             )
 
             show_success(f"Usuario registrado exitosamente con ID: {usuario.id}")
-            self.logger.info(f"Usuario registrado: {usuario.email}")
+            self.logger.info("Usuario registrado: %s", usuario.email)
 
         except Exception as e:
             show_error(f"Error: {str(e)}")
-            self.logger.error(f"Error al registrar usuario: {str(e)}")
+            self.logger.error("Error al registrar usuario: %s", e)
 
     def agregar_item(self):
         try:
@@ -186,11 +218,11 @@ class ConsoleUI:
             )
 
             show_success(f"Item agregado exitosamente con ID: {item.id}")
-            self.logger.info(f"Item agregado: {item.titulo}")
+            self.logger.info("Item agregado: %s", item.titulo)
 
         except Exception as e:
             show_error(f"Error: {str(e)}")
-            self.logger.error(f"Error al agregar item: {str(e)}")
+            self.logger.error("Error al agregar item: %s", e)
 
     def realizar_prestamo(self):
         try:
@@ -271,11 +303,26 @@ class ConsoleUI:
             show_info(f"ID Préstamo: {prestamo.id}")
             show_info(f"Fecha devolución: {prestamo.fecha_devolucion_esperada.strftime('%d/%m/%Y')}")
 
-            self.logger.info(f"Préstamo realizado: Usuario {usuario_seleccionado.email}, Item {item_seleccionado.titulo}")
+            self.logger.info("Préstamo realizado: Usuario %s, Item %s", usuario_seleccionado.email, item_seleccionado.titulo)
 
         except Exception as e:
             show_error(f"Error: {str(e)}")
-            self.logger.error(f"Error al realizar préstamo: {str(e)}")
+            self.logger.error("Error al realizar préstamo: %s", e)
+
+    def mostrar_resumen_cuenta(self, usuario_id: int):
+        """Préstamos, reservas y multas del usuario de un vistazo"""
+        try:
+            resumen = self.usuario_service.resumen_cuenta(usuario_id)
+            vence = resumen.proximo_vencimiento.strftime("%d/%m/%Y") if resumen.proximo_vencimiento else "-"
+            print(f"  📚 Préstamos activos: {resumen.prestamos_activos} (vencidos: {resumen.prestamos_vencidos})")
+            print(f"  📅 Próximo vencimiento: {vence}")
+            print(f"  🔖 Reservas activas: {resumen.reservas_activas} (para retirar: {resumen.reservas_para_retirar})")
+            print(f"  💰 Multas pendientes: {resumen.multas_pendientes} (${resumen.saldo_pendiente:.2f})")
+            if not resumen.activo:
+                show_warning("Usuario inactivo")
+        except Exception as e:
+            show_error(f"Error al consultar la cuenta: {str(e)}")
+            self.logger.error("Error al consultar la cuenta: %s", e)
 
     def listar_usuarios(self):
         try:
@@ -302,7 +349,7 @@ class ConsoleUI:
 
         except Exception as e:
             show_error(f"Error: {str(e)}")
-            self.logger.error(f"Error al listar usuarios: {str(e)}")
+            self.logger.error("Error al listar usuarios: %s", e)
 
     def listar_items_disponibles(self):
         try:
@@ -329,7 +376,7 @@ class ConsoleUI:
 
         except Exception as e:
             show_error(f"Error: {str(e)}")
-            self.logger.error(f"Error al listar items: {str(e)}")
+            self.logger.error("Error al listar items: %s", e)
 
     def mostrar_login(self):
         """Muestra la pantalla de login para empleados"""
@@ -413,7 +460,7 @@ class ConsoleUI:
                 sys.exit(0)
             except Exception as e:
                 show_error(f"Error inesperado: {str(e)}")
-                self.logger.error(f"Error inesperado: {str(e)}")
+                self.logger.error("Error inesperado: %s", e)
 
     def _menu_usuarios(self):
         while True:
@@ -433,6 +480,7 @@ class ConsoleUI:
                 usuario = self.usuario_service.buscar_usuario_por_email(email)
                 if usuario:
                     show_success(f"Usuario encontrado: {usuario.nombre} {usuario.apellido} ({usuario.tipo.value})")
+                    self.mostrar_resumen_cuenta(usuario.id)
                 else:
                     show_error("Usuario no encontrado")
             elif opcion == "3":
@@ -528,6 +576,10 @@ class ConsoleUI:
                     show_warning("No hay préstamos activos")
             elif opcion == "4":
                 self.historial_prestamos_usuario()
+            elif opcion == "5":
+                self.devolver_items_buzon()
+            elif opcion == "6":
+                self.realizar_prestamo_multiple()
             else:
                 show_error("Opción inválida")
 
@@ -568,6 +620,7 @@ class ConsoleUI:
             ("Reporte de usuarios activos", "3", "Usuarios con mayor actividad"),
             ("Reporte de multas del mes", "4", "Multas generadas en el período"),
             ("Auditoria de operaciones", "5", "Log de operaciones por empleado"),
+            ("Métricas de rendimiento", "6", "Volcado de métricas en formato Prometheus"),
             ("Volver al menú principal", "0", "Regresar al menú principal"),
         ]
 
@@ -642,11 +695,77 @@ class ConsoleUI:
                 self.reporte_multas_mes()
             elif opcion == "5":
                 self.auditoria_operaciones()
+            elif opcion == "6":
+                self.mostrar_metricas()
             else:
                 show_error("Opción inválida")
 
     # =============== FUNCIONALIDADES DE PRÉSTAMOS ===============
 
+    def realizar_prestamo_multiple(self):
+        """Presta varios items a un usuario en una sola operación (todo o nada)"""
+        try:
+            empleado_actual = self.auth_service.get_empleado_actual()
+            if not empleado_actual:
+                show_error("Error: No hay empleado logueado")
+                return
+
+            usuario_seleccionado = select_from_list(
+                title="Seleccione el usuario para el préstamo",
+                items=self.usuario_service.listar_usuarios(),
+                display_func=lambda u: f"{u.nombre} {u.apellido} ({u.email})",
+                value_func=lambda u: u,
+                description_func=lambda u: f"Tipo: {u.tipo.value} - ID: {u.numero_identificacion}",
+                allow_cancel=True,
+            )
+            if not usuario_seleccionado:
+                show_warning("Préstamo cancelado")
+                return
+
+            entrada = input("IDs de los items a prestar (separados por coma o espacio): ")
+            item_ids = [int(valor) for valor in entrada.replace(",", " ").split()]
+            dias = input("Días de préstamo (15 por defecto): ").strip()
+
+            prestamos = self.prestamo_service.realizar_prestamos(
+                usuario_seleccionado.id, item_ids, empleado_actual.id, int(dias) if dias else 15
+            )
+
+            show_success(f"Se prestaron {len(prestamos)} items a {usuario_seleccionado.nombre_completo()}")
+            show_info(f"Fecha devolución: {prestamos[0].fecha_devolucion_esperada.strftime('%d/%m/%Y')}")
+            self.logger.info("Préstamo múltiple: Usuario %s, %s items", usuario_seleccionado.email, len(prestamos))
+
+        except ItemsNoDisponiblesException as e:
+            show_error("No se realizó ningún préstamo")
+            for item_id, motivo in e.fallidos.items():
+                show_warning(f"Item {item_id}: {motivo}")
+        except Exception as e:
+            show_error(f"Error: {str(e)}")
+            self.logger.error("Error en préstamo múltiple: %s", e)
+
+    def devolver_items_buzon(self):
+        """Registra en una sola operación los items encontrados en el buzón de devoluciones"""
+        try:
+            entrada = input("IDs de los items devueltos (separados por coma o espacio): ")
+            item_ids = [int(valor) for valor in entrada.replace(",", " ").split()]
+            if not item_ids:
+                show_warning("No se ingresaron items")
+                return
+
+            resultados = self.prestamo_service.devolver_items(item_ids=item_ids)
+
+            devueltos = [r for r in resultados if r.devuelto]
+            for resultado in resultados:
+                if not resultado.devuelto:
+                    show_warning(f"Item {resultado.item_id}: {resultado.motivo}")
+                elif resultado.multa:
+                    show_warning(f"Item {resultado.item_id}: devolución tardía, multa de ${resultado.multa:.2f}")
+            show_success(f"Devoluciones registradas: {len(devueltos)} de {len(resultados)}")
+            self.logger.info("Devolución por lote: %s de %s items", len(devueltos), len(resultados))
+
+        except Exception as e:
+            show_error(f"Error al procesar el buzón de devoluciones: {str(e)}")
+            self.logger.error("Error en devolución por lote: %s", e)
+
     def devolver_item(self):
         """Registra la devolución de un item prestado"""
         try:
@@ -656,12 +775,19 @@ class ConsoleUI:
                 show_warning("No hay préstamos activos para devolver")
                 return
 
+            cargadores = self._nuevos_cargadores()
+            cargadores.usuarios.encolar(p.usuario_id for p in prestamos_activos)
+            cargadores.items.encolar(p.item_id for p in prestamos_activos)
+
             prestamo_seleccionado = select_from_list(
                 title="Seleccione el préstamo a devolver:",
                 items=prestamos_activos,
-                display_func=lambda p: f"Préstamo #{p.id} - Usuario: {p.usuario_id}",
+                display_func=lambda p: f"Préstamo #{p.id} - Usuario: {self._nombre_usuario(cargadores, p.usuario_id)}",
                 value_func=lambda p: p,
-                description_func=lambda p: f"Item: {p.item_id} - Vence: {p.fecha_devolucion_esperada.strftime('%d/%m/%Y')}",
+                description_func=lambda p: (
+                    f"Item: {self._titulo_item(cargadores, p.item_id)}"
+                    f" - Vence: {p.fecha_devolucion_esperada.strftime('%d/%m/%Y')}"
+                ),
                 allow_cancel=True,
             )
 
@@ -685,13 +811,13 @@ class ConsoleUI:
                     ).days
                     show_warning(f"Devolución tardía: {dias_atraso} días de atraso - Se generó multa automáticamente")
 
-                self.logger.info(f"Devolución registrada: Préstamo {prestamo_seleccionado.id}")
+                self.logger.info("Devolución registrada: Préstamo %s", prestamo_seleccionado.id)
             else:
                 show_warning("Devolución cancelada")
 
         except Exception as e:
             show_error(f"Error al devolver item: {str(e)}")
-            self.logger.error(f"Error al devolver item: {str(e)}")
+            self.logger.error("Error al devolver item: %s", e)
 
     def historial_prestamos_usuario(self):
         """Consulta el historial de préstamos de un usuario específico"""
@@ -722,6 +848,9 @@ class ConsoleUI:
                 )
                 return
 
+            cargadores = self._nuevos_cargadores()
+            cargadores.items.encolar(p.item_id for p in prestamos)
+
             print(f"\n📚 HISTORIAL DE PRÉSTAMOS - {usuario_seleccionado.nombre} {usuario_seleccionado.apellido}")
             print("=" * 80)
 
@@ -731,7 +860,7 @@ class ConsoleUI:
                     prestamo.fecha_devolucion_real.strftime("%d/%m/%Y") if prestamo.fecha_devolucion_real else "Pendiente"
                 )
 
-                print(f"Préstamo #{prestamo.id} - Item ID: {prestamo.item_id}")
+                print(f"Préstamo #{prestamo.id} - {self._titulo_item(cargadores, prestamo.item_id)}")
                 print(f"  📅 Fecha préstamo: {prestamo.fecha_prestamo.strftime('%d/%m/%Y')}")
                 print(f"  ⏰ Fecha esperada: {prestamo.fecha_devolucion_esperada.strftime('%d/%m/%Y')}")
                 print(f"  🔄 Fecha devolución: {fecha_dev}")
@@ -744,7 +873,7 @@ class ConsoleUI:
 
         except Exception as e:
             show_error(f"Error al consultar historial: {str(e)}")
-            self.logger.error(f"Error al consultar historial: {str(e)}")
+            self.logger.error("Error al consultar historial: %s", e)
 
     # =============== FUNCIONALIDADES DE RESERVAS ===============
 
@@ -816,18 +945,18 @@ class ConsoleUI:
                 show_info(f"ID Reserva: {reserva.id}")
                 show_info(f"Fecha expiración: {reserva.fecha_expiracion.strftime('%d/%m/%Y')}")
 
-                self.logger.info(f"Reserva creada: Usuario {usuario_seleccionado.email}, Item {item_seleccionado.titulo}")
+                self.logger.info("Reserva creada: Usuario %s, Item %s", usuario_seleccionado.email, item_seleccionado.titulo)
             else:
                 show_warning("Reserva cancelada")
 
         except Exception as e:
             show_error(f"Error al crear reserva: {str(e)}")
-            self.logger.error(f"Error al crear reserva: {str(e)}")
+            self.logger.error("Error al crear reserva: %s", e)
 
     def listar_reservas_activas(self):
         """Ver todas las reservas vigentes"""
         try:
-            reservas = self.reserva_service.listar_reservas_activas()
+            reservas = self.reserva_service.listar_reservas_activas_detalle()
 
             if not reservas:
                 show_warning("No hay reservas activas")
@@ -838,18 +967,18 @@ class ConsoleUI:
 
             for reserva in reservas:
                 print(f"Reserva #{reserva.id}")
-                print(f"  👤 Usuario ID: {reserva.usuario_id}")
-                print(f"  📚 Item ID: {reserva.item_id}")
+                print(f"  👤 Usuario: {reserva.usuario_nombre or reserva.usuario_id}")
+                print(f"  📚 Item: {reserva.item_titulo or reserva.item_id}")
                 print(f"  📅 Fecha reserva: {reserva.fecha_reserva.strftime('%d/%m/%Y')}")
                 print(f"  ⏰ Expira: {reserva.fecha_expiracion.strftime('%d/%m/%Y')}")
-                print(f"  👔 Empleado: {reserva.empleado_id}")
+                print(f"  👔 Empleado: {reserva.empleado_nombre or reserva.empleado_id}")
                 print("-" * 50)
 
             input("\\nPresione Enter para continuar...")
 
         except Exception as e:
             show_error(f"Error al listar reservas: {str(e)}")
-            self.logger.error(f"Error al listar reservas: {str(e)}")
+            self.logger.error("Error al listar reservas: %s", e)
 
     def cancelar_reserva(self):
         """Cancelar una reserva existente"""
@@ -877,25 +1006,72 @@ class ConsoleUI:
                 self.reserva_service.cancelar_reserva(reserva_seleccionada.id)
 
                 show_success("Reserva cancelada exitosamente")
-                self.logger.info(f"Reserva cancelada: {reserva_seleccionada.id}")
+                self.logger.info("Reserva cancelada: %s", reserva_seleccionada.id)
             else:
                 show_warning("Cancelación cancelada")
 
         except Exception as e:
             show_error(f"Error al cancelar reserva: {str(e)}")
-            self.logger.error(f"Error al cancelar reserva: {str(e)}")
+            self.logger.error("Error al cancelar reserva: %s", e)
 
     def convertir_reserva_prestamo(self):
         """Procesar reserva cuando item esté disponible"""
-        show_warning("🚧 Funcionalidad en desarrollo - Conversión de reserva a préstamo")
-        # Esta funcionalidad requiere lógica adicional en los servicios
+        try:
+            reservas = self.reserva_service.listar_reservas_activas_detalle()
+
+            if not reservas:
+                show_warning("No hay reservas activas para convertir")
+                return
+
+            reserva_seleccionada = select_from_list(
+                title="Seleccione la reserva a retirar:",
+                items=reservas,
+                display_func=lambda r: f"Reserva #{r.id} - {r.usuario_nombre or r.usuario_id}",
+                value_func=lambda r: r,
+                description_func=lambda r: (
+                    f"Item: {r.item_titulo or r.item_id} - Expira: {r.fecha_expiracion.strftime('%d/%m/%Y')}"
+                ),
+                allow_cancel=True,
+            )
+
+            if not reserva_seleccionada:
+                show_warning("Conversión cancelada")
+                return
+
+            dias_input = input("Días de préstamo (15 por defecto): ").strip()
+            dias_prestamo = int(dias_input) if dias_input else 15
+
+            empleado_actual = self.auth_service.get_empleado_actual()
+            if not empleado_actual:
+                show_error("Error: No hay empleado logueado")
+                return
+
+            if confirm_action(
+                f"¿Confirmar préstamo de '{reserva_seleccionada.item_titulo}' para {reserva_seleccionada.usuario_nombre}?",
+                default=True,
+            ):
+                prestamo = self.reserva_service.convertir_en_prestamo(
+                    reserva_seleccionada.id, empleado_actual.id, dias_prestamo=dias_prestamo
+                )
+
+                show_success("Reserva convertida en préstamo exitosamente")
+                show_info(f"ID Préstamo: {prestamo.id}")
+                show_info(f"Fecha devolución: {prestamo.fecha_devolucion_esperada.strftime('%d/%m/%Y')}")
+
+                self.logger.info("Reserva %s convertida en préstamo %s", reserva_seleccionada.id, prestamo.id)
+            else:
+                show_warning("Conversión cancelada")
+
+        except Exception as e:
+            show_error(f"Error al convertir reserva: {str(e)}")
+            self.logger.error("Error al convertir reserva: %s", e)
 
     # =============== FUNCIONALIDADES DE MULTAS ===============
 
     def listar_multas_pendientes(self):
         """Ver multas no pagadas del sistema"""
         try:
-            multas = self.multa_service.listar_multas_pendientes()
+            multas = self.multa_service.listar_multas_pendientes_detalle()
 
             if not multas:
                 show_success("No hay multas pendientes en el sistema")
@@ -908,19 +1084,19 @@ class ConsoleUI:
 
             for multa in multas:
                 print(f"Multa #{multa.id}")
-                print(f"  👤 Usuario ID: {multa.usuario_id}")
-                print(f"  📚 Préstamo ID: {multa.prestamo_id}")
+                print(f"  👤 Usuario: {multa.usuario_nombre or multa.usuario_id}")
+                print(f"  📚 Préstamo #{multa.prestamo_id}: {multa.item_titulo or 'Item desconocido'}")
                 print(f"  💵 Monto: ${multa.monto:.2f}")
                 print(f"  📝 Descripción: {multa.descripcion}")
                 print(f"  📅 Fecha multa: {multa.fecha_multa.strftime('%d/%m/%Y')}")
-                print(f"  👔 Empleado: {multa.empleado_id}")
+                print(f"  👔 Empleado: {multa.empleado_nombre or multa.empleado_id}")
                 print("-" * 50)
 
             input("\\nPresione Enter para continuar...")
 
         except Exception as e:
             show_error(f"Error al listar multas: {str(e)}")
-            self.logger.error(f"Error al listar multas: {str(e)}")
+            self.logger.error("Error al listar multas: %s", e)
 
     def buscar_multas_usuario(self):
         """Consultar multas de un usuario específico"""
@@ -965,11 +1141,19 @@ class ConsoleUI:
                 print(f"  📅 Fecha: {multa.fecha_multa.strftime('%d/%m/%Y')}")
                 print("-" * 40)
 
-            input("\\nPresione Enter para continuar...")
+            if multas_pendientes and confirm_action(
+                f"¿Registrar el pago de las {len(multas_pendientes)} multas pendientes (${total_pendiente:.2f})?",
+                default=False,
+            ):
+                pago = self.multa_service.pagar_multas_usuario(usuario_seleccionado.id)
+                show_success(f"Pago registrado: {pago.pagadas} multas - ${pago.monto_pagado:.2f}")
+                self.logger.info("Pago de multas del usuario %s: %s", usuario_seleccionado.id, list(pago.multa_ids))
+            else:
+                input("\\nPresione Enter para continuar...")
 
         except Exception as e:
             show_error(f"Error al buscar multas: {str(e)}")
-            self.logger.error(f"Error al buscar multas: {str(e)}")
+            self.logger.error("Error al buscar multas: %s", e)
 
     def registrar_pago_multa(self):
         """Marcar multa como pagada"""
@@ -999,13 +1183,13 @@ class ConsoleUI:
                 multa_actualizada = self.multa_service.pagar_multa(multa_seleccionada.id)
 
                 show_success(f"Pago registrado exitosamente - ${multa_actualizada.monto:.2f}")
-                self.logger.info(f"Pago de multa registrado: {multa_seleccionada.id}")
+                self.logger.info("Pago de multa registrado: %s", multa_seleccionada.id)
             else:
                 show_warning("Pago cancelado")
 
         except Exception as e:
             show_error(f"Error al registrar pago: {str(e)}")
-            self.logger.error(f"Error al registrar pago: {str(e)}")
+            self.logger.error("Error al registrar pago: %s", e)
 
     def generar_reporte_multas(self):
         """Crear reporte de multas del período"""
@@ -1016,7 +1200,7 @@ class ConsoleUI:
     def reporte_prestamos_activos(self):
         """Items actualmente prestados"""
         try:
-            prestamos = self.prestamo_service.listar_prestamos_activos()
+            prestamos = self.prestamo_service.listar_prestamos_activos_detalle()
 
             if not prestamos:
                 show_success("No hay préstamos activos")
@@ -1026,22 +1210,22 @@ class ConsoleUI:
             print("=" * 80)
 
             for prestamo in prestamos:
-                dias_restantes = (prestamo.fecha_devolucion_esperada - datetime.now()).days
+                dias_restantes = prestamo.dias_restantes()
                 estado_tiempo = "⚠️ Vencido" if dias_restantes < 0 else f"📅 {dias_restantes} días restantes"
 
                 print(f"Préstamo #{prestamo.id}")
-                print(f"  👤 Usuario ID: {prestamo.usuario_id}")
-                print(f"  📚 Item ID: {prestamo.item_id}")
+                print(f"  👤 Usuario: {prestamo.usuario_nombre or prestamo.usuario_id} ({prestamo.usuario_email})")
+                print(f"  📚 Item: {prestamo.item_titulo or prestamo.item_id}")
                 print(f"  📅 Prestado: {prestamo.fecha_prestamo.strftime('%d/%m/%Y')}")
                 print(f"  ⏰ Vence: {prestamo.fecha_devolucion_esperada.strftime('%d/%m/%Y')} - {estado_tiempo}")
-                print(f"  👔 Empleado: {prestamo.empleado_id}")
+                print(f"  👔 Empleado: {prestamo.empleado_nombre or prestamo.empleado_id}")
                 print("-" * 50)
 
             input("\\nPresione Enter para continuar...")
 
         except Exception as e:
             show_error(f"Error al generar reporte: {str(e)}")
-            self.logger.error(f"Error al generar reporte: {str(e)}")
+            self.logger.error("Error al generar reporte: %s", e)
 
     def estadisticas_uso(self):
         """Items más solicitados y estadísticas"""
@@ -1067,20 +1251,51 @@ class ConsoleUI:
             print(f"📧 Email: {empleado_actual.email}")
             print(f"🕐 Turno: {empleado_actual.turno}")
 
+            empleado_id = empleado_actual.id
             if empleado_actual.cargo == "Bibliotecario Jefe":
-                print("\\n🔐 Como Bibliotecario Jefe tiene acceso a:")
-                print("  • Gestión de empleados")
-                print("  • Reportes completos del sistema")
-                print("  • Auditoria total de operaciones")
+                # El jefe puede auditar a cualquier empleado; el resto, solo sus propias operaciones
+                otro = input("\nID de empleado a auditar (Enter para el actual): ").strip()
+                empleado_id = int(otro) if otro else empleado_id
 
-            print("\\n📝 Funcionalidad completa de auditoría en desarrollo...")
-            print("Las operaciones se registran automáticamente en logs del sistema.")
+            if not self.auditoria_service:
+                show_warning("La auditoría está deshabilitada (AUDIT_ENABLED=false)")
+            else:
+                entradas = self.auditoria_service.listar_por_empleado(empleado_id)
+                print(f"\n📝 Últimas {len(entradas)} modificaciones del empleado {empleado_id}:")
+                for entrada in entradas:
+                    entidad = f"{entrada.entidad} #{entrada.entidad_id}" if entrada.entidad_id else entrada.entidad
+                    print(f"  {entrada.fecha.strftime('%d/%m/%Y %H:%M:%S')}  {entrada.operacion}  {entidad}")
+                    for campo, (antes, despues) in entrada.cambios.items():
+                        print(f"      {campo}: {antes} → {despues}")
 
             input("\\nPresione Enter para continuar...")
 
         except Exception as e:
             show_error(f"Error en auditoría: {str(e)}")
-            self.logger.error(f"Error en auditoría: {str(e)}")
+            self.logger.error("Error en auditoría: %s", e)
+
+    def mostrar_metricas(self):
+        """Volcado de métricas en formato Prometheus"""
+        try:
+            print("\n📈 MÉTRICAS DE RENDIMIENTO")
+            print("=" * 80)
+            print(get_metrics().render_prometheus() or "Sin métricas registradas todavía")
+
+            if self.query_stats:
+                print("\n🐢 CONSULTAS CON MAYOR TIEMPO ACUMULADO")
+                print("=" * 80)
+                for r in self.query_stats.resumen(limite=10):
+                    print(
+                        f"{r.llamadas:>7} llamadas | total {r.total_ms:9.1f} ms | p50 {r.p50_ms:7.2f} | "
+                        f"p95 {r.p95_ms:7.2f} | p99 {r.p99_ms:7.2f} ms"
+                    )
+                    print(f"    {r.huella}")
+
+            input("\nPresione Enter para continuar...")
+
+        except Exception as e:
+            show_error(f"Error al mostrar métricas: {str(e)}")
+            self.logger.error("Error al mostrar métricas: %s", e)
 
     # =============== FUNCIONALIDADES DE ITEMS ADICIONALES ===============
 
@@ -1126,7 +1341,13 @@ class ConsoleUI:
 
                 opciones_items = []
                 for item in items:
-                    estado_emoji = {"disponible": "✅", "prestado": "📤", "en_reparacion": "🔧", "perdido": "❌"}
+                    estado_emoji = {
+                        "disponible": "✅",
+                        "prestado": "📤",
+                        "en_reparacion": "🔧",
+                        "perdido": "❌",
+                        "reservado": "📌",
+                    }
                     emoji = estado_emoji.get(item.estado.value, "❓")
                     opciones_items.append(
                         MenuItem(
@@ -1155,12 +1376,18 @@ class ConsoleUI:
 
         except Exception as e:
             show_error(f"Error al listar por categoría: {str(e)}")
-            self.logger.error(f"Error al listar por categoría: {str(e)}")
+            self.logger.error("Error al listar por categoría: %s", e)
 
     def mostrar_detalles_item(self, item):
         """Muestra detalles completos de un item"""
         try:
-            estado_emoji = {"disponible": "✅", "prestado": "📤", "en_reparacion": "🔧", "perdido": "❌"}
+            estado_emoji = {
+                "disponible": "✅",
+                "prestado": "📤",
+                "en_reparacion": "🔧",
+                "perdido": "❌",
+                "reservado": "📌",
+            }
             emoji = estado_emoji.get(item.estado.value, "❓")
 
             print("\\n📖 DETALLES DEL ITEM")
@@ -1199,4 +1426,4 @@ class ConsoleUI:
 
         except Exception as e:
             show_error(f"Error al mostrar detalles: {str(e)}")
-            self.logger.error(f"Error al mostrar detalles: {str(e)}")
+            self.logger.error("Error al mostrar detalles: %s", e)
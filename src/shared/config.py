@@ -1,14 +1,18 @@
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 
 @dataclass
 class DatabaseConfig:
     path: str = "data/biblioteca.db"
+    slow_query_ms: float = 100.0
 
     @classmethod
     def from_env(cls) -> "DatabaseConfig":
-        return cls(path=os.getenv("DB_PATH", cls.path))
+        return cls(
+            path=os.getenv("DB_PATH", cls.path),
+            slow_query_ms=float(os.getenv("SLOW_QUERY_MS", cls.slow_query_ms)),
+        )
 
 
 @dataclass
@@ -16,8 +20,12 @@ class BibliotecaConfig:
     dias_prestamo_default: int = 15
     dias_reserva_default: int = 3
     multa_por_dia_atraso: float = 50.0
-    max_prestamos_simultaneos: int = 3
+    max_prestamos_simultaneos: int = 3  # Alumnos y cualquier tipo sin límite propio
+    # Los docentes retiran carros de 20-30 items didácticos (realizar_prestamos); el personal, material de trabajo
+    max_prestamos_docente: int = 30
+    max_prestamos_bibliotecario: int = 10
     max_reservas_simultaneas: int = 2
+    prioridad_reserva_docente: bool = True  # Los docentes pasan primero en la cola de reservas de un item
 
     @classmethod
     def from_env(cls) -> "BibliotecaConfig":
@@ -26,7 +34,71 @@ class BibliotecaConfig:
             dias_reserva_default=int(os.getenv("DIAS_RESERVA_DEFAULT", cls.dias_reserva_default)),
             multa_por_dia_atraso=float(os.getenv("MULTA_POR_DIA_ATRASO", cls.multa_por_dia_atraso)),
             max_prestamos_simultaneos=int(os.getenv("MAX_PRESTAMOS_SIMULTANEOS", cls.max_prestamos_simultaneos)),
+            max_prestamos_docente=int(os.getenv("MAX_PRESTAMOS_DOCENTE", cls.max_prestamos_docente)),
+            max_prestamos_bibliotecario=int(os.getenv("MAX_PRESTAMOS_BIBLIOTECARIO", cls.max_prestamos_bibliotecario)),
             max_reservas_simultaneas=int(os.getenv("MAX_RESERVAS_SIMULTANEAS", cls.max_reservas_simultaneas)),
+            prioridad_reserva_docente=os.getenv("PRIORIDAD_RESERVA_DOCENTE", "True").lower() == "true",
+        )
+
+
+@dataclass
+class LoggingConfig:
+    directory: str = "logs"
+    rotation: str = "size"  # "size" o "time"
+    max_bytes: int = 10 * 1024 * 1024
+    backup_count: int = 7
+    when: str = "midnight"
+    operaciones: bool = True
+
+    @classmethod
+    def from_env(cls) -> "LoggingConfig":
+        return cls(
+            directory=os.getenv("LOG_DIR", cls.directory),
+            rotation=os.getenv("LOG_ROTATION", cls.rotation),
+            max_bytes=int(os.getenv("LOG_MAX_BYTES", cls.max_bytes)),
+            backup_count=int(os.getenv("LOG_BACKUP_COUNT", cls.backup_count)),
+            when=os.getenv("LOG_ROTATION_WHEN", cls.when),
+            operaciones=os.getenv("OPERATION_LOG", "True").lower() == "true",
+        )
+
+
+@dataclass
+class MetricsConfig:
+    port: int = 0  # 0 deshabilita el endpoint HTTP
+    host: str = "127.0.0.1"
+
+    @classmethod
+    def from_env(cls) -> "MetricsConfig":
+        return cls(port=int(os.getenv("METRICS_PORT", cls.port)), host=os.getenv("METRICS_HOST", cls.host))
+
+
+@dataclass
+class PlanificadorConfig:
+    habilitado: bool = True
+    jitter: float = 0.1  # Fracción del intervalo de cada tarea
+    minutos_expiracion_reservas: int = 15
+
+    @classmethod
+    def from_env(cls) -> "PlanificadorConfig":
+        return cls(
+            habilitado=os.getenv("SCHEDULER_ENABLED", "True").lower() == "true",
+            jitter=float(os.getenv("SCHEDULER_JITTER", cls.jitter)),
+            minutos_expiracion_reservas=int(os.getenv("RESERVAS_EXPIRACION_MINUTOS", cls.minutos_expiracion_reservas)),
+        )
+
+
+@dataclass
+class AuditoriaConfig:
+    habilitada: bool = True
+    lote: int = 200  # Entradas que fuerzan un vaciado antes del intervalo
+    intervalo: float = 1.0  # Segundos entre vaciados del buffer
+
+    @classmethod
+    def from_env(cls) -> "AuditoriaConfig":
+        return cls(
+            habilitada=os.getenv("AUDIT_ENABLED", "True").lower() == "true",
+            lote=int(os.getenv("AUDIT_BATCH_SIZE", cls.lote)),
+            intervalo=float(os.getenv("AUDIT_FLUSH_SECONDS", cls.intervalo)),
         )
 
 
@@ -34,6 +106,10 @@ class BibliotecaConfig:
 class AppConfig:
     database: DatabaseConfig
     biblioteca: BibliotecaConfig
+    logging: LoggingConfig = field(default_factory=LoggingConfig)
+    metrics: MetricsConfig = field(default_factory=MetricsConfig)
+    planificador: PlanificadorConfig = field(default_factory=PlanificadorConfig)
+    auditoria: AuditoriaConfig = field(default_factory=AuditoriaConfig)
     debug: bool = False
 
     @classmethod
@@ -41,6 +117,10 @@ class AppConfig:
         return cls(
             database=DatabaseConfig.from_env(),
             biblioteca=BibliotecaConfig.from_env(),
+            logging=LoggingConfig.from_env(),
+            metrics=MetricsConfig.from_env(),
+            planificador=PlanificadorConfig.from_env(),
+            auditoria=AuditoriaConfig.from_env(),
             debug=os.getenv("DEBUG", "False").lower() == "true",
         )
 
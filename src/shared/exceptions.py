@@ -1,3 +1,6 @@
+from typing import Dict
+
+
 class BibliotecaException(Exception):
     pass
 
@@ -17,6 +20,15 @@ class ItemNoDisponibleException(BibliotecaException):
         super().__init__(f"El item '{titulo}' no está disponible")
 
 
+class ItemsNoDisponiblesException(BibliotecaException):
+    """Préstamo múltiple rechazado: no se prestó ninguno; `fallidos` es item_id -> motivo"""
+
+    def __init__(self, fallidos: Dict[int, str]):
+        detalle = "; ".join(f"item {item_id}: {motivo}" for item_id, motivo in fallidos.items())
+        super().__init__(f"No se realizó ningún préstamo ({detalle})")
+        self.fallidos = fallidos
+
+
 class PrestamoNoEncontradoException(BibliotecaException):
     def __init__(self, prestamo_id: int):
         super().__init__(f"Préstamo con ID {prestamo_id} no encontrado")
@@ -55,3 +67,11 @@ class MultaYaPagadaException(BibliotecaException):
 class PrestamoYaDevueltoException(BibliotecaException):
     def __init__(self):
         super().__init__("Este préstamo ya fue devuelto")
+
+
+class ConflictoConcurrenciaException(BibliotecaException):
+    def __init__(self, tabla: str, id: int, version: int):
+        super().__init__(f"El registro {id} de {tabla} fue modificado por otra operación (versión leída: {version})")
+        self.tabla = tabla
+        self.id = id
+        self.version = version
@@ -0,0 +1,173 @@
+"""
+Conteo de sentencias SQL por ámbito de ejecución y detección de patrones N+1.
+
+La capa de infraestructura notifica cada sentencia ejecutada (por su huella)
+con `registrar_consulta`; quien quiera medir un bloque abre un `QueryScope`.
+Los ámbitos viven en un ContextVar, por lo que cada hilo (y cada ámbito
+anidado) lleva su propio conteo sin bloqueos.
+
+En modo perfilado (PROFILE_QUERIES=true) cada operación de servicio y cada
+acción de consola registra además las huellas, y se advierte en el log
+cuando una misma consulta se repite dentro del ámbito (patrón N+1). En los
+tests, `presupuesto_consultas` falla si un bloque supera la cantidad de
+consultas declarada o presenta un N+1.
+"""
+
+import functools
+import os
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+UMBRAL_N_MAS_1 = int(os.getenv("PROFILE_N_PLUS_ONE_THRESHOLD", "3"))
+
+_perfilado = {"activo": os.getenv("PROFILE_QUERIES", "False").lower() == "true"}
+
+
+def perfilado_activo() -> bool:
+    return _perfilado["activo"]
+
+
+def activar_perfilado(activo: bool = True) -> None:
+    _perfilado["activo"] = activo
+
+
+class QueryScope:
+    """Ámbito que acumula las sentencias SQL ejecutadas mientras está activo"""
+
+    __slots__ = ("nombre", "total", "huellas", "_token")
+
+    def __init__(self, nombre: str = "", registrar_huellas: bool = False):
+        self.nombre = nombre
+        self.total = 0
+        self.huellas: Optional[Counter] = Counter() if registrar_huellas else None
+        self._token = None
+
+    def registrar(self, huella: str) -> None:
+        self.total += 1
+        if self.huellas is not None:
+            self.huellas[huella] += 1
+
+    def patrones_n_mas_1(self, umbral: int = UMBRAL_N_MAS_1) -> Dict[str, int]:
+        """Lecturas idénticas (misma huella) repetidas al menos `umbral` veces en el ámbito"""
+        if not self.huellas:
+            return {}
+        return {
+            huella: veces
+            for huella, veces in self.huellas.items()
+            if veces >= umbral and huella.lstrip().upper().startswith("SELECT")
+        }
+
+    def __enter__(self) -> "QueryScope":
+        self._token = _ambitos.set(_ambitos.get() + (self,))
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        _ambitos.reset(self._token)
+        self._token = None
+
+
+_ambitos: ContextVar[Tuple[QueryScope, ...]] = ContextVar("biblioteca_query_scopes", default=())
+
+
+def registrar_consulta(huella: str) -> None:
+    """Notifica una sentencia ejecutada a todos los ámbitos activos"""
+    for ambito in _ambitos.get():
+        ambito.registrar(huella)
+
+
+def ambito_actual() -> Optional[QueryScope]:
+    """Devuelve el ámbito más interno, si hay alguno activo"""
+    ambitos = _ambitos.get()
+    return ambitos[-1] if ambitos else None
+
+
+def reportar_ambito(ambito: QueryScope) -> None:
+    """Advierte en el log los patrones N+1 detectados en un ámbito perfilado"""
+    from .logger import get_logger
+
+    for huella, veces in ambito.patrones_n_mas_1().items():
+        get_logger().warning(
+            "Posible N+1 en %s: %d ejecuciones de '%s' (%d consultas en total)", ambito.nombre, veces, huella, ambito.total
+        )
+
+
+@contextmanager
+def perfilar(nombre: str) -> Iterator[Optional[QueryScope]]:
+    """Ámbito perfilado si el modo de perfilado está activo; sin costo en caso contrario"""
+    if not perfilado_activo():
+        yield None
+        return
+    with QueryScope(nombre, registrar_huellas=True) as ambito:
+        yield ambito
+    reportar_ambito(ambito)
+
+
+def perfilar_acciones(excluir: Tuple[str, ...] = ()) -> Callable[[type], type]:
+    """Decorador de clase: cada método público corre dentro de un ámbito `perfilar`"""
+
+    def decorar(cls: type) -> type:
+        for nombre, atributo in list(vars(cls).items()):
+            if nombre.startswith("_") or nombre in excluir or not callable(atributo):
+                continue
+            setattr(cls, nombre, _envolver_perfilado(atributo, f"{cls.__name__}.{nombre}"))
+        return cls
+
+    return decorar
+
+
+def _envolver_perfilado(func: Callable[..., T], nombre: str) -> Callable[..., T]:
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not perfilado_activo():
+            return func(*args, **kwargs)
+        with perfilar(nombre):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+class PresupuestoConsultasExcedido(AssertionError):
+    def __init__(self, nombre: str, maximo: int, ambito: QueryScope, patrones: Dict[str, int]):
+        detalle = "; ".join(f"{veces}x {huella}" for huella, veces in patrones.items())
+        if ambito.total > maximo:
+            mensaje = f"{nombre or 'Bloque'} ejecutó {ambito.total} consultas (presupuesto: {maximo})"
+        else:
+            mensaje = f"{nombre or 'Bloque'} presenta un patrón N+1"
+        super().__init__(f"{mensaje}. Repetidas: {detalle}" if detalle else mensaje)
+        self.ambito = ambito
+
+
+@contextmanager
+def presupuesto_consultas(
+    maximo: int, nombre: str = "", permitir_n_mas_1: bool = False, umbral: int = UMBRAL_N_MAS_1
+) -> Iterator[QueryScope]:
+    """
+    Falla (AssertionError) si el bloque ejecuta más de `maximo` sentencias
+    o, salvo `permitir_n_mas_1`, repite una misma lectura `umbral` veces.
+
+        with presupuesto_consultas(3):
+            servicio.realizar_prestamo(...)
+    """
+    with QueryScope(nombre, registrar_huellas=True) as ambito:
+        yield ambito
+    patrones = ambito.patrones_n_mas_1(umbral)
+    if ambito.total > maximo or (patrones and not permitir_n_mas_1):
+        raise PresupuestoConsultasExcedido(nombre, maximo, ambito, patrones)
+
+
+def limite_consultas(maximo: int, **opciones) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """Versión decorador de `presupuesto_consultas`, pensada para métodos de test"""
+
+    def decorar(func: Callable[..., T]) -> Callable[..., T]:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with presupuesto_consultas(maximo, nombre=func.__name__, **opciones):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorar
@@ -1,12 +1,35 @@
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
 from datetime import datetime
-from typing import Optional
+from typing import Any, Optional
+
+from .config import LoggingConfig
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler que deja el formateo del mensaje al hilo escritor"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # La cola es en proceso: el registro viaja intacto y el % se resuelve al escribirlo
+        return record
 
 
 class Logger:
+    """
+    Wrapper singleton del logger de la aplicación.
+
+    Los registros se encolan con un QueueHandler y los escribe un QueueListener
+    en un hilo de fondo, de modo que las operaciones de los servicios nunca
+    esperan por el disco. Los mensajes aceptan argumentos estilo %, que solo se
+    formatean si el nivel está habilitado.
+    """
+
     _instance: Optional["Logger"] = None
     _logger: Optional[logging.Logger] = None
+    _listener: Optional[logging.handlers.QueueListener] = None
 
     def __new__(cls) -> "Logger":
         if cls._instance is None:
@@ -18,15 +41,16 @@ class Logger:
             self._setup_logger()
 
     def _setup_logger(self):
-        self._logger = logging.getLogger("biblioteca_liskov")
-        self._logger.setLevel(logging.INFO)
+        config = LoggingConfig.from_env()
 
-        if not os.path.exists("logs"):
-            os.makedirs("logs")
+        logger = logging.getLogger("biblioteca_liskov")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
 
-        log_filename = f"logs/biblioteca_{datetime.now().strftime('%Y%m%d')}.log"
+        if not os.path.exists(config.directory):
+            os.makedirs(config.directory)
 
-        file_handler = logging.FileHandler(log_filename, encoding="utf-8")
+        file_handler = self._build_file_handler(config)
         file_handler.setLevel(logging.INFO)
 
         console_handler = logging.StreamHandler()
@@ -36,25 +60,85 @@ class Logger:
         file_handler.setFormatter(formatter)
         console_handler.setFormatter(formatter)
 
-        self._logger.addHandler(file_handler)
-        self._logger.addHandler(console_handler)
-
-    def info(self, message: str):
+        log_queue: queue.Queue = queue.Queue(-1)
+        listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+        listener.start()
+        atexit.register(self.shutdown)
+
+        logger.addHandler(DeferredQueueHandler(log_queue))
+
+        Logger._listener = listener
+        Logger._logger = logger
+
+    @staticmethod
+    def _build_file_handler(config: LoggingConfig, prefijo: str = "biblioteca", extension: str = ".log") -> logging.Handler:
+        """Crea el handler de archivo con rotación por tamaño o por tiempo"""
+        if config.rotation == "time":
+            return logging.handlers.TimedRotatingFileHandler(
+                os.path.join(config.directory, f"{prefijo}{extension}"),
+                when=config.when,
+                backupCount=config.backup_count,
+                encoding="utf-8",
+            )
+
+        log_filename = os.path.join(config.directory, f"{prefijo}_{datetime.now().strftime('%Y%m%d')}{extension}")
+        return logging.handlers.RotatingFileHandler(
+            log_filename, maxBytes=config.max_bytes, backupCount=config.backup_count, encoding="utf-8"
+        )
+
+    def shutdown(self):
+        """Vacía la cola y detiene el hilo escritor"""
+        if Logger._listener:
+            Logger._listener.stop()
+            Logger._listener = None
+
+    def is_enabled_for(self, level: int) -> bool:
+        return bool(self._logger and self._logger.isEnabledFor(level))
+
+    def info(self, message: str, *args: Any):
         if self._logger:
-            self._logger.info(message)
+            self._logger.info(message, *args)
 
-    def warning(self, message: str):
+    def warning(self, message: str, *args: Any):
         if self._logger:
-            self._logger.warning(message)
+            self._logger.warning(message, *args)
 
-    def error(self, message: str):
+    def error(self, message: str, *args: Any):
         if self._logger:
-            self._logger.error(message)
+            self._logger.error(message, *args)
 
-    def debug(self, message: str):
+    def debug(self, message: str, *args: Any):
         if self._logger:
-            self._logger.debug(message)
+            self._logger.debug(message, *args)
 
 
 def get_logger() -> Logger:
     return Logger()
+
+
+def crear_canal(nombre: str, prefijo: str, formatter: logging.Formatter, extension: str = ".log") -> logging.Logger:
+    """
+    Crea un canal de log independiente (p. ej. operaciones o consultas lentas)
+    que escribe en su propio archivo rotado desde un hilo de fondo.
+    """
+    config = LoggingConfig.from_env()
+
+    logger = logging.getLogger(f"biblioteca_liskov.{nombre}")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    if logger.handlers:
+        return logger
+
+    if not os.path.exists(config.directory):
+        os.makedirs(config.directory)
+
+    file_handler = Logger._build_file_handler(config, prefijo, extension)
+    file_handler.setFormatter(formatter)
+
+    log_queue: queue.Queue = queue.Queue(-1)
+    listener = logging.handlers.QueueListener(log_queue, file_handler)
+    listener.start()
+    atexit.register(listener.stop)
+
+    logger.addHandler(DeferredQueueHandler(log_queue))
+    return logger
@@ -0,0 +1,289 @@
+"""
+Registro de métricas en proceso con exposición en formato texto de Prometheus.
+
+Soporta contadores, gauges e histogramas de buckets fijos. Cada serie
+(combinación de etiquetas) tiene su propio lock, que en la práctica nunca
+está disputado, así que registrar una observación no serializa a los
+demás hilos. El registro global se obtiene con `get_metrics()`.
+"""
+
+import bisect
+import functools
+import inspect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+)
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _formatear_etiquetas(nombres: Sequence[str], valores: Sequence[str], extra: str = "") -> str:
+    partes = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        partes.append(extra)
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+def _formatear_numero(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if not float(valor).is_integer() else str(int(valor))
+
+
+class _Serie:
+    __slots__ = ("_lock", "valor")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.valor = 0.0
+
+    def inc(self, cantidad: float = 1.0) -> None:
+        with self._lock:
+            self.valor += cantidad
+
+    def dec(self, cantidad: float = 1.0) -> None:
+        with self._lock:
+            self.valor -= cantidad
+
+    def set(self, valor: float) -> None:
+        with self._lock:
+            self.valor = valor
+
+
+class _SerieHistograma:
+    __slots__ = ("_lock", "_limites", "cuentas", "suma", "total")
+
+    def __init__(self, limites: Tuple[float, ...]):
+        self._lock = threading.Lock()
+        self._limites = limites
+        self.cuentas = [0] * (len(limites) + 1)
+        self.suma = 0.0
+        self.total = 0
+
+    def observe(self, valor: float) -> None:
+        indice = bisect.bisect_left(self._limites, valor)
+        with self._lock:
+            self.cuentas[indice] += 1
+            self.suma += valor
+            self.total += 1
+
+
+class _Metrica:
+    tipo = ""
+
+    def __init__(self, nombre: str, descripcion: str, etiquetas: Sequence[str] = ()):
+        self.nombre = nombre
+        self.descripcion = descripcion
+        self.etiquetas = tuple(etiquetas)
+        self._series: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _nueva_serie(self) -> Any:
+        raise NotImplementedError
+
+    def labels(self, *valores: Any) -> Any:
+        clave = tuple(str(v) for v in valores)
+        serie = self._series.get(clave)
+        if serie is None:
+            if len(clave) != len(self.etiquetas):
+                raise ValueError(f"La métrica {self.nombre} espera las etiquetas {self.etiquetas}")
+            with self._lock:
+                serie = self._series.setdefault(clave, self._nueva_serie())
+        return serie
+
+    def _muestras(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lineas = [f"# HELP {self.nombre} {self.descripcion}", f"# TYPE {self.nombre} {self.tipo}"]
+        lineas.extend(self._muestras())
+        return "\n".join(lineas)
+
+
+class Counter(_Metrica):
+    tipo = "counter"
+
+    def _nueva_serie(self) -> _Serie:
+        return _Serie()
+
+    def inc(self, cantidad: float = 1.0) -> None:
+        self.labels().inc(cantidad)
+
+    def valor(self, *valores: Any) -> float:
+        return self.labels(*valores).valor
+
+    def _muestras(self) -> List[str]:
+        return [
+            f"{self.nombre}{_formatear_etiquetas(self.etiquetas, clave)} {_formatear_numero(serie.valor)}"
+            for clave, serie in list(self._series.items())
+        ]
+
+
+class Gauge(Counter):
+    tipo = "gauge"
+
+    def set(self, valor: float) -> None:
+        self.labels().set(valor)
+
+    def dec(self, cantidad: float = 1.0) -> None:
+        self.labels().dec(cantidad)
+
+
+class Histogram(_Metrica):
+    tipo = "histogram"
+
+    def __init__(
+        self, nombre: str, descripcion: str, etiquetas: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(nombre, descripcion, etiquetas)
+        self.buckets = tuple(sorted(buckets))
+
+    def _nueva_serie(self) -> _SerieHistograma:
+        return _SerieHistograma(self.buckets)
+
+    def observe(self, valor: float) -> None:
+        self.labels().observe(valor)
+
+    def _muestras(self) -> List[str]:
+        lineas = []
+        for clave, serie in list(self._series.items()):
+            acumulado = 0
+            for limite, cuenta in zip(self.buckets + (float("inf"),), serie.cuentas):
+                acumulado += cuenta
+                le = f'le="{_formatear_numero(limite)}"'
+                lineas.append(f"{self.nombre}_bucket{_formatear_etiquetas(self.etiquetas, clave, le)} {acumulado}")
+            etiquetas = _formatear_etiquetas(self.etiquetas, clave)
+            lineas.append(f"{self.nombre}_sum{etiquetas} {_formatear_numero(serie.suma)}")
+            lineas.append(f"{self.nombre}_count{etiquetas} {serie.total}")
+        return lineas
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metricas: Dict[str, _Metrica] = {}
+        self._lock = threading.Lock()
+
+    def _obtener(self, clase: type, nombre: str, *args: Any, **kwargs: Any) -> Any:
+        metrica = self._metricas.get(nombre)
+        if metrica is None:
+            with self._lock:
+                metrica = self._metricas.get(nombre)
+                if metrica is None:
+                    metrica = clase(nombre, *args, **kwargs)
+                    self._metricas[nombre] = metrica
+        if type(metrica) is not clase:
+            raise ValueError(f"La métrica {nombre} ya está registrada como {metrica.tipo}")
+        return metrica
+
+    def counter(self, nombre: str, descripcion: str, etiquetas: Sequence[str] = ()) -> Counter:
+        return self._obtener(Counter, nombre, descripcion, etiquetas)
+
+    def gauge(self, nombre: str, descripcion: str, etiquetas: Sequence[str] = ()) -> Gauge:
+        return self._obtener(Gauge, nombre, descripcion, etiquetas)
+
+    def histogram(
+        self, nombre: str, descripcion: str, etiquetas: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._obtener(Histogram, nombre, descripcion, etiquetas, buckets)
+
+    def render_prometheus(self) -> str:
+        """Devuelve todas las métricas en formato de exposición de texto de Prometheus"""
+        bloques = [metrica.render() for _, metrica in sorted(self._metricas.items())]
+        return "\n".join(bloques) + "\n" if bloques else ""
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics() -> MetricsRegistry:
+    return _registry
+
+
+def registrar_acceso_cache(cache: str, acierto: bool) -> None:
+    """Cuenta un acceso a caché; la tasa de aciertos se deriva de hit / (hit + miss)"""
+    _registry.counter("biblioteca_cache_requests_total", "Accesos a caché por resultado", ("cache", "resultado")).labels(
+        cache, "hit" if acierto else "miss"
+    ).inc()
+
+
+def medir_metodos_publicos(nombre: str, descripcion: str) -> Callable[[type], type]:
+    """
+    Decorador de clase: mide duración y errores de cada método público.
+
+    Las series se etiquetan con la clase y el método, p. ej.
+    `biblioteca_repository_seconds{clase="PrestamoRepository",metodo="listar_activos"}`.
+    """
+
+    def decorar(cls: type) -> type:
+        histograma = _registry.histogram(nombre, descripcion, ("clase", "metodo"))
+        errores = _registry.counter(f"{nombre.removesuffix('_seconds')}_errors_total", descripcion, ("clase", "metodo"))
+
+        for metodo, atributo in list(vars(cls).items()):
+            if metodo.startswith("_") or not inspect.isfunction(atributo):
+                continue
+            setattr(cls, metodo, _medir(atributo, histograma.labels(cls.__name__, metodo), errores, cls.__name__))
+        return cls
+
+    return decorar
+
+
+def _medir(func: Callable, serie: _SerieHistograma, errores: Counter, clase: str) -> Callable:
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            errores.labels(clase, func.__name__).inc()
+            raise
+        finally:
+            serie.observe(time.perf_counter() - inicio)
+
+    return wrapper
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        cuerpo = get_metrics().render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # Los scrapes periódicos no deben ensuciar la consola
+        pass
+
+
+def iniciar_servidor_metricas(puerto: int, host: str = "127.0.0.1") -> Optional[ThreadingHTTPServer]:
+    """Expone GET /metrics en un hilo de fondo; puerto 0 deshabilita el endpoint"""
+    if not puerto:
+        return None
+    servidor = ThreadingHTTPServer((host, puerto), _MetricsHandler)
+    hilo = threading.Thread(target=servidor.serve_forever, name="metrics-http", daemon=True)
+    hilo.start()
+    return servidor
@@ -0,0 +1,184 @@
+"""
+Canal de log estructurado (JSON por línea) de operaciones de servicio.
+
+Cada método público de un servicio decorado con `instrumentar_servicio`
+emite un evento con el nombre de la operación, el empleado, los IDs de
+entidades involucradas, la duración en microsegundos y la cantidad de
+sentencias SQL ejecutadas. Los eventos se escriben en
+`logs/operaciones_YYYYMMDD.jsonl` desde un hilo de fondo.
+"""
+
+import functools
+import inspect
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from .config import LoggingConfig
+from .instrumentation import QueryScope, perfilado_activo, reportar_ambito
+from .logger import crear_canal
+from .metrics import get_metrics
+
+T = TypeVar("T")
+
+
+class JsonLineFormatter(logging.Formatter):
+    """Serializa el evento (dict) del registro como una línea JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        evento = dict(record.msg) if isinstance(record.msg, dict) else {"mensaje": record.getMessage()}
+        evento.setdefault("ts", datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"))
+        return json.dumps(evento, ensure_ascii=False, default=str)
+
+
+class OperationLog:
+    _instance: Optional["OperationLog"] = None
+    _logger: Optional[logging.Logger] = None
+
+    def __new__(cls) -> "OperationLog":
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if self._logger is None:
+            self._setup_logger()
+
+    def _setup_logger(self):
+        # El evento viaja como dict; el JSON se arma en el hilo escritor
+        logger = crear_canal("operaciones", "operaciones", JsonLineFormatter(), extension=".jsonl")
+        if not LoggingConfig.from_env().operaciones:
+            logger.setLevel(logging.CRITICAL + 1)
+        OperationLog._logger = logger
+
+    def habilitado(self) -> bool:
+        return bool(self._logger and self._logger.isEnabledFor(logging.INFO))
+
+    def registrar(self, evento: Dict[str, Any]) -> None:
+        if self._logger:
+            self._logger.info(evento)
+
+
+def get_operation_log() -> OperationLog:
+    return OperationLog()
+
+
+def _extraer_ids(argumentos: Dict[str, Any]) -> Dict[str, int]:
+    """Toma los argumentos *_id y el id de las entidades recibidas"""
+    ids: Dict[str, int] = {}
+    for nombre, valor in argumentos.items():
+        if nombre == "empleado_id":
+            continue
+        if nombre.endswith("_id"):
+            if isinstance(valor, int):
+                ids[nombre] = valor
+        elif isinstance(getattr(valor, "id", None), int):
+            ids[f"{nombre}_id"] = valor.id
+    return ids
+
+
+def _evento(
+    nombre: str,
+    firma: inspect.Signature,
+    empleado_actual: Optional[Callable[[Any], Optional[int]]],
+    servicio: Any,
+    args: tuple,
+    kwargs: Dict[str, Any],
+    resultado: Any,
+    transcurrido_ns: int,
+    ambito: QueryScope,
+    estado: str,
+) -> Dict[str, Any]:
+    argumentos = firma.bind_partial(servicio, *args, **kwargs).arguments
+    argumentos.pop("self", None)
+
+    empleado_id = argumentos.get("empleado_id")
+    if not isinstance(empleado_id, int) and empleado_actual:
+        empleado_id = empleado_actual(servicio)
+
+    ids = _extraer_ids(argumentos)
+    resultado_id = getattr(resultado, "id", None)
+    if isinstance(resultado_id, int):
+        ids["resultado_id"] = resultado_id
+
+    return {
+        "operacion": nombre,
+        "empleado_id": empleado_id if isinstance(empleado_id, int) else None,
+        "ids": ids,
+        "duracion_us": transcurrido_ns // 1000,
+        "sentencias_sql": ambito.total,
+        "estado": estado,
+    }
+
+
+def registrar_operacion(
+    func: Callable[..., T], nombre: str, empleado_actual: Optional[Callable[[Any], Optional[int]]] = None
+) -> Callable[..., T]:
+    """Envuelve un método de servicio para emitir su evento de operación y sus métricas"""
+    firma = inspect.signature(func)
+    metricas = get_metrics()
+    duracion = metricas.histogram(
+        "biblioteca_service_operation_seconds", "Duración de operaciones de servicio", ("operacion",)
+    ).labels(nombre)
+    errores = metricas.counter(
+        "biblioteca_service_operation_errors_total", "Operaciones de servicio con error", ("operacion",)
+    ).labels(nombre)
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        log = get_operation_log()
+        perfilando = perfilado_activo()
+        if not perfilando and not log.habilitado():
+            inicio = time.perf_counter_ns()
+            try:
+                return func(self, *args, **kwargs)
+            except Exception:
+                errores.inc()
+                raise
+            finally:
+                duracion.observe((time.perf_counter_ns() - inicio) / 1e9)
+
+        estado = "ok"
+        resultado = None
+        inicio = time.perf_counter_ns()
+        with QueryScope(nombre, registrar_huellas=perfilando) as ambito:
+            try:
+                resultado = func(self, *args, **kwargs)
+                return resultado
+            except Exception as e:
+                estado = type(e).__name__
+                errores.inc()
+                raise
+            finally:
+                transcurrido_ns = time.perf_counter_ns() - inicio
+                duracion.observe(transcurrido_ns / 1e9)
+                if perfilando:
+                    reportar_ambito(ambito)
+                if log.habilitado():
+                    log.registrar(
+                        _evento(nombre, firma, empleado_actual, self, args, kwargs, resultado, transcurrido_ns, ambito, estado)
+                    )
+
+    return wrapper
+
+
+def instrumentar_servicio(
+    cls: Optional[type] = None, *, empleado_actual: Optional[Callable[[Any], Optional[int]]] = None
+) -> Any:
+    """
+    Decorador de clase: registra en el log de operaciones cada método público.
+
+    `empleado_actual` permite a servicios sin argumento `empleado_id`
+    (p. ej. AuthService) indicar qué empleado realiza la operación.
+    """
+
+    def decorar(servicio: type) -> type:
+        for nombre, atributo in list(vars(servicio).items()):
+            if nombre.startswith("_") or not inspect.isfunction(atributo):
+                continue
+            setattr(servicio, nombre, registrar_operacion(atributo, f"{servicio.__name__}.{nombre}", empleado_actual))
+        return servicio
+
+    return decorar(cls) if cls is not None else decorar
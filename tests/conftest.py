@@ -0,0 +1,18 @@
+"""
+Configuración común de pytest.
+
+Los servicios escriben el log de la aplicación, el de operaciones y el de
+consultas lentas en LOG_DIR; durante los tests va a un directorio temporal
+para no dejar archivos en logs/ del repositorio.
+"""
+
+import atexit
+import os
+import shutil
+import tempfile
+
+if "LOG_DIR" not in os.environ:
+    _directorio_logs = tempfile.mkdtemp(prefix="biblioteca_logs_")
+    os.environ["LOG_DIR"] = _directorio_logs
+    # atexit corre en orden inverso: los hilos escritores de los logs se detienen antes de borrar
+    atexit.register(shutil.rmtree, _directorio_logs, ignore_errors=True)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Tests de integración: auditoría persistente de las modificaciones por empleado
+"""
+
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+# Agregar el path del proyecto
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from src.application.read_models import EntradaAuditoria
+from src.container import Container
+from src.domain.entities import EstadoItem, TipoUsuario
+
+
+class TestAuditoria(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+        self.container = Container()
+        self.container._config.database.path = os.path.join(self.temp_dir, "test_auditoria.db")
+        self.container._db_connection = None
+        self.container._orm = None
+
+        self.auth_service = self.container.get_auth_service()
+        self.auditoria_service = self.container.get_auditoria_service()
+        self.empleado = self.auth_service.crear_empleado(
+            nombre="Test", apellido="Auditoria", email="auditoria@test.com", usuario_sistema="auditor", password="x"
+        )
+        self.auth_service.login("auditor", "x")
+        self.usuario = self.container.get_usuario_service().registrar_usuario(
+            nombre="Ana", apellido="Test", email="ana@test.com", tipo=TipoUsuario.ALUMNO, numero_identificacion="1"
+        )
+        self.item = self.container.get_item_service().agregar_item(titulo="Rayuela", categoria="libro")
+
+    def tearDown(self):
+        self.container.detener_auditoria()
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def _operaciones(self, empleado_id):
+        return [(e.operacion, e.entidad) for e in self.auditoria_service.listar_por_empleado(empleado_id)]
+
+    def test_cada_modificacion_queda_con_empleado_y_diff(self):
+        """Test: altas y cambios de los servicios quedan auditados, del más reciente al más antiguo, con su diff"""
+        prestamo_service = self.container.get_prestamo_service()
+        prestamo = prestamo_service.realizar_prestamo(self.usuario.id, self.item.id, self.empleado.id)
+        prestamo_service.devolver_item(prestamo.id, "Sin daños")
+        self.container.get_item_service().cambiar_estado_item(self.item.id, EstadoItem.EN_REPARACION)
+
+        entradas = self.auditoria_service.listar_por_empleado(self.empleado.id)
+
+        self.assertEqual(
+            [(e.operacion, e.entidad) for e in entradas],
+            [
+                ("ItemBibliotecaService.cambiar_estado_item", "ItemBiblioteca"),
+                ("PrestamoService.devolver_item", "Prestamo"),
+                ("PrestamoService.realizar_prestamo", "Prestamo"),
+                ("ItemBibliotecaService.agregar_item", "ItemBiblioteca"),
+                ("UsuarioService.registrar_usuario", "Usuario"),
+            ],
+        )
+        self.assertEqual(entradas[0].cambios, {"estado": ["disponible", "en_reparacion"]})
+        devolucion = entradas[1].cambios
+        self.assertEqual((devolucion["activo"], devolucion["observaciones"]), ([True, False], [None, "Sin daños"]))
+        self.assertEqual(entradas[2].entidad_id, prestamo.id)
+        self.assertEqual(entradas[2].cambios["item_id"], [None, self.item.id])
+        # El alta del empleado se hizo antes del login: no hay sesión a quien atribuirla
+        filas = self.container.get_orm().execute_custom_query("SELECT empleado_id FROM auditoria WHERE entidad = 'Empleado'")
+        self.assertEqual(filas, [{"empleado_id": None}])
+
+    def test_lotes_y_tareas_del_sistema(self):
+        """Test: las operaciones por lote dejan una entrada por entidad y las expiraciones no se atribuyen al empleado"""
+        reserva_service = self.container.get_reserva_service()
+        self.container.get_prestamo_service().realizar_prestamo(self.usuario.id, self.item.id, self.empleado.id)
+        reserva = reserva_service.realizar_reserva(self.usuario.id, self.item.id, self.empleado.id)
+
+        resumen = reserva_service.expirar_reservas(datetime.now() + timedelta(days=30))
+
+        self.assertEqual(resumen.reserva_ids, (reserva.id,))
+        self.assertNotIn(("ReservaService.expirar_reservas", "Reserva"), self._operaciones(self.empleado.id))
+        self.container.get_auditoria().vaciar()
+        orm = self.container.get_orm()
+        filas = orm.execute_custom_query(
+            "SELECT entidad_id, cambios FROM auditoria WHERE empleado_id IS NULL AND entidad = 'Reserva'"
+        )
+        self.assertEqual(filas, [{"entidad_id": reserva.id, "cambios": '{"activa": [true, false]}'}])
+
+    def test_auditoria_es_de_solo_alta(self):
+        """Test: la tabla rechaza modificar o borrar entradas"""
+        self.container.get_auditoria().vaciar()
+        db = self.container.get_orm().db
+
+        for sentencia in ("UPDATE auditoria SET empleado_id = 99", "DELETE FROM auditoria"):
+            with self.assertRaisesRegex(sqlite3.IntegrityError, "no admite cambios"):
+                db.execute_non_query(sentencia)
+        self.assertEqual(len(self.auditoria_service.listar_por_empleado(self.empleado.id)), 2)
+
+    def test_historia_larga_se_lee_por_indice(self):
+        """Test: listar un período de un empleado recorre el índice (empleado_id, fecha) sin ordenar en memoria"""
+        repo = self.container.get_auditoria_repository()
+        inicio = datetime(2020, 1, 1)
+        repo.registrar_muchas(
+            [
+                EntradaAuditoria("MultaService.pagar_multa", "Multa", i, inicio + timedelta(hours=i), 1 + i % 5)
+                for i in range(5000)
+            ]
+        )
+
+        entradas = repo.listar_por_empleado(3, desde=inicio + timedelta(days=30), hasta=inicio + timedelta(days=60), limite=10)
+
+        self.assertEqual(len(entradas), 10)
+        self.assertTrue(all(e.empleado_id == 3 for e in entradas))
+        self.assertEqual(entradas[0].fecha, inicio + timedelta(hours=1437))
+        self.assertEqual([e.fecha for e in entradas], sorted((e.fecha for e in entradas), reverse=True))
+
+        plan = self.container.get_orm().db.execute_query(
+            "EXPLAIN QUERY PLAN SELECT * FROM auditoria WHERE empleado_id = ? AND fecha >= ? AND fecha < ?"
+            " ORDER BY fecha DESC, id DESC LIMIT 10",
+            (3, 0, 1),
+        )
+        detalle = " ".join(fila["detail"] for fila in plan)
+        self.assertIn("USING INDEX idx_auditoria_empleado_fecha", detalle)
+        self.assertNotIn("TEMP B-TREE", detalle)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Tests de integración: cola de reservas por item al devolver ejemplares
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+# Agregar el path del proyecto
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from src.container import Container
+from src.domain.entities import EstadoItem, TipoUsuario
+from src.shared.exceptions import ConflictoConcurrenciaException
+from src.shared.instrumentation import presupuesto_consultas
+
+
+class TestColaReservas(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, "test_cola.db")
+        self.container = self._container()
+
+        self.prestamo_service = self.container.get_prestamo_service()
+        self.reserva_service = self.container.get_reserva_service()
+        self.reserva_repo = self.container.get_reserva_repository()
+        self.item_repo = self.container.get_item_repository()
+
+        self.empleado = self.container.get_auth_service().crear_empleado(
+            nombre="Test", apellido="Cola", email="cola@test.com", usuario_sistema="cola", password="x"
+        )
+        usuario_service = self.container.get_usuario_service()
+        self.lector, self.alumno, self.docente = [
+            usuario_service.registrar_usuario(
+                nombre=nombre, apellido="Test", email=f"{nombre}@test.com", tipo=tipo, numero_identificacion=nombre
+            )
+            for nombre, tipo in (
+                ("lector", TipoUsuario.ALUMNO),
+                ("alumno", TipoUsuario.ALUMNO),
+                ("docente", TipoUsuario.DOCENTE),
+            )
+        ]
+        item_service = self.container.get_item_service()
+        self.item = item_service.agregar_item(titulo="Rayuela", categoria="libro")
+        self.otro = item_service.agregar_item(titulo="Ficciones", categoria="libro")
+
+        self.prestamo = self.prestamo_service.realizar_prestamo(self.lector.id, self.item.id, self.empleado.id)
+        self.reserva_alumno = self.reserva_service.realizar_reserva(self.alumno.id, self.item.id, self.empleado.id)
+        self.reserva_docente = self.reserva_service.realizar_reserva(self.docente.id, self.item.id, self.empleado.id)
+
+    def tearDown(self):
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def _container(self):
+        container = Container()
+        container._config.database.path = self.db_path
+        container._db_connection = None
+        container._orm = None
+        return container
+
+    def _estado(self, item_id):
+        return self.item_repo.obtener_por_id(item_id).estado
+
+    def test_devolucion_aparta_el_ejemplar_para_el_docente(self):
+        """Test: el item devuelto queda reservado para el docente aunque haya reservado después"""
+        with presupuesto_consultas(5, nombre="devolver_item_con_reservas"):
+            self.prestamo_service.devolver_item(self.prestamo.id)
+
+        self.assertEqual(self._estado(self.item.id), EstadoItem.RESERVADO)
+        docente = self.reserva_repo.obtener_por_id(self.reserva_docente.id)
+        self.assertIsNotNone(docente.fecha_asignacion)
+        self.assertEqual(docente.fecha_expiracion.date(), (docente.fecha_asignacion + timedelta(days=3)).date())
+        self.assertIsNone(self.reserva_repo.obtener_por_id(self.reserva_alumno.id).fecha_asignacion)
+        self.assertEqual(self.container.get_cola_reservas().en_espera(self.item.id), [self.reserva_alumno.id])
+
+        with self.assertRaises(ValueError):
+            self.prestamo_service.realizar_prestamo(self.lector.id, self.item.id, self.empleado.id)
+
+    def test_devolucion_con_conflicto_no_deja_nada_a_medias(self):
+        """Test: si guardar el préstamo da conflicto (otro mostrador ya lo devolvió) no quedan multa, item ni asignación"""
+        orm = self.container.get_orm()
+        vencido = orm.valor_fecha(datetime.now() - timedelta(days=3))
+        orm.update("prestamos", {"fecha_devolucion_esperada": vencido}, "id = ?", (self.prestamo.id,))
+        conflicto = ConflictoConcurrenciaException("prestamos", self.prestamo.id, 0)
+
+        with patch.object(self.container.get_prestamo_repository(), "actualizar", side_effect=conflicto):
+            with self.assertRaises(ConflictoConcurrenciaException):
+                self.prestamo_service.devolver_item(self.prestamo.id)
+
+        self.assertEqual(self._estado(self.item.id), EstadoItem.PRESTADO)
+        self.assertEqual(self.container.get_multa_service().listar_multas_usuario(self.lector.id), [])
+        self.assertIsNone(self.reserva_repo.obtener_por_id(self.reserva_docente.id).fecha_asignacion)
+        cola = self.container.get_cola_reservas()
+        self.assertEqual(cola.en_espera(self.item.id), [self.reserva_docente.id, self.reserva_alumno.id])
+
+        self.prestamo_service.devolver_item(self.prestamo.id)
+        self.assertEqual(self._estado(self.item.id), EstadoItem.RESERVADO)
+        self.assertEqual(len(self.container.get_multa_service().listar_multas_usuario(self.lector.id)), 1)
+
+    def test_reserva_de_otro_mostrador_recibe_el_ejemplar(self):
+        """Test: una reserva creada por otro proceso, que no está en la cola en memoria de este, recibe la devolución"""
+        prestamo = self.prestamo_service.realizar_prestamo(self.lector.id, self.otro.id, self.empleado.id)
+        otro_mostrador = self._container()
+        reserva = otro_mostrador.get_reserva_service().realizar_reserva(self.alumno.id, self.otro.id, self.empleado.id)
+        self.assertEqual(self.container.get_cola_reservas().en_espera(self.otro.id), [])
+
+        self.prestamo_service.devolver_item(prestamo.id)
+
+        self.assertEqual(self._estado(self.otro.id), EstadoItem.RESERVADO)
+        self.assertIsNotNone(self.reserva_repo.obtener_por_id(reserva.id).fecha_asignacion)
+
+    def test_cancelar_o_vencer_cede_el_ejemplar(self):
+        """Test: si el primero cancela pasa al siguiente; si este no retira a tiempo el item se libera"""
+        self.prestamo_service.devolver_item(self.prestamo.id)
+
+        self.reserva_service.cancelar_reserva(self.reserva_docente.id)
+        self.assertIsNotNone(self.reserva_repo.obtener_por_id(self.reserva_alumno.id).fecha_asignacion)
+        self.assertEqual(self._estado(self.item.id), EstadoItem.RESERVADO)
+
+        resumen = self.reserva_service.expirar_reservas(datetime.now() + timedelta(days=4))
+        self.assertEqual(resumen.reserva_ids, (self.reserva_alumno.id,))
+        self.assertEqual(self._estado(self.item.id), EstadoItem.DISPONIBLE)
+
+    def test_cancelar_con_cesion_fallida_no_se_confirma(self):
+        """Test: si falla ceder el ejemplar al siguiente, la cancelación se revierte y la reserva sigue siendo su titular"""
+        self.prestamo_service.devolver_item(self.prestamo.id)
+
+        with patch.object(self.reserva_repo, "asignar_si_en_espera", side_effect=RuntimeError("falla simulada")):
+            with self.assertRaises(RuntimeError):
+                self.reserva_service.cancelar_reserva(self.reserva_docente.id)
+
+        self.assertTrue(self.reserva_repo.obtener_por_id(self.reserva_docente.id).activa)
+        self.assertEqual(self._estado(self.item.id), EstadoItem.RESERVADO)
+        self.assertEqual(self.container.get_cola_reservas().en_espera(self.item.id), [self.reserva_alumno.id])
+
+    def test_devolucion_por_lote_y_cola_persistida(self):
+        """Test: el buzón aparta solo los items con cola; la cola sobrevive a un reinicio"""
+        self.prestamo_service.realizar_prestamo(self.lector.id, self.otro.id, self.empleado.id)
+        reiniciado = self._container()
+
+        resultados = reiniciado.get_prestamo_service().devolver_items(item_ids=[self.item.id, self.otro.id])
+
+        self.assertEqual([r.reserva_id for r in resultados], [self.reserva_docente.id, None])
+        self.assertEqual(self._estado(self.item.id), EstadoItem.RESERVADO)
+        self.assertEqual(self._estado(self.otro.id), EstadoItem.DISPONIBLE)
+
+    def test_retiro_convierte_la_reserva_en_prestamo(self):
+        """Test: el titular del ejemplar apartado lo retira en una transacción de siete sentencias (incluye usuario, límite de préstamos y saldo de multas)"""
+        self.prestamo_service.devolver_item(self.prestamo.id)
+
+        with presupuesto_consultas(7, nombre="convertir_en_prestamo"):
+            prestamo = self.reserva_service.convertir_en_prestamo(self.reserva_docente.id, self.empleado.id)
+
+        self.assertEqual((prestamo.usuario_id, prestamo.item_id), (self.docente.id, self.item.id))
+        self.assertEqual(self._estado(self.item.id), EstadoItem.PRESTADO)
+        self.assertFalse(self.reserva_repo.obtener_por_id(self.reserva_docente.id).activa)
+
+    def test_retiro_fallido_no_cierra_la_reserva(self):
+        """Test: si el item sigue prestado la transacción se revierte y la reserva queda activa"""
+        with self.assertRaises(ValueError):
+            self.reserva_service.convertir_en_prestamo(self.reserva_alumno.id, self.empleado.id)
+
+        reserva = self.reserva_repo.obtener_por_id(self.reserva_alumno.id)
+        self.assertTrue(reserva.activa)
+        self.assertEqual(self._estado(self.item.id), EstadoItem.PRESTADO)
+        self.assertEqual(len(self.prestamo_service.listar_prestamos_activos()), 1)
+
+    def test_sin_prioridad_docente_respeta_el_orden_de_llegada(self):
+        """Test: con PRIORIDAD_RESERVA_DOCENTE=false el ejemplar va a quien reservó primero"""
+        fifo = self._container()
+        fifo._config.biblioteca.prioridad_reserva_docente = False
+
+        fifo.get_prestamo_service().devolver_item(self.prestamo.id)
+
+        self.assertIsNotNone(self.reserva_repo.obtener_por_id(self.reserva_alumno.id).fecha_asignacion)
+        self.assertIsNone(self.reserva_repo.obtener_por_id(self.reserva_docente.id).fecha_asignacion)
+
+
+if __name__ == "__main__":
+    unittest.main()
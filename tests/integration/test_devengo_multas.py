@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Tests de integración: devengo nocturno de multas por préstamos vencidos
+"""
+
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+from datetime import date, datetime, timedelta
+
+# Agregar el path del proyecto
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from src.container import Container
+from src.domain.entities import Prestamo
+from src.shared.instrumentation import presupuesto_consultas
+
+
+class TestDevengoMultas(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, "test_devengo.db")
+
+        self.container = Container()
+        self.container._config.database.path = self.db_path
+        self.container._db_connection = None
+        self.container._orm = None
+
+        self.multa_service = self.container.get_multa_service()
+        self.prestamo_service = self.container.get_prestamo_service()
+        self.prestamo_repo = self.container.get_prestamo_repository()
+        self.hoy = date(2024, 6, 20)
+        medianoche = datetime(2024, 6, 20)
+
+        # Usuario 1: vencido hace 3 días y hace 10 días; usuario 2: vence mañana; usuario 3: ya devuelto
+        self.vencido_3 = self._prestamo(1, medianoche - timedelta(days=3, hours=2))
+        self.vencido_10 = self._prestamo(1, medianoche - timedelta(days=10))
+        self._prestamo(2, medianoche + timedelta(days=1))
+        devuelto = self._prestamo(3, medianoche - timedelta(days=5))
+        devuelto.activo = False
+        self.prestamo_repo.actualizar(devuelto)
+
+    def tearDown(self):
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def _prestamo(self, usuario_id, vencimiento):
+        return self.prestamo_repo.crear(
+            Prestamo(
+                usuario_id=usuario_id,
+                item_id=usuario_id,
+                empleado_id=1,
+                fecha_prestamo=vencimiento - timedelta(days=15),
+                fecha_devolucion_esperada=vencimiento,
+            )
+        )
+
+    def _devengos(self):
+        with sqlite3.connect(self.db_path) as conn:
+            return dict(conn.execute("SELECT prestamo_id, monto FROM multas_devengadas").fetchall())
+
+    def test_devenga_solo_prestamos_activos_vencidos(self):
+        """Test: una corrida calcula días completos de atraso a $50 por día"""
+        with presupuesto_consultas(3, nombre="devengar_multas_por_atraso"):
+            resumen = self.multa_service.devengar_multas_por_atraso(self.hoy)
+
+        self.assertEqual(self._devengos(), {self.vencido_3.id: 150.0, self.vencido_10.id: 500.0})
+        self.assertEqual((resumen.actualizados, resumen.prestamos_vencidos, resumen.total_devengado), (2, 2, 650.0))
+        self.assertEqual(self.multa_service.total_devengado_usuario(1), 650.0)
+        self.assertEqual(self.multa_service.total_devengado_usuario(2), 0)
+
+    def test_idempotente_en_el_dia_y_acumula_al_siguiente(self):
+        """Test: repetir el mismo día no escribe; al día siguiente suma un día por préstamo"""
+        self.multa_service.devengar_multas_por_atraso(self.hoy)
+
+        repetido = self.multa_service.devengar_multas_por_atraso(self.hoy)
+        siguiente = self.multa_service.devengar_multas_por_atraso(self.hoy + timedelta(days=1))
+
+        self.assertEqual((repetido.actualizados, repetido.eliminados), (0, 0))
+        self.assertEqual(siguiente.actualizados, 2)
+        self.assertEqual(self._devengos(), {self.vencido_3.id: 200.0, self.vencido_10.id: 550.0})
+
+    def test_devolucion_saca_el_devengo(self):
+        """Test: un préstamo devuelto deja de sumar al instante y su fila se borra en la próxima corrida"""
+        self.multa_service.devengar_multas_por_atraso(self.hoy)
+
+        self.prestamo_service.devolver_items(prestamo_ids=[self.vencido_10.id])
+        self.assertEqual(self.multa_service.total_devengado_usuario(1), 150.0)
+
+        resumen = self.multa_service.devengar_multas_por_atraso(self.hoy)
+        self.assertEqual((resumen.eliminados, resumen.prestamos_vencidos, resumen.total_devengado), (1, 1, 150.0))
+
+    def test_recorre_el_indice_parcial_de_activos(self):
+        """Test: el devengo no recorre la tabla completa de préstamos"""
+        with sqlite3.connect(self.db_path) as conn:
+            plan = conn.execute(
+                "EXPLAIN QUERY PLAN SELECT id FROM prestamos WHERE activo = 1 AND fecha_devolucion_esperada <= ?", (0,)
+            ).fetchall()
+
+        self.assertIn("idx_prestamos_activos", " ".join(str(fila[3]) for fila in plan))
+
+
+if __name__ == "__main__":
+    unittest.main()
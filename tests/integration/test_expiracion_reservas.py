@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Tests de integración: barrido de reservas expiradas
+"""
+
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+# Agregar el path del proyecto
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from src.container import Container
+from src.domain.entities import Reserva
+from src.shared.instrumentation import presupuesto_consultas
+
+
+class TestExpiracionReservas(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, "test_expiracion.db")
+
+        self.container = Container()
+        self.container._config.database.path = self.db_path
+        self.container._db_connection = None
+        self.container._orm = None
+
+        self.reserva_service = self.container.get_reserva_service()
+        self.reserva_repo = self.container.get_reserva_repository()
+        self.corte = datetime(2024, 6, 20, 12, 0)
+
+        self.expiradas = [self._reserva(self.corte - timedelta(hours=h)).id for h in (1, 30, 5)]
+        self.vigente = self._reserva(self.corte + timedelta(hours=1))
+        cancelada = self._reserva(self.corte - timedelta(days=2))
+        cancelada.activa = False
+        self.reserva_repo.actualizar(cancelada)
+
+    def tearDown(self):
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def _reserva(self, expiracion):
+        return self.reserva_repo.crear(
+            Reserva(
+                usuario_id=1,
+                item_id=1,
+                empleado_id=1,
+                fecha_reserva=expiracion - timedelta(days=3),
+                fecha_expiracion=expiracion,
+            )
+        )
+
+    def test_desactiva_solo_las_expiradas_y_reporta(self):
+        """Test: las vencidas quedan inactivas (con versión nueva); la vigente y la cancelada no cambian"""
+        resumen = self.reserva_service.expirar_reservas(self.corte)
+
+        self.assertCountEqual(resumen.reserva_ids, self.expiradas)
+        self.assertEqual(resumen.lotes, 1)
+        self.assertEqual([r.id for r in self.reserva_service.listar_reservas_activas()], [self.vigente.id])
+        with sqlite3.connect(self.db_path) as conn:
+            versiones = dict(conn.execute("SELECT id, version FROM reservas WHERE activa = 0").fetchall())
+        self.assertEqual({id: versiones[id] for id in self.expiradas}, dict.fromkeys(self.expiradas, 1))
+
+    def test_lotes_acotados_en_orden_de_vencimiento(self):
+        """Test: con lote=2 se desactivan primero las que vencieron antes, en transacciones separadas"""
+        with presupuesto_consultas(5, nombre="expirar_reservas"):
+            resumen = self.reserva_service.expirar_reservas(self.corte, lote=2)
+
+        self.assertEqual(resumen.reserva_ids, (self.expiradas[1], self.expiradas[2], self.expiradas[0]))
+        self.assertEqual(resumen.lotes, 2)
+
+    def test_repetir_no_cambia_nada(self):
+        """Test: un segundo barrido con el mismo corte no encuentra reservas"""
+        self.reserva_service.expirar_reservas(self.corte)
+
+        resumen = self.reserva_service.expirar_reservas(self.corte)
+
+        self.assertEqual((resumen.desactivadas, resumen.lotes), (0, 1))
+
+    def test_reserva_modificada_en_memoria_detecta_el_barrido(self):
+        """Test: actualizar una reserva leída antes del barrido choca con la versión nueva"""
+        from src.shared.exceptions import ConflictoConcurrenciaException
+
+        reserva = self.reserva_repo.obtener_por_id(self.expiradas[0])
+        self.reserva_service.expirar_reservas(self.corte)
+
+        reserva.fecha_expiracion = self.corte + timedelta(days=1)
+        with self.assertRaises(ConflictoConcurrenciaException):
+            self.reserva_repo.actualizar(reserva)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Tests de integración: límites de préstamos y reservas simultáneos por usuario
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+# Agregar el path del proyecto
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from src.container import Container
+from src.domain.entities import TipoUsuario
+
+
+class TestLimitesUsuario(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+        self.container = Container()
+        self.container._config.database.path = os.path.join(self.temp_dir, "test_limites.db")
+        self.container._db_connection = None
+        self.container._orm = None
+        self.container._config.biblioteca.max_prestamos_simultaneos = 2
+        self.container._config.biblioteca.max_prestamos_docente = 5
+        self.container._config.biblioteca.max_reservas_simultaneas = 1
+
+        self.prestamo_service = self.container.get_prestamo_service()
+        self.reserva_service = self.container.get_reserva_service()
+
+        self.empleado = self.container.get_auth_service().crear_empleado(
+            nombre="Test", apellido="Limites", email="limites@test.com", usuario_sistema="limites", password="x"
+        )
+        usuario_service = self.container.get_usuario_service()
+        self.lector, self.otro = [
+            usuario_service.registrar_usuario(
+                nombre=nombre,
+                apellido="Test",
+                email=f"{nombre}@test.com",
+                tipo=TipoUsuario.ALUMNO,
+                numero_identificacion=nombre,
+            )
+            for nombre in ("lector", "otro")
+        ]
+        item_service = self.container.get_item_service()
+        self.items = [item_service.agregar_item(titulo=f"Libro {i}", categoria="libro") for i in range(6)]
+
+    def tearDown(self):
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def _prestar(self, usuario, item):
+        return self.prestamo_service.realizar_prestamo(usuario.id, item.id, self.empleado.id)
+
+    def test_limite_de_prestamos_se_libera_al_devolver(self):
+        """Test: con el máximo alcanzado no se presta otro item hasta que se devuelva uno"""
+        primero, _ = self._prestar(self.lector, self.items[0]), self._prestar(self.lector, self.items[1])
+
+        with self.assertRaisesRegex(ValueError, "máximo 2"):
+            self._prestar(self.lector, self.items[2])
+        with self.assertRaisesRegex(ValueError, "superaría el máximo"):
+            self.prestamo_service.realizar_prestamos(self.lector.id, [self.items[3].id, self.items[4].id], self.empleado.id)
+
+        self.assertEqual(len(self.container.get_item_service().listar_disponibles()), 4)
+        self.prestamo_service.devolver_item(primero.id)
+        self._prestar(self.lector, self.items[2])
+
+    def test_docente_retira_un_carro_por_encima_del_limite_de_alumnos(self):
+        """Test: el límite es por tipo de usuario; un docente lleva varios items juntos y también tiene su máximo"""
+        docente = self.container.get_usuario_service().registrar_usuario(
+            nombre="docente", apellido="Test", email="docente@test.com", tipo=TipoUsuario.DOCENTE, numero_identificacion="d"
+        )
+
+        carro = [item.id for item in self.items[:4]]
+
+        with self.assertRaisesRegex(ValueError, "superaría el máximo de 2"):
+            self.prestamo_service.realizar_prestamos(self.lector.id, carro, self.empleado.id)
+        prestamos = self.prestamo_service.realizar_prestamos(docente.id, carro, self.empleado.id)
+
+        self.assertEqual(len(prestamos), 4)
+        with self.assertRaisesRegex(ValueError, "superaría el máximo de 5"):
+            self.prestamo_service.realizar_prestamos(docente.id, [item.id for item in self.items[4:]], self.empleado.id)
+
+    def test_limite_de_reservas(self):
+        """Test: un usuario no supera el máximo de reservas activas; cancelar libera el cupo"""
+        self._prestar(self.otro, self.items[0])
+        self._prestar(self.otro, self.items[1])
+        reserva = self.reserva_service.realizar_reserva(self.lector.id, self.items[0].id, self.empleado.id)
+
+        with self.assertRaisesRegex(ValueError, "1 reservas activas"):
+            self.reserva_service.realizar_reserva(self.lector.id, self.items[1].id, self.empleado.id)
+
+        self.reserva_service.cancelar_reserva(reserva.id)
+        self.reserva_service.realizar_reserva(self.lector.id, self.items[1].id, self.empleado.id)
+
+    def test_prestamos_concurrentes_del_mismo_usuario(self):
+        """Test: varios mostradores prestan a la vez al mismo usuario; solo entran los que caben en el límite"""
+        largada = threading.Barrier(len(self.items))
+
+        def prestar(item):
+            largada.wait()
+            try:
+                return self._prestar(self.lector, item)
+            except ValueError:
+                return None
+
+        with ThreadPoolExecutor(max_workers=len(self.items)) as pool:
+            resultados = list(pool.map(prestar, self.items))
+
+        self.assertEqual(sum(1 for prestamo in resultados if prestamo), 2)
+        self.assertEqual(self.container.get_prestamo_repository().contar_activos_por_usuario(self.lector.id), 2)
+
+    def test_conteo_usa_indices_parciales(self):
+        """Test: el conteo de activos del usuario se resuelve solo con el índice parcial (sin leer la tabla)"""
+        db = self.container.get_orm().db
+        for tabla, columna, indice in (
+            ("prestamos", "activo", "idx_prestamos_usuario_activos"),
+            ("reservas", "activa", "idx_reservas_usuario_activas"),
+        ):
+            plan = db.execute_query(
+                f"EXPLAIN QUERY PLAN SELECT COUNT(*) FROM {tabla} WHERE usuario_id = ? AND {columna} = 1", (1,)
+            )
+            self.assertIn(f"USING COVERING INDEX {indice}", " ".join(fila["detail"] for fila in plan))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Tests de integración: migraciones de esquema y fechas almacenadas como epoch
+"""
+
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+# Agregar el path del proyecto
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from src.domain.entities import Prestamo
+from src.infrastructure.database import ORM, DatabaseConnection, migrate
+from src.infrastructure.database.migrate import MIGRACIONES, TABLAS_VERSIONADAS, migrar
+from src.infrastructure.repositories import PrestamoRepository
+
+
+class TestMigraciones(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, "test_migraciones.db")
+
+    def tearDown(self):
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def _tipo_columna(self, tabla, columna):
+        with sqlite3.connect(self.db_path) as conn:
+            return conn.execute(f"SELECT typeof({columna}) FROM {tabla}").fetchone()[0]
+
+    def _prestamo(self, dias_vencimiento):
+        prestamo = datetime(2024, 3, 10, 14, 25, 30)
+        return Prestamo(
+            usuario_id=1,
+            item_id=1,
+            empleado_id=1,
+            fecha_prestamo=prestamo,
+            fecha_devolucion_esperada=datetime.now().replace(microsecond=0) + timedelta(days=dias_vencimiento),
+        )
+
+    def test_migra_fechas_iso_existentes_a_epoch(self):
+        """Test: una base con fechas en texto ISO se migra sin alterar los valores"""
+        orm = ORM(DatabaseConnection(self.db_path))
+        orm.create_tables(migrar_hasta=0)
+        self.assertFalse(orm.fechas_epoch)
+        original = PrestamoRepository(orm).crear(self._prestamo(-2))
+        self.assertEqual(self._tipo_columna("prestamos", "fecha_prestamo"), "text")
+
+        self.assertEqual(migrar(self.db_path), MIGRACIONES[-1].version)
+
+        self.assertEqual(self._tipo_columna("prestamos", "fecha_prestamo"), "integer")
+        self.assertIsNone(sqlite3.connect(self.db_path).execute("SELECT fecha_devolucion_real FROM prestamos").fetchone()[0])
+        migrado = PrestamoRepository(ORM(DatabaseConnection(self.db_path))).obtener_por_id(original.id)
+        self.assertEqual(migrado.fecha_prestamo, original.fecha_prestamo)
+        self.assertEqual(migrado.fecha_devolucion_esperada, original.fecha_devolucion_esperada)
+
+    def test_base_nueva_guarda_epoch_y_filtra_por_entero(self):
+        """Test: en una base nueva las fechas son enteros y el vencimiento se compara como entero"""
+        orm = ORM(DatabaseConnection(self.db_path))
+        orm.create_tables()
+        repo = PrestamoRepository(orm)
+        vencido = repo.crear(self._prestamo(-1))
+        repo.crear(self._prestamo(5))
+
+        self.assertTrue(orm.fechas_epoch)
+        self.assertEqual(self._tipo_columna("prestamos", "fecha_devolucion_esperada"), "integer")
+        self.assertEqual([p.id for p in repo.listar_vencidos()], [vencido.id])
+
+    def test_migrar_es_idempotente(self):
+        """Test: volver a migrar no cambia la versión ni los datos"""
+        orm = ORM(DatabaseConnection(self.db_path))
+        orm.create_tables()
+        PrestamoRepository(orm).crear(self._prestamo(3))
+
+        self.assertEqual(migrar(self.db_path), MIGRACIONES[-1].version)
+        self.assertEqual(self._tipo_columna("prestamos", "fecha_prestamo"), "integer")
+
+    def test_otro_proceso_migra_entre_la_lectura_y_el_lock(self):
+        """Test: si otro proceso aplica las migraciones antes del BEGIN IMMEDIATE, no se vuelven a aplicar"""
+        ORM(DatabaseConnection(self.db_path)).create_tables(migrar_hasta=0)
+        leer_version = migrate.version_actual
+        lecturas = []
+
+        def leida_antes_de_otro_proceso(conn):
+            version = leer_version(conn)
+            if not lecturas:
+                lecturas.append(version)
+                # Otro proceso gana la carrera y migra todo mientras este todavía no tomó el lock
+                migrar(self.db_path)
+            return version
+
+        with patch.object(migrate, "version_actual", side_effect=leida_antes_de_otro_proceso):
+            self.assertEqual(migrar(self.db_path), MIGRACIONES[-1].version)
+
+        self.assertEqual(lecturas, [0])
+        with sqlite3.connect(self.db_path) as conn:
+            self.assertEqual(migrate.version_actual(conn), MIGRACIONES[-1].version)
+
+    def test_agrega_columna_version_a_filas_existentes(self):
+        """Test: las filas anteriores a la migración quedan en versión 0"""
+        orm = ORM(DatabaseConnection(self.db_path))
+        orm.create_tables(migrar_hasta=1)
+        PrestamoRepository(orm).crear(self._prestamo(3))
+
+        self.assertEqual(migrar(self.db_path, hasta=2), 2)
+
+        with sqlite3.connect(self.db_path) as conn:
+            self.assertEqual(conn.execute("SELECT version FROM prestamos").fetchone()[0], 0)
+            for tabla in TABLAS_VERSIONADAS:
+                self.assertIn("version", [fila[1] for fila in conn.execute(f"PRAGMA table_info({tabla})")])
+
+    def test_vencidos_usa_indice(self):
+        """Test: la consulta de vencidos se resuelve con el índice parcial de préstamos activos"""
+        ORM(DatabaseConnection(self.db_path)).create_tables()
+        with sqlite3.connect(self.db_path) as conn:
+            plan = conn.execute(
+                "EXPLAIN QUERY PLAN SELECT * FROM prestamos"
+                " WHERE activo = 1 AND fecha_devolucion_esperada < ? AND fecha_devolucion_real IS NULL",
+                (0,),
+            ).fetchall()
+
+        self.assertIn("idx_prestamos_activos", " ".join(str(fila[3]) for fila in plan))
+
+
+if __name__ == "__main__":
+    unittest.main()
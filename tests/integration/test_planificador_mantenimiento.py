@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Tests de integración: planificador de tareas de mantenimiento sobre SQLite
+"""
+
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import unittest
+from datetime import datetime
+
+# Agregar el path del proyecto
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from src.container import Container
+from src.infrastructure.repositories import EstadoTareasRepository
+
+
+class TestPlanificadorMantenimiento(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, "test_planificador.db")
+
+        self.container = Container()
+        self.container._config.database.path = self.db_path
+        self.container._config.planificador.habilitado = True
+        self.container._config.planificador.jitter = 0
+        self.container._db_connection = None
+        self.container._orm = None
+        self.estado_repo = EstadoTareasRepository(self.container.get_orm())
+
+    def tearDown(self):
+        self.container.detener_planificador()
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_estado_persistido_por_tarea(self):
+        """Test: cada corrida actualiza la última ejecución, la duración, el contador y el error"""
+        self.estado_repo.registrar_ejecucion("analizar_db", datetime(2024, 6, 20, 3, 0), 0.25)
+        self.estado_repo.registrar_ejecucion("analizar_db", datetime(2024, 6, 21, 3, 0), 0.5, "database is locked")
+
+        self.assertEqual(self.estado_repo.ultimas_ejecuciones(), {"analizar_db": datetime(2024, 6, 21, 3, 0)})
+        with sqlite3.connect(self.db_path) as conn:
+            fila = conn.execute("SELECT duracion_ms, ejecuciones, ultimo_error FROM tareas_programadas").fetchone()
+        self.assertEqual(fila, (500.0, 2, "database is locked"))
+
+    def test_container_corre_las_tareas_de_mantenimiento(self):
+        """Test: al arrancar, las tareas sin historial corren una vez y quedan registradas"""
+        planificador = self.container.get_planificador()
+
+        tareas = {"devengar_multas", "expirar_reservas", "analizar_db", "compactar_db"}
+        limite = time.monotonic() + 10
+        while set(self.estado_repo.ultimas_ejecuciones()) != tareas and time.monotonic() < limite:
+            time.sleep(0.05)
+
+        self.assertEqual(set(self.estado_repo.ultimas_ejecuciones()), tareas)
+        self.assertEqual(set(planificador.proximas_ejecuciones()), tareas)
+        with sqlite3.connect(self.db_path) as conn:
+            self.assertEqual(
+                conn.execute("SELECT COUNT(*) FROM tareas_programadas WHERE ultimo_error IS NOT NULL").fetchone()[0], 0
+            )
+            self.assertIsNotNone(conn.execute("SELECT name FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone())
+
+    def test_deshabilitado_no_arranca(self):
+        """Test: con SCHEDULER_ENABLED=false no se crea el planificador"""
+        self.container._config.planificador.habilitado = False
+
+        self.assertIsNone(self.container.get_planificador())
+
+
+if __name__ == "__main__":
+    unittest.main()
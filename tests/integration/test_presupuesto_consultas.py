@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Tests de integración: presupuesto de consultas SQL de las operaciones principales
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+# Agregar el path del proyecto
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from src.container import Container
+from src.domain.entities import Multa, TipoUsuario
+from src.shared.exceptions import ItemsNoDisponiblesException
+from src.shared.instrumentation import presupuesto_consultas
+
+
+class TestPresupuestoConsultas(unittest.TestCase):
+    def setUp(self):
+        """Configuración inicial - crear BD temporal para tests"""
+        self.temp_dir = tempfile.mkdtemp()
+
+        self.container = Container()
+        self.container._config.database.path = os.path.join(self.temp_dir, "test_biblioteca.db")
+        self.container._db_connection = None
+        self.container._orm = None
+        # Los préstamos por lote de estos tests (p. ej. un kit de 25 items) superan el límite por defecto
+        self.container._config.biblioteca.max_prestamos_simultaneos = 50
+
+        self.usuario_service = self.container.get_usuario_service()
+        self.item_service = self.container.get_item_service()
+        self.prestamo_service = self.container.get_prestamo_service()
+        self.auth_service = self.container.get_auth_service()
+
+        self.empleado = self.auth_service.crear_empleado(
+            nombre="Test", apellido="Presupuesto", email="presupuesto@test.com", usuario_sistema="presu", password="x"
+        )
+        self.usuarios = [
+            self.usuario_service.registrar_usuario(
+                nombre=f"Usuario{i}",
+                apellido="Test",
+                email=f"usuario{i}@test.com",
+                tipo=TipoUsuario.ALUMNO,
+                numero_identificacion=f"ID-{i}",
+            )
+            for i in range(5)
+        ]
+        self.items = [self.item_service.agregar_item(titulo=f"Libro {i}", categoria="libro") for i in range(5)]
+
+    def tearDown(self):
+        """Limpieza después de cada test"""
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def _prestar_todo(self):
+        return [
+            self.prestamo_service.realizar_prestamo(usuario.id, item.id, self.empleado.id)
+            for usuario, item in zip(self.usuarios, self.items)
+        ]
+
+    def test_presupuesto_realizar_prestamo(self):
+        """Test: un préstamo no excede su presupuesto de consultas"""
+        with presupuesto_consultas(5, nombre="realizar_prestamo"):
+            self.prestamo_service.realizar_prestamo(self.usuarios[0].id, self.items[0].id, self.empleado.id)
+
+    def test_prestamo_multiple_con_sentencias_constantes(self):
+        """Test: prestar N items usa las mismas sentencias que prestar uno"""
+        items = self.items + [self.item_service.agregar_item(titulo=f"Kit {i}", categoria="otro") for i in range(20)]
+
+        with presupuesto_consultas(7, nombre="realizar_prestamos"):
+            prestamos = self.prestamo_service.realizar_prestamos(self.usuarios[0].id, [i.id for i in items], self.empleado.id)
+
+        self.assertEqual([p.item_id for p in prestamos], [i.id for i in items])
+        self.assertTrue(all(p.id for p in prestamos))
+        self.assertEqual(self.item_service.listar_disponibles(), [])
+
+    def test_prestamo_multiple_es_todo_o_nada(self):
+        """Test: un item ya prestado hace fallar el lote completo sin prestar los demás"""
+        self.prestamo_service.realizar_prestamo(self.usuarios[1].id, self.items[2].id, self.empleado.id)
+
+        with self.assertRaises(ItemsNoDisponiblesException) as contexto:
+            self.prestamo_service.realizar_prestamos(
+                self.usuarios[0].id, [i.id for i in self.items] + [9999], self.empleado.id
+            )
+
+        self.assertEqual(sorted(contexto.exception.fallidos), [self.items[2].id, 9999])
+        self.assertEqual(len(self.prestamo_service.listar_prestamos_activos()), 1)
+        self.assertEqual(len(self.item_service.listar_disponibles()), len(self.items) - 1)
+
+    def test_prestamos_concurrentes_del_mismo_item(self):
+        """Test: dos mostradores que prestan el mismo ejemplar a la vez; solo uno lo consigue"""
+        item_id = self.items[0].id
+        largada = threading.Barrier(len(self.usuarios))
+
+        def prestar(usuario):
+            largada.wait()
+            try:
+                return self.prestamo_service.realizar_prestamo(usuario.id, item_id, self.empleado.id)
+            except ValueError:
+                return None
+
+        with ThreadPoolExecutor(max_workers=len(self.usuarios)) as pool:
+            resultados = list(pool.map(prestar, self.usuarios))
+
+        self.assertEqual(sum(1 for prestamo in resultados if prestamo), 1)
+        self.assertEqual(len(self.prestamo_service.listar_prestamos_activos()), 1)
+
+    def test_presupuesto_devolver_item(self):
+        """Test: una devolución no excede su presupuesto de consultas (incluye releer de la base la cola del item)"""
+        prestamo = self._prestar_todo()[0]
+
+        with presupuesto_consultas(5, nombre="devolver_item"):
+            self.prestamo_service.devolver_item(prestamo.id)
+
+    def test_devolucion_por_lote_es_una_transaccion(self):
+        """Test: el buzón de devoluciones usa las mismas sentencias para 1 o N items (una lectura de colas para el lote)"""
+        prestamos = self._prestar_todo()
+        repositorio = self.container.get_prestamo_repository()
+        vencido = repositorio.obtener_por_id(prestamos[0].id)
+        vencido.fecha_devolucion_esperada = datetime.now() - timedelta(days=2)
+        repositorio.actualizar(vencido)
+
+        with presupuesto_consultas(5, nombre="devolver_items"):
+            resultados = self.prestamo_service.devolver_items(item_ids=[item.id for item in self.items])
+
+        self.assertTrue(all(r.devuelto for r in resultados))
+        self.assertEqual(resultados[0].multa, 100.0)
+        self.assertEqual(self.prestamo_service.listar_prestamos_activos(), [])
+        self.assertEqual(len(self.item_service.listar_disponibles()), len(self.items))
+        self.assertEqual(len(self.container.get_multa_repository().listar_no_pagadas()), 1)
+
+    def test_devolucion_por_lote_revierte_todo_si_falla(self):
+        """Test: si falla el alta de multas no queda ningún préstamo devuelto a medias"""
+        prestamos = self._prestar_todo()
+
+        def fallar(multas):
+            raise RuntimeError("falla simulada")
+
+        self.container.get_multa_repository().crear_muchas = fallar
+        repositorio = self.container.get_prestamo_repository()
+        vencido = repositorio.obtener_por_id(prestamos[0].id)
+        vencido.fecha_devolucion_esperada = datetime.now() - timedelta(days=2)
+        repositorio.actualizar(vencido)
+
+        with self.assertRaises(RuntimeError):
+            self.prestamo_service.devolver_items(prestamo_ids=[p.id for p in prestamos])
+
+        self.assertEqual(len(self.prestamo_service.listar_prestamos_activos()), len(prestamos))
+        self.assertEqual(self.item_service.listar_disponibles(), [])
+
+    def test_actualizar_sin_cambios_no_ejecuta_sentencias(self):
+        """Test: guardar una entidad leída y no modificada no escribe en la base"""
+        prestamo = self._prestar_todo()[0]
+        repositorio = self.container.get_prestamo_repository()
+        cargado = repositorio.obtener_por_id(prestamo.id)
+
+        with presupuesto_consultas(0, nombre="actualizar_sin_cambios"):
+            repositorio.actualizar(cargado)
+
+        cargado.observaciones = "Tapa dañada"
+        with presupuesto_consultas(1, nombre="actualizar_observaciones"):
+            repositorio.actualizar(cargado)
+        self.assertEqual(repositorio.obtener_por_id(prestamo.id).observaciones, "Tapa dañada")
+
+    def test_listado_de_prestamos_activos_sin_n_mas_1(self):
+        """Test: listar préstamos activos es una sola consulta, sin importar la cantidad"""
+        self._prestar_todo()
+
+        with presupuesto_consultas(1, nombre="listar_prestamos_activos"):
+            prestamos = self.prestamo_service.listar_prestamos_activos()
+
+        self.assertEqual(len(prestamos), 5)
+
+    def test_obtener_por_ids_es_una_consulta(self):
+        """Test: la lectura por lotes resuelve todos los usuarios en una sola consulta"""
+        ids = [usuario.id for usuario in self.usuarios] + [9999]
+
+        with presupuesto_consultas(1, nombre="obtener_usuarios_por_ids"):
+            usuarios = self.usuario_service.obtener_usuarios_por_ids(ids)
+
+        self.assertEqual(sorted(usuarios), sorted(ids[:-1]))
+
+    def test_select_in_respeta_limite_de_variables(self):
+        """Test: listas de IDs mayores al límite de SQLite se parten en lotes"""
+        orm = self.container.get_orm()
+        ids = list(range(1, 2001))
+
+        with presupuesto_consultas(3, permitir_n_mas_1=True) as ambito:
+            filas = orm.select_in("items_biblioteca", "id", ids, chunk_size=900)
+
+        self.assertEqual(ambito.total, 3)
+        self.assertEqual(len(filas), len(self.items))
+
+    def test_reporte_de_prestamos_activos_es_una_consulta(self):
+        """Test: el reporte detallado trae nombres y títulos en una sola consulta"""
+        self._prestar_todo()
+
+        with presupuesto_consultas(1, nombre="listar_prestamos_activos_detalle"):
+            detalle = self.prestamo_service.listar_prestamos_activos_detalle()
+
+        self.assertEqual(len(detalle), 5)
+        primero = next(d for d in detalle if d.usuario_id == self.usuarios[0].id)
+        self.assertEqual(primero.usuario_nombre, "Usuario0 Test")
+        self.assertEqual(primero.item_titulo, "Libro 0")
+        self.assertEqual(primero.empleado_nombre, "Test Presupuesto")
+
+    def test_reservas_y_multas_detalladas_son_una_consulta(self):
+        """Test: reservas activas y multas pendientes detalladas cuestan una consulta cada una"""
+        prestamos = self._prestar_todo()
+        reserva_service = self.container.get_reserva_service()
+        for usuario, item in zip(reversed(self.usuarios), self.items):
+            reserva_service.realizar_reserva(usuario.id, item.id, self.empleado.id)
+        self.container.get_multa_repository().crear(
+            Multa(
+                usuario_id=self.usuarios[1].id,
+                prestamo_id=prestamos[1].id,
+                empleado_id=self.empleado.id,
+                monto=150.0,
+                descripcion="Devolución tardía",
+            )
+        )
+
+        with presupuesto_consultas(1, nombre="listar_reservas_activas_detalle"):
+            reservas = reserva_service.listar_reservas_activas_detalle()
+        with presupuesto_consultas(1, nombre="listar_multas_pendientes_detalle"):
+            multas = self.container.get_multa_service().listar_multas_pendientes_detalle()
+
+        self.assertEqual(len(reservas), 5)
+        self.assertTrue(all(r.usuario_nombre and r.item_titulo and r.empleado_nombre for r in reservas))
+        self.assertEqual(len(multas), 1)
+        self.assertEqual(multas[0].usuario_nombre, "Usuario1 Test")
+        self.assertEqual(multas[0].item_titulo, "Libro 1")
+
+    def test_reporte_de_prestamos_activos_usa_indice_parcial(self):
+        """Test: el filtro de activos se resuelve con el índice parcial, sin recorrer la tabla"""
+        conexion = self.container.get_db_connection()
+        with conexion.get_connection() as conn:
+            plan = conn.execute(
+                "EXPLAIN QUERY PLAN SELECT p.id FROM prestamos p WHERE p.activo = 1 ORDER BY p.fecha_devolucion_esperada"
+            ).fetchall()
+
+        self.assertIn("idx_prestamos_activos", " ".join(str(fila[3]) for fila in plan))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Tests de integración: resumen de cuenta de un usuario en una sola consulta
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+# Agregar el path del proyecto
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from src.container import Container
+from src.domain.entities import Multa, TipoUsuario
+from src.shared.instrumentation import presupuesto_consultas
+
+
+class TestResumenCuenta(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+        self.container = Container()
+        self.container._config.database.path = os.path.join(self.temp_dir, "test_resumen.db")
+        self.container._db_connection = None
+        self.container._orm = None
+
+        self.usuario_service = self.container.get_usuario_service()
+        self.prestamo_service = self.container.get_prestamo_service()
+        self.reserva_service = self.container.get_reserva_service()
+
+        self.empleado = self.container.get_auth_service().crear_empleado(
+            nombre="Test", apellido="Resumen", email="resumen@test.com", usuario_sistema="resumen", password="x"
+        )
+        self.ana, self.beto = [
+            self.usuario_service.registrar_usuario(
+                nombre=nombre,
+                apellido="Test",
+                email=f"{nombre}@test.com",
+                tipo=TipoUsuario.ALUMNO,
+                numero_identificacion=nombre,
+            )
+            for nombre in ("ana", "beto")
+        ]
+        item_service = self.container.get_item_service()
+        self.items = [item_service.agregar_item(titulo=f"Libro {i}", categoria="libro") for i in range(4)]
+
+    def tearDown(self):
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_resumen_con_prestamos_reservas_y_multas(self):
+        """Test: contadores, próximo vencimiento y saldo salen de una sola consulta"""
+        vencido = self.prestamo_service.realizar_prestamo(self.ana.id, self.items[0].id, self.empleado.id)
+        self.prestamo_service.realizar_prestamo(self.ana.id, self.items[1].id, self.empleado.id, dias_prestamo=7)
+        prestamo_repo = self.container.get_prestamo_repository()
+        vencido = prestamo_repo.obtener_por_id(vencido.id)
+        vencido.fecha_devolucion_esperada = datetime.now().replace(microsecond=0) - timedelta(days=2)
+        prestamo_repo.actualizar(vencido)
+
+        self.prestamo_service.realizar_prestamo(self.beto.id, self.items[2].id, self.empleado.id)
+        self.reserva_service.realizar_reserva(self.ana.id, self.items[2].id, self.empleado.id)
+        self.container.get_multa_repository().crear(
+            Multa(usuario_id=self.ana.id, prestamo_id=1, empleado_id=self.empleado.id, monto=75.5, descripcion="Atraso")
+        )
+
+        with presupuesto_consultas(1, nombre="resumen_cuenta"):
+            resumen = self.usuario_service.resumen_cuenta(self.ana.id)
+
+        self.assertEqual((resumen.nombre, resumen.tipo, resumen.activo), ("ana", TipoUsuario.ALUMNO, True))
+        self.assertEqual((resumen.prestamos_activos, resumen.prestamos_vencidos), (2, 1))
+        self.assertEqual(resumen.proximo_vencimiento, vencido.fecha_devolucion_esperada)
+        self.assertEqual((resumen.reservas_activas, resumen.reservas_para_retirar), (1, 0))
+        self.assertEqual((resumen.multas_pendientes, resumen.saldo_pendiente), (1, 75.5))
+
+        # Al devolverse el item reservado, la reserva pasa a estar lista para retirar
+        self.prestamo_service.devolver_items(item_ids=[self.items[2].id])
+        self.assertEqual(self.usuario_service.resumen_cuenta(self.ana.id).reservas_para_retirar, 1)
+
+    def test_resumen_de_usuario_sin_movimientos(self):
+        """Test: un usuario sin préstamos, reservas ni multas tiene todo en cero"""
+        resumen = self.usuario_service.resumen_cuenta(self.beto.id)
+
+        self.assertEqual((resumen.prestamos_activos, resumen.reservas_activas, resumen.multas_pendientes), (0, 0, 0))
+        self.assertIsNone(resumen.proximo_vencimiento)
+        self.assertEqual(resumen.saldo_pendiente, 0.0)
+        with self.assertRaises(ValueError):
+            self.usuario_service.resumen_cuenta(9999)
+
+    def test_plan_solo_con_indices(self):
+        """Test: todas las subconsultas se resuelven con índices que cubren la consulta, sin leer filas"""
+        self.usuario_service.resumen_cuenta(self.ana.id)
+        db = self.container.get_orm().db
+        plan = db.execute_query(
+            "EXPLAIN QUERY PLAN SELECT COUNT(*), MIN(fecha_devolucion_esperada) FROM prestamos"
+            " WHERE usuario_id = ? AND activo = 1",
+            (self.ana.id,),
+        )
+        self.assertIn("USING COVERING INDEX idx_prestamos_usuario_activos", plan[0]["detail"])
+        plan = db.execute_query(
+            "EXPLAIN QUERY PLAN SELECT COUNT(fecha_asignacion) FROM reservas WHERE usuario_id = ? AND activa = 1",
+            (self.ana.id,),
+        )
+        self.assertIn("USING COVERING INDEX idx_reservas_usuario_activas", plan[0]["detail"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Tests de integración: libro de saldos de multas por usuario
+"""
+
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+
+# Agregar el path del proyecto
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from src.container import Container
+from src.domain.entities import Multa, TipoUsuario
+from src.infrastructure.database import ORM, DatabaseConnection
+from src.infrastructure.database.migrate import migrar
+from src.shared.instrumentation import presupuesto_consultas
+
+
+class TestSaldosMultas(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, "test_saldos.db")
+
+        self.container = Container()
+        self.container._config.database.path = self.db_path
+        self.container._db_connection = None
+        self.container._orm = None
+
+        self.multa_repo = self.container.get_multa_repository()
+        self.multa_service = self.container.get_multa_service()
+        self.prestamo_service = self.container.get_prestamo_service()
+
+        self.empleado = self.container.get_auth_service().crear_empleado(
+            nombre="Test", apellido="Saldos", email="saldos@test.com", usuario_sistema="saldos", password="x"
+        )
+        usuario_service = self.container.get_usuario_service()
+        self.ana, self.beto = [
+            usuario_service.registrar_usuario(
+                nombre=nombre,
+                apellido="Test",
+                email=f"{nombre}@test.com",
+                tipo=TipoUsuario.ALUMNO,
+                numero_identificacion=nombre,
+            )
+            for nombre in ("ana", "beto")
+        ]
+        self.item = self.container.get_item_service().agregar_item(titulo="Rayuela", categoria="libro")
+
+    def tearDown(self):
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def _multa(self, usuario, monto, pagada=False):
+        return Multa(
+            usuario_id=usuario.id,
+            prestamo_id=1,
+            empleado_id=self.empleado.id,
+            monto=monto,
+            descripcion="Atraso",
+            fecha_multa=datetime.now(),
+            pagada=pagada,
+        )
+
+    def test_saldo_acompana_altas_pagos_y_correcciones(self):
+        """Test: los triggers mantienen el saldo en altas, lotes, pagos, cambios de monto y bajas"""
+        primera = self.multa_repo.crear(self._multa(self.ana, 0.1))
+        self.multa_repo.crear_muchas([self._multa(self.ana, 0.2), self._multa(self.ana, 9.0, pagada=True)])
+        otra = self.multa_repo.crear(self._multa(self.beto, 50.0))
+        self.assertEqual(self.multa_service.saldo_pendiente(self.ana.id), 0.3)
+
+        self.multa_service.pagar_multa(primera.id)
+        self.assertEqual(self.multa_service.saldo_pendiente(self.ana.id), 0.2)
+
+        otra.monto = 75.0
+        self.multa_repo.actualizar(otra)
+        self.assertEqual(self.multa_service.saldo_pendiente(self.beto.id), 75.0)
+
+        # Reescribir la fila sin cambiar monto ni estado no mueve el saldo
+        otra.descripcion = "Atraso corregido"
+        self.multa_repo.actualizar(otra)
+        self.assertEqual(self.multa_service.saldo_pendiente(self.beto.id), 75.0)
+
+        self.multa_repo.eliminar(otra.id)
+        self.assertEqual(self.multa_service.saldo_pendiente(self.beto.id), 0.0)
+        self.assertEqual(self.multa_service.saldo_pendiente(9999), 0.0)
+
+    def test_saldo_impago_bloquea_el_prestamo_hasta_pagar(self):
+        """Test: con multas impagas no se presta; al pagarlas el préstamo se habilita"""
+        multa = self.multa_repo.crear(self._multa(self.ana, 100.0))
+
+        with self.assertRaisesRegex(ValueError, r"multas pendientes por \$100.00"):
+            self.prestamo_service.realizar_prestamo(self.ana.id, self.item.id, self.empleado.id)
+
+        self.multa_service.pagar_multa(multa.id)
+        self.prestamo_service.realizar_prestamo(self.ana.id, self.item.id, self.empleado.id)
+
+    def test_pago_en_bloque_de_todas_las_multas(self):
+        """Test: pagar todo lo del usuario es una transacción de sentencias constantes que deja el saldo en cero"""
+        self.multa_repo.crear_muchas([self._multa(self.ana, 10.0 + i) for i in range(40)])
+        self.multa_repo.crear(self._multa(self.beto, 30.0))
+
+        with presupuesto_consultas(3, nombre="pagar_multas_usuario"):
+            pago = self.multa_service.pagar_multas_usuario(self.ana.id)
+
+        self.assertEqual((pago.pagadas, pago.monto_pagado, pago.saldo_restante), (40, 1180.0, 0.0))
+        self.assertEqual(self.multa_service.saldo_pendiente(self.ana.id), 0.0)
+        self.assertEqual(self.multa_service.saldo_pendiente(self.beto.id), 30.0)
+        self.assertTrue(all(m.pagada for m in self.multa_service.listar_multas_usuario(self.ana.id)))
+
+    def test_pago_hasta_un_monto_de_la_mas_antigua_a_la_mas_reciente(self):
+        """Test: con tope se pagan las más antiguas que entren; la primera que no entra corta el pago"""
+        antigua, media, nueva = [self.multa_repo.crear(self._multa(self.ana, monto)) for monto in (40.0, 70.0, 10.0)]
+
+        pago = self.multa_service.pagar_multas_usuario(self.ana.id, hasta_monto=100.0)
+
+        self.assertEqual(pago.multa_ids, (antigua.id,))
+        self.assertEqual((pago.monto_pagado, pago.saldo_restante), (40.0, 80.0))
+        self.assertEqual(self.multa_service.saldo_pendiente(self.ana.id), 80.0)
+
+        pago = self.multa_service.pagar_multas_usuario(self.ana.id, hasta_monto=20.0)
+        self.assertEqual(pago.multa_ids, ())
+        pago = self.multa_service.pagar_multas_usuario(self.ana.id, hasta_monto=80.0)
+        self.assertEqual(pago.multa_ids, (media.id, nueva.id))
+        self.assertEqual(self.multa_service.saldo_pendiente(self.ana.id), 0.0)
+
+    def test_saldo_es_una_lectura_por_clave_primaria(self):
+        """Test: consultar el saldo es una sola sentencia que no recorre multas"""
+        self.multa_repo.crear_muchas([self._multa(self.ana, 10.0) for _ in range(50)])
+
+        with presupuesto_consultas(1, nombre="saldo_pendiente"):
+            self.assertEqual(self.multa_service.saldo_pendiente(self.ana.id), 500.0)
+
+        plan = self.container.get_orm().db.execute_query(
+            "EXPLAIN QUERY PLAN SELECT saldo_centavos FROM saldos_multas WHERE usuario_id = ?", (self.ana.id,)
+        )
+        self.assertIn("INTEGER PRIMARY KEY", " ".join(fila["detail"] for fila in plan))
+
+    def test_migracion_calcula_saldos_de_multas_existentes(self):
+        """Test: al migrar una base anterior el libro arranca con las multas impagas ya registradas"""
+        db_path = os.path.join(self.temp_dir, "anterior.db")
+        ORM(DatabaseConnection(db_path)).create_tables(migrar_hasta=6)
+        with sqlite3.connect(db_path) as conn:
+            conn.executemany(
+                "INSERT INTO multas (usuario_id, prestamo_id, empleado_id, monto, descripcion, pagada)"
+                " VALUES (?, 1, 1, ?, 'Atraso', ?)",
+                [(1, 50.0, 0), (1, 25.5, 0), (1, 80.0, 1), (2, 10.0, 0)],
+            )
+
+        migrar(db_path)
+
+        with sqlite3.connect(db_path) as conn:
+            saldos = conn.execute("SELECT * FROM saldos_multas ORDER BY usuario_id").fetchall()
+        self.assertEqual(saldos, [(1, 7550, 2), (2, 1000, 1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
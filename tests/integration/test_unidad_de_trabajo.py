@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Tests de integración: varias operaciones en una misma unidad de trabajo
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+# Agregar el path del proyecto
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from src.application.services import PrestamoService
+from src.domain.entities import CategoriaItem, EstadoItem, ItemBiblioteca, Reserva, TipoUsuario, Usuario
+from src.infrastructure.database import ORM, DatabaseConnection
+from src.infrastructure.repositories import (
+    ItemBibliotecaRepository,
+    MultaRepository,
+    PrestamoRepository,
+    ReservaRepository,
+    UnidadDeTrabajo,
+    UsuarioRepository,
+)
+from src.shared.exceptions import ConflictoConcurrenciaException
+
+
+class TestUnidadDeTrabajo(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.orm = ORM(DatabaseConnection(os.path.join(self.temp_dir, "test_unidad.db")))
+        self.orm.create_tables()
+        self.unidad = UnidadDeTrabajo(self.orm)
+        self.item_repo = ItemBibliotecaRepository(self.orm)
+        self.prestamo_repo = PrestamoRepository(self.orm)
+        self.usuario = UsuarioRepository(self.orm).crear(
+            Usuario(nombre="Ana", apellido="Test", email="ana@test.com", tipo=TipoUsuario.ALUMNO, numero_identificacion="1")
+        )
+        self.items = [self.item_repo.crear(ItemBiblioteca(titulo=f"L{i}", categoria=CategoriaItem.LIBRO)) for i in range(1, 4)]
+        self.prestamo_service = PrestamoService(
+            self.prestamo_repo, self.item_repo, UsuarioRepository(self.orm), MultaRepository(self.orm), self.unidad
+        )
+
+    def tearDown(self):
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_dos_prestamos_en_una_transaccion(self):
+        """Test: tras el INSERT del primer préstamo, la toma condicional del segundo item ve sus filas afectadas"""
+        with self.unidad.transaccion():
+            for item in self.items[:2]:
+                self.prestamo_service.realizar_prestamo(self.usuario.id, item.id, 1)
+
+        self.assertEqual(self.prestamo_repo.contar_activos_por_usuario(self.usuario.id), 2)
+        self.assertEqual(self.item_repo.obtener_por_id(self.items[1].id).estado, EstadoItem.PRESTADO)
+
+    def test_varios_prestamos_y_tomas_condicionales_en_una_transaccion(self):
+        """Test: cada compare-and-set informa si ganó aunque antes haya INSERTs en la misma transacción"""
+        reserva_repo = ReservaRepository(self.orm)
+        ahora = datetime.now()
+        with self.unidad.transaccion():
+            for item in self.items:
+                self.prestamo_service.realizar_prestamo(self.usuario.id, item.id, 1)
+            # El item ya está prestado: la toma no afecta filas y no debe informar éxito
+            self.assertFalse(self.item_repo.reservar_si_disponible(self.items[0].id))
+            self.assertFalse(self.item_repo.liberar_si_reservado(self.items[0].id))
+
+            reserva = reserva_repo.crear(
+                Reserva(
+                    usuario_id=self.usuario.id,
+                    item_id=self.items[0].id,
+                    empleado_id=1,
+                    fecha_reserva=ahora,
+                    fecha_expiracion=ahora + timedelta(days=3),
+                )
+            )
+            self.assertFalse(reserva_repo.asignar_si_en_espera(reserva.id + 1, ahora, ahora + timedelta(days=3)))
+            self.assertTrue(reserva_repo.asignar_si_en_espera(reserva.id, ahora, ahora + timedelta(days=3)))
+            self.assertTrue(reserva_repo.cerrar_si_vigente(reserva.id, ahora))
+            self.assertFalse(reserva_repo.cerrar_si_vigente(reserva.id, ahora))
+
+        self.assertEqual(self.prestamo_repo.contar_activos_por_usuario(self.usuario.id), 3)
+
+    def test_update_sin_filas_tras_un_insert_devuelve_cero(self):
+        """Test: un UPDATE que no encuentra filas devuelve 0 aunque la conexión acabe de insertar"""
+        with self.unidad.transaccion():
+            self.item_repo.crear(ItemBiblioteca(titulo="Nuevo", categoria=CategoriaItem.LIBRO))
+            self.assertEqual(self.orm.update("items_biblioteca", {"ubicacion": "X"}, "id = ?", (999,)), 0)
+            self.assertEqual(self.orm.delete("items_biblioteca", "id = ?", (999,)), 0)
+
+    def test_actualizar_version_vieja_tras_un_insert_es_conflicto(self):
+        """Test: dentro de la transacción, una escritura sobre una versión vieja no se pierde en silencio"""
+        leido = self.item_repo.obtener_por_id(self.items[0].id)
+        self.assertTrue(self.item_repo.reservar_si_disponible(self.items[0].id))
+
+        leido.estado = EstadoItem.EN_REPARACION
+        with self.assertRaises(ConflictoConcurrenciaException):
+            with self.unidad.transaccion():
+                self.item_repo.crear(ItemBiblioteca(titulo="Nuevo", categoria=CategoriaItem.LIBRO))
+                self.item_repo.actualizar(leido)
+
+        self.assertEqual(self.item_repo.obtener_por_id(self.items[0].id).estado, EstadoItem.PRESTADO)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+"""
+Tests for domain entities
+"""
+
+import pytest
+
+from src.domain.entities import Empleado, ItemBiblioteca, Multa, Prestamo, Reserva, Usuario
+
+
+class TestSlottedEntities:
+    @pytest.mark.parametrize("entidad", [Empleado(), ItemBiblioteca(), Prestamo(), Reserva(), Multa()])
+    def test_entities_have_no_instance_dict(self, entidad):
+        assert not hasattr(entidad, "__dict__")
+        with pytest.raises(AttributeError):
+            entidad.campo_inexistente = 1
+
+    def test_public_api_is_preserved(self):
+        prestamo = Prestamo(id=1, usuario_id=2, item_id=3)
+        prestamo.activo = False
+        assert prestamo == Prestamo(id=1, usuario_id=2, item_id=3, activo=False)
+
+
+class TestUsuarioMultasPendientes:
+    def test_multas_pendientes_are_lazy(self):
+        usuario = Usuario(nombre="Ana", email="ana@test.com")
+        assert usuario._multas_pendientes is None
+        assert usuario.puede_hacer_prestamo()
+
+    def test_loaded_unpaid_fine_blocks_loans(self):
+        usuario = Usuario(nombre="Ana", email="ana@test.com")
+        usuario._multas_pendientes = [Multa(monto=10.0), Multa(monto=5.0, pagada=True)]
+        assert usuario.tiene_multas_pendientes()
+        assert not usuario.puede_hacer_prestamo()
+
+    def test_ledger_balance_replaces_loaded_fines(self):
+        usuario = Usuario(nombre="Ana", email="ana@test.com")
+        usuario.cargar_saldo_multas(0.0)
+        assert usuario.puede_hacer_prestamo()
+        usuario.cargar_saldo_multas(50.0)
+        assert not usuario.puede_hacer_prestamo()
+
+    def test_loaded_fines_do_not_affect_equality(self):
+        usuario = Usuario(id=1, nombre="Ana", email="ana@test.com")
+        usuario.cargar_saldo_multas(50.0)
+        usuario._multas_pendientes = [Multa(monto=50.0)]
+        assert usuario == Usuario(id=1, nombre="Ana", email="ana@test.com")
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Tests unitarios para el registro de auditoría en lotes
+"""
+
+import os
+import sys
+import threading
+import unittest
+from datetime import datetime
+from unittest.mock import Mock
+
+# Agregar el path del proyecto
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from src.application.auditoria import OCULTO, RegistroAuditoria, auditar, diferencias, instantanea
+from src.application.interfaces import IAuditoriaRepository
+from src.domain.entities import Empleado, EstadoItem, ItemBiblioteca, Usuario
+
+AHORA = datetime(2024, 5, 6, 7, 8, 9)
+
+
+class TestRegistroAuditoria(unittest.TestCase):
+    def setUp(self):
+        self.repo = Mock(spec=IAuditoriaRepository)
+        self.escritas = []
+        self.repo.registrar_muchas.side_effect = lambda entradas: self.escritas.append(list(entradas))
+        self.empleado_en_sesion = 7
+        self.registro = RegistroAuditoria(
+            self.repo, lote=3, intervalo=60.0, empleado_actual=lambda: self.empleado_en_sesion, reloj=lambda: AHORA
+        )
+
+    def _registrar(self, n, **kwargs):
+        for i in range(n):
+            self.registro.registrar("ItemBibliotecaService.agregar_item", "ItemBiblioteca", i, {}, **kwargs)
+
+    def test_sin_hilo_escribe_al_completar_cada_lote(self):
+        """Test: sin el hilo escritor, cada lote completo se escribe con un solo INSERT en el hilo que registra"""
+        self._registrar(7)
+
+        self.assertEqual([len(lote) for lote in self.escritas], [3, 3])
+        self.assertEqual(self.registro.pendientes, 1)
+        self.assertEqual(self.registro.vaciar(), 1)
+        self.assertEqual(self.registro.vaciar(), 0)
+        self.assertEqual([e.entidad_id for lote in self.escritas for e in lote], list(range(7)))
+
+    def test_empleado_de_la_sesion_salvo_tareas_del_sistema(self):
+        """Test: sin empleado_id se usa el de la sesión; las tareas del sistema quedan sin empleado"""
+        self._registrar(1)
+        self._registrar(1, empleado_id=3)
+        self._registrar(1, sistema=True)
+        self.registro.vaciar()
+
+        self.assertEqual([e.empleado_id for e in self.escritas[0]], [7, 3, None])
+        self.assertTrue(all(e.fecha == AHORA for e in self.escritas[0]))
+
+    def test_error_de_escritura_reintenta_y_acota_el_buffer(self):
+        """Test: si la base falla las entradas vuelven al buffer en orden y pasado el máximo se descartan las viejas"""
+        self.registro.maximo_pendientes = 4
+        self.repo.registrar_muchas.side_effect = RuntimeError("database is locked")
+
+        self._registrar(5)
+        self.assertEqual(self.registro.pendientes, 4)
+
+        self.repo.registrar_muchas.side_effect = lambda entradas: self.escritas.append(list(entradas))
+        self.assertEqual(self.registro.vaciar(), 4)
+        self.assertEqual([e.entidad_id for e in self.escritas[0]], [1, 2, 3, 4])
+
+    def test_hilo_escritor_vacia_por_lote_y_al_detener(self):
+        """Test: con el hilo en marcha un lote completo lo despierta, y detener escribe lo que quedó"""
+        escrito = threading.Event()
+        self.repo.registrar_muchas.side_effect = lambda entradas: (self.escritas.append(list(entradas)), escrito.set())
+        self.registro.iniciar()
+        try:
+            self._registrar(3)
+            self.assertTrue(escrito.wait(5))
+            self._registrar(1)
+        finally:
+            self.registro.detener()
+
+        self.assertEqual([len(lote) for lote in self.escritas], [3, 1])
+        self.assertEqual(self.registro.pendientes, 0)
+
+    def test_diferencias_entre_instantaneas(self):
+        """Test: el diff lista solo los campos que cambiaron, con enums y fechas serializables"""
+        item = ItemBiblioteca(id=4, titulo="Rayuela", estado=EstadoItem.DISPONIBLE, fecha_adquisicion=AHORA)
+        antes = instantanea(item)
+        item.estado = EstadoItem.PRESTADO
+
+        self.assertEqual(diferencias(antes, instantanea(item)), {"estado": ["disponible", "prestado"]})
+        alta = diferencias(None, instantanea(item))
+        self.assertEqual(alta["fecha_adquisicion"], [None, AHORA.isoformat()])
+        self.assertNotIn("id", alta)
+
+    def test_saldo_de_multas_cargado_no_es_un_cambio(self):
+        """Test: cargar el saldo de multas para verificar un préstamo no aparece en el diff del usuario"""
+        usuario = Usuario(id=2, nombre="Ana", email="ana@test.com")
+        antes = instantanea(usuario)
+        usuario.cargar_saldo_multas(30.0)
+        usuario.activo = False
+
+        self.assertEqual(diferencias(antes, instantanea(usuario)), {"activo": [True, False]})
+        self.assertNotIn("_saldo_multas", antes)
+
+    def test_campos_ocultos_y_auditar_sin_registro(self):
+        """Test: el hash de contraseña no llega a la auditoría; sin registro auditar no hace nada"""
+        empleado = Empleado(id=1, nombre="Ana", password_hash="abc123")
+        self.assertEqual(instantanea(empleado)["password_hash"], OCULTO)
+
+        auditar(None, "AuthService.crear_empleado", empleado)
+        auditar(self.registro, "AuthService.crear_empleado", empleado)
+        self.registro.vaciar()
+        entrada = self.escritas[0][0]
+        self.assertEqual((entrada.entidad, entrada.entidad_id), ("Empleado", 1))
+        self.assertEqual(entrada.cambios["nombre"], [None, "Ana"])
+
+
+if __name__ == "__main__":
+    unittest.main()
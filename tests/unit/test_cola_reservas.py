@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Tests unitarios para la cola de reservas por item
+"""
+
+import os
+import sys
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+
+# Agregar el path del proyecto
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from src.application.cola_reservas import ColaReservas
+from src.application.interfaces import IReservaRepository
+from src.application.read_models import ReservaEnEspera
+from src.domain.entities import Reserva, TipoUsuario
+
+INICIO = datetime(2024, 6, 1, 10, 0)
+PLAZO = timedelta(days=3)
+
+
+class TestColaReservas(unittest.TestCase):
+    def setUp(self):
+        self.reserva_repo = Mock(spec=IReservaRepository)
+        # Lo que hay en la base: listar_en_espera filtra por item como la consulta real
+        self.en_base = [
+            ReservaEnEspera(1, 10, 100, TipoUsuario.ALUMNO, INICIO),
+            ReservaEnEspera(2, 10, 101, TipoUsuario.DOCENTE, INICIO + timedelta(hours=2)),
+            ReservaEnEspera(3, 10, 102, TipoUsuario.ALUMNO, INICIO + timedelta(hours=1)),
+            ReservaEnEspera(4, 20, 103, TipoUsuario.ALUMNO, INICIO),
+        ]
+        self.reserva_repo.listar_en_espera.side_effect = lambda item_ids=None: [
+            r for r in self.en_base if item_ids is None or r.item_id in item_ids
+        ]
+        self.reserva_repo.asignar_si_en_espera.return_value = True
+        self.cola = ColaReservas(self.reserva_repo)
+
+    def test_docentes_primero_y_luego_orden_de_llegada(self):
+        """Test: con prioridad docente el docente pasa adelante; el resto respeta la fecha de reserva"""
+        self.assertEqual(self.cola.en_espera(10), [2, 1, 3])
+        self.assertEqual(self.cola.en_espera(20), [4])
+        self.assertEqual(self.cola.en_espera(30), [])
+        self.reserva_repo.listar_en_espera.assert_called_once()
+
+    def test_sin_prioridad_docente_es_fifo(self):
+        """Test: con la prioridad deshabilitada la cola es estrictamente por orden de llegada"""
+        cola = ColaReservas(self.reserva_repo, prioridad_docente=False)
+
+        self.assertEqual(cola.en_espera(10), [1, 3, 2])
+
+    def test_encolar_respeta_prioridad(self):
+        """Test: una reserva docente nueva se ubica delante de los alumnos que ya esperaban"""
+        reserva = Reserva(id=5, item_id=10, usuario_id=104, fecha_reserva=INICIO + timedelta(days=1))
+
+        self.cola.encolar(reserva, TipoUsuario.DOCENTE)
+
+        self.assertEqual(self.cola.en_espera(10), [2, 5, 1, 3])
+
+    def test_asignar_siguiente(self):
+        """Test: se asigna la primera reserva de la cola con el plazo de retiro"""
+        fecha = datetime(2024, 6, 10, 9, 0)
+
+        self.assertEqual(self.cola.asignar_siguiente(10, fecha, PLAZO), 2)
+
+        self.reserva_repo.asignar_si_en_espera.assert_called_once_with(2, fecha, fecha + PLAZO)
+        self.assertEqual(self.cola.en_espera(10), [1, 3])
+
+    def test_asignar_descarta_reservas_que_ya_no_esperan(self):
+        """Test: una reserva cancelada o expirada (UPDATE sin filas) se descarta y se prueba la siguiente"""
+        self.reserva_repo.asignar_si_en_espera.side_effect = [False, False, True]
+
+        self.assertEqual(self.cola.asignar_siguiente(10, INICIO, PLAZO), 3)
+        self.assertEqual(self.cola.en_espera(10), [])
+
+    def test_asignar_con_cola_vacia(self):
+        """Test: si ninguna reserva sigue en espera en la base, el item no se asigna"""
+        self.reserva_repo.asignar_si_en_espera.return_value = False
+        self.en_base = [r for r in self.en_base if r.item_id != 20]  # La reserva 4 expiró en la base
+
+        self.assertIsNone(self.cola.asignar_siguiente(20, INICIO, PLAZO))
+        self.assertIsNone(self.cola.asignar_siguiente(20, INICIO, PLAZO))
+        self.assertEqual(self.reserva_repo.asignar_si_en_espera.call_count, 1)
+
+    def test_asignar_siguientes_relee_de_la_base_solo_lo_que_falta(self):
+        """Test: en un lote, los items sin cola en memoria se buscan en la base con una sola consulta"""
+        self.reserva_repo.listar_en_espera.reset_mock()
+
+        resultado = self.cola.asignar_siguientes([10, 30, 40, 20], INICIO, PLAZO)
+
+        self.assertEqual(resultado, {10: 2, 20: 4})
+        self.assertEqual(self.reserva_repo.asignar_si_en_espera.call_count, 2)
+        self.reserva_repo.listar_en_espera.assert_called_once_with([30, 40])
+
+    def test_reserva_encolada_por_otro_proceso(self):
+        """Test: una reserva que llegó a la base desde otro mostrador se asigna aunque no esté en memoria"""
+        self.en_base.append(ReservaEnEspera(5, 30, 104, TipoUsuario.ALUMNO, INICIO))
+
+        self.assertEqual(self.cola.asignar_siguiente(30, INICIO, PLAZO), 5)
+        self.reserva_repo.asignar_si_en_espera.assert_called_once_with(5, INICIO, INICIO + PLAZO)
+
+    def test_error_al_asignar_devuelve_la_entrada_a_la_cola(self):
+        """Test: si el UPDATE falla la reserva vuelve a su lugar en la cola"""
+        self.reserva_repo.asignar_si_en_espera.side_effect = RuntimeError("database is locked")
+
+        with self.assertRaises(RuntimeError):
+            self.cola.asignar_siguiente(10, INICIO, PLAZO)
+
+        self.assertEqual(self.cola.en_espera(10), [2, 1, 3])
+
+    def test_recargar_reconstruye_desde_la_base(self):
+        """Test: tras recargar, la cola refleja lo que hay en la base"""
+        self.cola.asignar_siguiente(10, INICIO, PLAZO)
+        self.en_base = [ReservaEnEspera(2, 10, 101, TipoUsuario.DOCENTE, INICIO)]
+
+        self.cola.recargar()
+
+        self.assertEqual(self.cola.en_espera(10), [2])
+        self.assertEqual(self.cola.en_espera(20), [])
+
+    def test_recargar_algunos_items(self):
+        """Test: recargar con item_ids reemplaza solo esas colas"""
+        self.en_base = [ReservaEnEspera(1, 10, 100, TipoUsuario.ALUMNO, INICIO)]
+
+        self.cola.recargar([10, 20])
+
+        self.assertEqual(self.cola.en_espera(10), [1])
+        self.assertEqual(self.cola.en_espera(20), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
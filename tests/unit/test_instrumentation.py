@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Tests unitarios para el conteo de consultas, detección de N+1 y presupuestos
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# Agregar el path del proyecto
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from src.shared.instrumentation import (
+    PresupuestoConsultasExcedido,
+    QueryScope,
+    activar_perfilado,
+    limite_consultas,
+    perfilar,
+    perfilar_acciones,
+    presupuesto_consultas,
+    registrar_consulta,
+)
+
+SELECT_USUARIO = "SELECT * FROM usuarios WHERE id = ?"
+SELECT_PRESTAMOS = "SELECT * FROM prestamos WHERE activo = ?"
+
+
+class TestQueryScope(unittest.TestCase):
+    def test_detecta_patron_n_mas_1(self):
+        """Test: una lectura repetida dentro del ámbito se reporta como N+1"""
+        with QueryScope("reporte", registrar_huellas=True) as ambito:
+            registrar_consulta(SELECT_PRESTAMOS)
+            for _ in range(5):
+                registrar_consulta(SELECT_USUARIO)
+
+        self.assertEqual(ambito.total, 6)
+        self.assertEqual(ambito.patrones_n_mas_1(), {SELECT_USUARIO: 5})
+
+    def test_escrituras_repetidas_no_son_n_mas_1(self):
+        """Test: solo las lecturas cuentan como N+1"""
+        with QueryScope(registrar_huellas=True) as ambito:
+            for _ in range(5):
+                registrar_consulta("UPDATE items_biblioteca SET estado = ? WHERE id = ?")
+
+        self.assertEqual(ambito.patrones_n_mas_1(), {})
+
+    def test_sin_huellas_no_detecta(self):
+        """Test: un ámbito simple solo cuenta"""
+        with QueryScope() as ambito:
+            for _ in range(5):
+                registrar_consulta(SELECT_USUARIO)
+
+        self.assertEqual(ambito.total, 5)
+        self.assertEqual(ambito.patrones_n_mas_1(), {})
+
+
+class TestPresupuestoConsultas(unittest.TestCase):
+    def test_dentro_del_presupuesto(self):
+        """Test: no falla si el bloque respeta el presupuesto"""
+        with presupuesto_consultas(2) as ambito:
+            registrar_consulta(SELECT_USUARIO)
+            registrar_consulta(SELECT_PRESTAMOS)
+
+        self.assertEqual(ambito.total, 2)
+
+    def test_excede_presupuesto(self):
+        """Test: falla si se ejecutan más consultas que las declaradas"""
+        with self.assertRaises(PresupuestoConsultasExcedido) as context:
+            with presupuesto_consultas(1, nombre="listar"):
+                registrar_consulta(SELECT_USUARIO)
+                registrar_consulta(SELECT_PRESTAMOS)
+
+        self.assertIn("listar ejecutó 2 consultas (presupuesto: 1)", str(context.exception))
+
+    def test_n_mas_1_falla_aunque_entre_en_presupuesto(self):
+        """Test: un N+1 falla salvo que se permita explícitamente"""
+        with self.assertRaises(AssertionError):
+            with presupuesto_consultas(10):
+                for _ in range(3):
+                    registrar_consulta(SELECT_USUARIO)
+
+        with presupuesto_consultas(10, permitir_n_mas_1=True):
+            for _ in range(3):
+                registrar_consulta(SELECT_USUARIO)
+
+    def test_decorador_limite_consultas(self):
+        """Test: versión decorador para métodos de test"""
+
+        @limite_consultas(1)
+        def bloque():
+            registrar_consulta(SELECT_USUARIO)
+            registrar_consulta(SELECT_PRESTAMOS)
+
+        with self.assertRaises(PresupuestoConsultasExcedido):
+            bloque()
+
+
+class TestModoPerfilado(unittest.TestCase):
+    def tearDown(self):
+        activar_perfilado(False)
+
+    def test_perfilar_inactivo_no_crea_ambito(self):
+        """Test: sin modo perfilado no hay costo ni ámbito"""
+        activar_perfilado(False)
+        with perfilar("accion") as ambito:
+            registrar_consulta(SELECT_USUARIO)
+
+        self.assertIsNone(ambito)
+
+    @patch("src.shared.instrumentation.reportar_ambito")
+    def test_acciones_perfiladas_reportan(self, mock_reportar):
+        """Test: las acciones públicas de una clase decorada se perfilan"""
+
+        @perfilar_acciones(excluir=("ejecutar",))
+        class Pantalla:
+            def reporte(self):
+                for _ in range(3):
+                    registrar_consulta(SELECT_USUARIO)
+
+            def ejecutar(self):
+                pass
+
+        activar_perfilado(True)
+        Pantalla().reporte()
+        Pantalla().ejecutar()
+
+        mock_reportar.assert_called_once()
+        ambito = mock_reportar.call_args[0][0]
+        self.assertEqual(ambito.nombre, "Pantalla.reporte")
+        self.assertEqual(ambito.patrones_n_mas_1(), {SELECT_USUARIO: 3})
+
+
+if __name__ == "__main__":
+    unittest.main()
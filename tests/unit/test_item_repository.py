@@ -5,6 +5,7 @@ from unittest.mock import Mock
 from src.domain.entities import CategoriaItem, EstadoItem, ItemBiblioteca
 from src.infrastructure.database import ORM
 from src.infrastructure.repositories import ItemBibliotecaRepository
+from src.shared.exceptions import ConflictoConcurrenciaException
 
 
 class TestItemBibliotecaRepository(unittest.TestCase):
@@ -24,6 +25,7 @@ class TestItemBibliotecaRepository(unittest.TestCase):
             "ubicacion": "A1-B2",
             "valor_reposicion": 25000.0,
             "fecha_adquisicion": "2023-01-01T12:00:00",
+            "version": 3,
         }
 
         self.item = ItemBiblioteca(
@@ -110,6 +112,61 @@ class TestItemBibliotecaRepository(unittest.TestCase):
         self.orm_mock.update.assert_called_once()
         self.assertEqual(resultado, self.item)
 
+    def test_actualizar_item_cargado_escribe_solo_columnas_modificadas(self):
+        self.orm_mock.select.return_value = [self.item_data]
+        item = self.repository.obtener_por_id(1)
+        item.estado = EstadoItem.PRESTADO
+
+        self.repository.actualizar(item)
+
+        self.orm_mock.update.assert_called_once_with(
+            "items_biblioteca", {"estado": "prestado"}, "id = ? AND version = ?", (1, 3), incrementar=("version",)
+        )
+
+    def test_actualizar_item_modificado_por_otra_operacion_es_conflicto(self):
+        self.orm_mock.select.return_value = [self.item_data]
+        self.orm_mock.update.return_value = 0  # La versión 3 ya no está en la base
+        item = self.repository.obtener_por_id(1)
+        item.estado = EstadoItem.EN_REPARACION
+
+        with self.assertRaises(ConflictoConcurrenciaException) as contexto:
+            self.repository.actualizar(item)
+
+        self.assertEqual((contexto.exception.tabla, contexto.exception.id, contexto.exception.version), ("items_biblioteca", 1, 3))
+
+    def test_actualizar_item_sin_cambios_no_escribe(self):
+        self.orm_mock.select.return_value = [self.item_data]
+        item = self.repository.obtener_por_id(1)
+
+        self.repository.actualizar(item)
+        item.ubicacion = "C3"
+        self.repository.actualizar(item)
+        self.repository.actualizar(item)
+
+        self.orm_mock.update.assert_called_once_with(
+            "items_biblioteca", {"ubicacion": "C3"}, "id = ? AND version = ?", (1, 3), incrementar=("version",)
+        )
+
+    def test_reservar_si_disponible_es_un_update_condicional(self):
+        self.orm_mock.update.side_effect = [1, 0]
+
+        self.assertTrue(self.repository.reservar_si_disponible(1))
+        self.assertFalse(self.repository.reservar_si_disponible(1))
+
+        self.orm_mock.update.assert_called_with(
+            "items_biblioteca", {"estado": "prestado"}, "id = ? AND estado = ?", (1, "disponible"), incrementar=("version",)
+        )
+        self.orm_mock.select.assert_not_called()
+
+    def test_liberar_si_prestado(self):
+        self.orm_mock.update.return_value = 1
+
+        self.assertTrue(self.repository.liberar_si_prestado(1))
+
+        self.orm_mock.update.assert_called_once_with(
+            "items_biblioteca", {"estado": "disponible"}, "id = ? AND estado = ?", (1, "prestado"), incrementar=("version",)
+        )
+
     def test_eliminar_item(self):
         self.orm_mock.delete.return_value = 1
 
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Tests unitarios para la carga por lotes de entidades (DataLoader)
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import Mock
+
+# Agregar el path del proyecto
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from src.application.loaders import Cargadores, DataLoader
+from src.shared.metrics import get_metrics
+
+
+class TestDataLoader(unittest.TestCase):
+    def setUp(self):
+        self.cargar_lote = Mock(side_effect=lambda ids: {i: f"entidad-{i}" for i in ids if i < 100})
+        self.loader = DataLoader("test_loader", self.cargar_lote)
+
+    def test_claves_encoladas_se_resuelven_en_un_lote(self):
+        """Test: la primera lectura trae todas las claves encoladas"""
+        self.loader.encolar([1, 2, 3, 2])
+
+        self.assertEqual(self.loader.cargar(2), "entidad-2")
+        self.assertEqual(self.loader.cargar(1), "entidad-1")
+        self.assertEqual(self.loader.cargar(3), "entidad-3")
+
+        self.cargar_lote.assert_called_once_with([1, 2, 3])
+        self.assertEqual(self.loader.lotes, 1)
+
+    def test_claves_inexistentes_se_cachean(self):
+        """Test: una clave inexistente no se vuelve a consultar"""
+        self.assertIsNone(self.loader.cargar(500))
+        self.assertIsNone(self.loader.cargar(500))
+
+        self.cargar_lote.assert_called_once_with([500])
+
+    def test_cargar_muchos_solo_consulta_faltantes(self):
+        """Test: cargar_muchos reutiliza la caché y omite inexistentes"""
+        self.loader.cargar(1)
+
+        resultado = self.loader.cargar_muchos([1, 2, 500])
+
+        self.assertEqual(resultado, {1: "entidad-1", 2: "entidad-2"})
+        self.assertEqual(self.cargar_lote.call_args_list[-1].args, ([2, 500],))
+
+    def test_limpiar_descarta_cache(self):
+        """Test: tras limpiar se vuelve a consultar"""
+        self.loader.cargar(1)
+        self.loader.limpiar()
+        self.loader.cargar(1)
+
+        self.assertEqual(self.cargar_lote.call_count, 2)
+
+    def test_registra_aciertos_y_fallos(self):
+        """Test: los accesos se cuentan en la métrica de caché"""
+        contador = get_metrics().counter(
+            "biblioteca_cache_requests_total", "Accesos a caché por resultado", ("cache", "resultado")
+        )
+        aciertos = contador.valor("test_loader", "hit")
+        fallos = contador.valor("test_loader", "miss")
+
+        self.loader.cargar(7)
+        self.loader.cargar(7)
+
+        self.assertEqual(contador.valor("test_loader", "hit"), aciertos + 1)
+        self.assertEqual(contador.valor("test_loader", "miss"), fallos + 1)
+
+
+class TestCargadores(unittest.TestCase):
+    def test_usa_lecturas_por_lote_de_los_servicios(self):
+        """Test: cada cargador delega en el obtener_*_por_ids de su servicio"""
+        usuario_service, item_service, auth_service = Mock(), Mock(), Mock()
+        usuario_service.obtener_usuarios_por_ids.return_value = {1: "usuario"}
+
+        cargadores = Cargadores(usuario_service, item_service, auth_service)
+
+        self.assertEqual(cargadores.usuarios.cargar(1), "usuario")
+        usuario_service.obtener_usuarios_por_ids.assert_called_once_with([1])
+        item_service.obtener_items_por_ids.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Tests unitarios para el Logger con escritura en segundo plano
+"""
+
+import logging
+import logging.handlers
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+# Agregar el path del proyecto
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from src.shared.config import LoggingConfig
+from src.shared.logger import Logger, get_logger
+
+
+class _ListaHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.mensajes = []
+
+    def emit(self, record):
+        self.mensajes.append(record.getMessage())
+
+
+class _Costoso:
+    def __init__(self):
+        self.formateado = False
+
+    def __str__(self):
+        self.formateado = True
+        return "costoso"
+
+
+class TestLogger(unittest.TestCase):
+    def setUp(self):
+        self.logger = get_logger()
+        self.handler = _ListaHandler()
+        Logger._listener.handlers = Logger._listener.handlers + (self.handler,)
+        # Los handlers de prueba abren sus archivos aquí, no sobre los logs reales de la aplicación
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        Logger._listener.handlers = tuple(h for h in Logger._listener.handlers if h is not self.handler)
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _vaciar_cola(self):
+        """Detiene y reinicia el listener para asegurar que la cola se procesó"""
+        Logger._listener.stop()
+        Logger._listener.start()
+
+    def test_singleton(self):
+        """Test: get_logger devuelve siempre la misma instancia"""
+        self.assertIs(get_logger(), self.logger)
+
+    def test_usa_queue_handler(self):
+        """Test: el logger solo encola, la escritura la hace el listener"""
+        handlers = Logger._logger.handlers
+        self.assertTrue(any(isinstance(h, logging.handlers.QueueHandler) for h in handlers))
+        self.assertFalse(any(isinstance(h, logging.FileHandler) for h in handlers))
+
+    def test_formateo_perezoso_con_argumentos(self):
+        """Test: los argumentos % se formatean al escribir"""
+        self.logger.info("Préstamo %s para usuario %s", 10, 20)
+        self._vaciar_cola()
+
+        self.assertIn("Préstamo 10 para usuario 20", self.handler.mensajes)
+
+    def test_nivel_deshabilitado_no_formatea(self):
+        """Test: un nivel deshabilitado no formatea sus argumentos"""
+        costoso = _Costoso()
+
+        self.logger.debug("Valor: %s", costoso)
+        self._vaciar_cola()
+
+        self.assertFalse(costoso.formateado)
+        self.assertFalse(self.logger.is_enabled_for(logging.DEBUG))
+
+    def test_handler_rotacion_por_tamano(self):
+        """Test: rotación por tamaño por defecto"""
+        config = LoggingConfig(directory=self.temp_dir, max_bytes=1024, backup_count=2)
+        handler = Logger._build_file_handler(config)
+        try:
+            self.assertIsInstance(handler, logging.handlers.RotatingFileHandler)
+            self.assertEqual(handler.maxBytes, 1024)
+            self.assertEqual(handler.backupCount, 2)
+        finally:
+            handler.close()
+
+    def test_handler_rotacion_por_tiempo(self):
+        """Test: rotación por tiempo configurable"""
+        config = LoggingConfig(directory=self.temp_dir, rotation="time", when="midnight")
+        handler = Logger._build_file_handler(config)
+        try:
+            self.assertIsInstance(handler, logging.handlers.TimedRotatingFileHandler)
+        finally:
+            handler.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
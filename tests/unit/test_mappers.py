@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Tests unitarios para los mappers compilados de filas a entidades
+"""
+
+import os
+import sys
+import unittest
+from datetime import datetime
+
+# Agregar el path del proyecto
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from src.domain.entities import CategoriaItem, EstadoItem, ItemBiblioteca
+from src.infrastructure.database.mappers import tabla_enum
+from src.infrastructure.repositories import AuditoriaRepository, ItemBibliotecaRepository
+
+
+class TestRowMapper(unittest.TestCase):
+    def setUp(self):
+        self.mapper = ItemBibliotecaRepository._mapper
+        self.fila = {
+            "id": 3,
+            "titulo": "Rayuela",
+            "autor": "Cortázar",
+            "isbn": None,
+            "categoria": "libro",
+            "estado": "prestado",
+            "descripcion": None,
+            "ubicacion": "A-1",
+            "fecha_adquisicion": "2024-02-01T10:15:00",
+            "valor_reposicion": 1500.0,
+        }
+
+    def test_tupla_y_dict_producen_la_misma_entidad(self):
+        """Test: el constructor por índice equivale al constructor por clave"""
+        por_tupla = self.mapper.para_columnas(tuple(self.fila))(tuple(self.fila.values()))
+
+        self.assertEqual(por_tupla, self.mapper.desde_dict(self.fila))
+        self.assertIs(por_tupla.categoria, CategoriaItem.LIBRO)
+        self.assertIs(por_tupla.estado, EstadoItem.PRESTADO)
+        self.assertEqual(por_tupla.fecha_adquisicion, datetime(2024, 2, 1, 10, 15))
+
+    def test_orden_de_columnas_arbitrario_y_faltantes_por_defecto(self):
+        """Test: se respeta el orden de la consulta y los campos sin columna usan el default"""
+        columnas = ("titulo", "id", "estado")
+
+        item = self.mapper.para_columnas(columnas)(("Ficciones", 9, "disponible"))
+
+        self.assertEqual(item, ItemBiblioteca(id=9, titulo="Ficciones", estado=EstadoItem.DISPONIBLE))
+
+    def test_constructor_se_cachea_por_columnas(self):
+        """Test: la misma lista de columnas reutiliza el constructor compilado"""
+        columnas = ("id", "titulo")
+
+        self.assertIs(self.mapper.para_columnas(columnas), self.mapper.para_columnas(list(columnas)))
+
+    def test_fecha_nula_y_valor_enum_invalido(self):
+        """Test: fechas vacías quedan en None y un enum desconocido falla como Enum(valor)"""
+        self.fila["fecha_adquisicion"] = None
+        self.assertIsNone(self.mapper.desde_dict(self.fila).fecha_adquisicion)
+
+        self.fila["estado"] = "extraviado"
+        with self.assertRaises(ValueError):
+            self.mapper.desde_dict(self.fila)
+
+    def test_fecha_en_segundos_epoch(self):
+        """Test: las columnas migradas a epoch se hidratan sin parsear texto"""
+        fecha = datetime(2024, 5, 6, 7, 8, 9)
+        self.fila["fecha_adquisicion"] = int(fecha.timestamp())
+
+        self.assertEqual(self.mapper.desde_dict(self.fila).fecha_adquisicion, fecha)
+
+    def test_columna_json(self):
+        """Test: una columna JSON se decodifica en la entidad y NULL queda en None"""
+        columnas = ("id", "fecha", "operacion", "entidad", "entidad_id", "cambios")
+        cambios = '{"estado": ["disponible", "prestado"]}'
+        entrada = AuditoriaRepository._mapper.mapear(columnas, [(1, 0, "op", "Item", 3, cambios)])[0]
+        self.assertEqual(entrada.cambios, {"estado": ["disponible", "prestado"]})
+
+        self.assertIsNone(AuditoriaRepository._mapper.mapear(columnas, [(1, 0, "op", "Item", 3, None)])[0].cambios)
+
+    def test_tabla_enum(self):
+        """Test: la tabla valor -> miembro se comparte entre mappers"""
+        self.assertIs(tabla_enum(EstadoItem), tabla_enum(EstadoItem))
+        self.assertIs(tabla_enum(EstadoItem)["perdido"], EstadoItem.PERDIDO)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Tests unitarios para el registro de métricas
+"""
+
+import os
+import sys
+import unittest
+import urllib.request
+
+# Agregar el path del proyecto
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from src.shared.metrics import MetricsRegistry, get_metrics, iniciar_servidor_metricas, medir_metodos_publicos
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_counter_con_etiquetas(self):
+        """Test: contador por serie de etiquetas"""
+        contador = self.registry.counter("prestamos_total", "Préstamos realizados", ("tipo",))
+        contador.labels("alumno").inc()
+        contador.labels("alumno").inc(2)
+        contador.labels("docente").inc()
+
+        self.assertEqual(contador.valor("alumno"), 3)
+        texto = self.registry.render_prometheus()
+        self.assertIn("# TYPE prestamos_total counter", texto)
+        self.assertIn('prestamos_total{tipo="alumno"} 3', texto)
+        self.assertIn('prestamos_total{tipo="docente"} 1', texto)
+
+    def test_gauge(self):
+        """Test: gauge admite set, inc y dec"""
+        gauge = self.registry.gauge("prestamos_activos", "Préstamos activos")
+        gauge.set(10)
+        gauge.inc()
+        gauge.dec(3)
+
+        self.assertIn("prestamos_activos 8", self.registry.render_prometheus())
+
+    def test_histograma_buckets_acumulados(self):
+        """Test: histograma con buckets acumulados, suma y cuenta"""
+        histograma = self.registry.histogram("latencia_seconds", "Latencia", buckets=(0.1, 1.0))
+        histograma.observe(0.05)
+        histograma.observe(0.5)
+        histograma.observe(5)
+
+        texto = self.registry.render_prometheus()
+        self.assertIn('latencia_seconds_bucket{le="0.1"} 1', texto)
+        self.assertIn('latencia_seconds_bucket{le="1"} 2', texto)
+        self.assertIn('latencia_seconds_bucket{le="+Inf"} 3', texto)
+        self.assertIn("latencia_seconds_sum 5.55", texto)
+        self.assertIn("latencia_seconds_count 3", texto)
+
+    def test_registro_idempotente(self):
+        """Test: pedir dos veces la misma métrica devuelve la misma instancia"""
+        a = self.registry.counter("x_total", "X")
+        self.assertIs(a, self.registry.counter("x_total", "X"))
+        with self.assertRaises(ValueError):
+            self.registry.gauge("x_total", "X")
+
+    def test_etiquetas_invalidas(self):
+        """Test: la cantidad de etiquetas debe coincidir"""
+        contador = self.registry.counter("y_total", "Y", ("a", "b"))
+        with self.assertRaises(ValueError):
+            contador.labels("solo_una")
+
+    def test_escape_de_etiquetas(self):
+        """Test: las comillas en etiquetas se escapan"""
+        self.registry.counter("z_total", "Z", ("titulo",)).labels('El "Quijote"').inc()
+
+        self.assertIn('z_total{titulo="El \\"Quijote\\""} 1', self.registry.render_prometheus())
+
+    def test_medir_metodos_publicos(self):
+        """Test: el decorador de clase mide llamadas y errores"""
+
+        @medir_metodos_publicos("test_repo_seconds", "Duración de prueba")
+        class RepoDePrueba:
+            def listar(self):
+                return [1]
+
+            def fallar(self):
+                raise ValueError("x")
+
+        repo = RepoDePrueba()
+        self.assertEqual(repo.listar(), [1])
+        with self.assertRaises(ValueError):
+            repo.fallar()
+
+        texto = get_metrics().render_prometheus()
+        self.assertIn('test_repo_seconds_count{clase="RepoDePrueba",metodo="listar"} 1', texto)
+        self.assertIn('test_repo_errors_total{clase="RepoDePrueba",metodo="fallar"} 1', texto)
+
+    def test_servidor_http(self):
+        """Test: el endpoint /metrics expone el registro global"""
+        get_metrics().counter("http_test_total", "HTTP").inc()
+        servidor = iniciar_servidor_metricas(0)
+        self.assertIsNone(servidor)
+
+        from http.server import ThreadingHTTPServer
+
+        servidor = iniciar_servidor_metricas(_puerto_libre())
+        try:
+            puerto = servidor.server_address[1]
+            with urllib.request.urlopen(f"http://127.0.0.1:{puerto}/metrics", timeout=5) as respuesta:
+                cuerpo = respuesta.read().decode("utf-8")
+            self.assertIsInstance(servidor, ThreadingHTTPServer)
+            self.assertIn("http_test_total 1", cuerpo)
+        finally:
+            servidor.shutdown()
+            servidor.server_close()
+
+
+def _puerto_libre() -> int:
+    import socket
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+if __name__ == "__main__":
+    unittest.main()
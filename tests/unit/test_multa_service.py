@@ -13,8 +13,9 @@ from unittest.mock import Mock
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
 
 from src.application.interfaces import IMultaRepository, IUsuarioRepository
+from src.application.read_models import ResumenPagoMultas
 from src.application.services import MultaService
-from src.domain.entities import Multa
+from src.domain.entities import Multa, Usuario
 
 
 class TestMultaService(unittest.TestCase):
@@ -97,6 +98,30 @@ class TestMultaService(unittest.TestCase):
         self.assertIn("ya fue pagada", str(context.exception))
         self.mock_multa_repo.actualizar.assert_not_called()
 
+    def test_pagar_multas_usuario(self):
+        """Test: el pago en bloque delega en una sola operación del repositorio"""
+        self.mock_usuario_repo.obtener_por_id.return_value = Usuario(id=1, nombre="Ana", email="ana@test.com")
+        resumen = ResumenPagoMultas(1, (3, 4), 150.0, 50.0)
+        self.mock_multa_repo.pagar_pendientes_usuario.return_value = resumen
+
+        resultado = self.multa_service.pagar_multas_usuario(1, hasta_monto=150.0)
+
+        self.assertEqual(resultado, resumen)
+        self.assertEqual(resultado.pagadas, 2)
+        self.mock_multa_repo.pagar_pendientes_usuario.assert_called_once_with(1, 150.0)
+        self.mock_multa_repo.actualizar.assert_not_called()
+
+    def test_pagar_multas_usuario_invalido(self):
+        """Test: Error con usuario inexistente o monto no positivo"""
+        self.mock_usuario_repo.obtener_por_id.return_value = None
+        with self.assertRaisesRegex(ValueError, "No se encontró el usuario"):
+            self.multa_service.pagar_multas_usuario(999)
+
+        with self.assertRaisesRegex(ValueError, "mayor a cero"):
+            self.multa_service.pagar_multas_usuario(1, hasta_monto=0)
+
+        self.mock_multa_repo.pagar_pendientes_usuario.assert_not_called()
+
     def test_listar_multas_pendientes(self):
         """Test: Listar multas pendientes (no pagadas)"""
         # Arrange
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Tests unitarios para el log estructurado de operaciones
+"""
+
+import json
+import logging
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# Agregar el path del proyecto
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from src.domain.entities import Usuario
+from src.shared.instrumentation import QueryScope, registrar_consulta
+from src.shared.operation_log import JsonLineFormatter, OperationLog, instrumentar_servicio
+
+
+@instrumentar_servicio
+class ServicioDePrueba:
+    def __init__(self):
+        self.consultas = 0
+
+    def prestar(self, usuario_id: int, item_id: int, empleado_id: int) -> Usuario:
+        registrar_consulta("SELECT 1")
+        registrar_consulta("UPDATE items_biblioteca SET estado = ?")
+        return Usuario(id=7, nombre="Ana", email="ana@test.com")
+
+    def actualizar(self, usuario: Usuario) -> Usuario:
+        return usuario
+
+    def fallar(self, prestamo_id: int):
+        raise ValueError("falla")
+
+    def _privado(self):
+        return "sin instrumentar"
+
+
+class TestOperationLog(unittest.TestCase):
+    def setUp(self):
+        self.servicio = ServicioDePrueba()
+        patcher = patch.object(OperationLog, "registrar")
+        self.mock_registrar = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _evento(self):
+        self.mock_registrar.assert_called_once()
+        return self.mock_registrar.call_args[0][0]
+
+    def test_evento_incluye_ids_empleado_y_sql(self):
+        """Test: el evento registra operación, empleado, IDs y sentencias SQL"""
+        self.servicio.prestar(1, 2, empleado_id=3)
+
+        evento = self._evento()
+        self.assertEqual(evento["operacion"], "ServicioDePrueba.prestar")
+        self.assertEqual(evento["empleado_id"], 3)
+        self.assertEqual(evento["ids"], {"usuario_id": 1, "item_id": 2, "resultado_id": 7})
+        self.assertEqual(evento["sentencias_sql"], 2)
+        self.assertEqual(evento["estado"], "ok")
+        self.assertGreaterEqual(evento["duracion_us"], 0)
+
+    def test_evento_con_entidad_como_argumento(self):
+        """Test: las entidades recibidas aportan su ID"""
+        self.servicio.actualizar(Usuario(id=5, email="ana@test.com"))
+
+        self.assertEqual(self._evento()["ids"], {"usuario_id": 5, "resultado_id": 5})
+
+    def test_evento_registra_excepcion(self):
+        """Test: una excepción queda registrada y se propaga"""
+        with self.assertRaises(ValueError):
+            self.servicio.fallar(9)
+
+        evento = self._evento()
+        self.assertEqual(evento["estado"], "ValueError")
+        self.assertEqual(evento["ids"], {"prestamo_id": 9})
+
+    def test_metodos_privados_no_se_instrumentan(self):
+        """Test: solo los métodos públicos emiten eventos"""
+        self.servicio._privado()
+
+        self.mock_registrar.assert_not_called()
+
+    def test_query_scope_anidado(self):
+        """Test: los ámbitos anidados cuentan las sentencias de sus hijos"""
+        with QueryScope() as externo:
+            registrar_consulta("SELECT 1")
+            with QueryScope() as interno:
+                registrar_consulta("SELECT 2")
+
+        self.assertEqual(externo.total, 2)
+        self.assertEqual(interno.total, 1)
+
+    def test_formatter_json_por_linea(self):
+        """Test: el formatter produce una línea JSON con timestamp"""
+        record = logging.LogRecord("ops", logging.INFO, __file__, 1, {"operacion": "x", "duracion_us": 10}, (), None)
+
+        linea = JsonLineFormatter().format(record)
+
+        datos = json.loads(linea)
+        self.assertEqual(datos["operacion"], "x")
+        self.assertIn("ts", datos)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Tests unitarios para el planificador de tareas de mantenimiento
+"""
+
+import os
+import random
+import sys
+import threading
+import unittest
+from datetime import datetime
+from unittest.mock import Mock
+
+# Agregar el path del proyecto
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from src.application.interfaces import IEstadoTareasRepository
+from src.application.planificador import Planificador, TareaProgramada
+from src.shared.metrics import get_metrics
+
+AHORA = 1_700_000_000.0
+
+
+class TestPlanificador(unittest.TestCase):
+    def setUp(self):
+        self.ahora = AHORA
+        self.estado_repo = Mock(spec=IEstadoTareasRepository)
+        self.estado_repo.ultimas_ejecuciones.return_value = {}
+        self.planificador = self._planificador()
+
+    def _planificador(self):
+        return Planificador(self.estado_repo, reloj=lambda: self.ahora, azar=random.Random(7))
+
+    def _ejecutar(self):
+        hilos = self.planificador.ejecutar_pendientes()
+        for hilo in hilos:
+            hilo.join(5)
+        return [hilo.name for hilo in hilos]
+
+    def test_tarea_nueva_corre_y_se_reprograma_por_intervalo(self):
+        """Test: sin historial corre de inmediato, registra la corrida y vuelve a tocar tras el intervalo"""
+        accion = Mock()
+        self.planificador.registrar(TareaProgramada("expirar", 60, accion, jitter=0))
+
+        self.assertEqual(self._ejecutar(), ["tarea-expirar"])
+        self.ahora += 59
+        self.assertEqual(self._ejecutar(), [])
+        self.ahora += 1
+        self.assertEqual(self._ejecutar(), ["tarea-expirar"])
+
+        self.assertEqual(accion.call_count, 2)
+        nombre, inicio, duracion, error = self.estado_repo.registrar_ejecucion.call_args.args
+        self.assertEqual((nombre, inicio, error), ("expirar", datetime.fromtimestamp(AHORA + 60), None))
+        self.assertGreaterEqual(duracion, 0)
+
+    def test_retoma_desde_la_ultima_ejecucion_persistida(self):
+        """Test: una tarea diaria que corrió hace una hora no se repite al reiniciar"""
+        self.estado_repo.ultimas_ejecuciones.return_value = {"devengar": datetime.fromtimestamp(AHORA - 3600)}
+        self.planificador = self._planificador()
+        self.planificador.registrar(TareaProgramada("devengar", 86400, Mock(), jitter=0))
+
+        self.assertEqual(self._ejecutar(), [])
+        self.assertEqual(self.planificador.proximas_ejecuciones(), {"devengar": datetime.fromtimestamp(AHORA - 3600 + 86400)})
+
+    def test_heap_despacha_en_orden_de_turno(self):
+        """Test: solo se lanzan las tareas vencidas, la más próxima primero"""
+        self.estado_repo.ultimas_ejecuciones.return_value = {
+            "a": datetime.fromtimestamp(AHORA - 50),
+            "b": datetime.fromtimestamp(AHORA - 90),
+            "c": datetime.fromtimestamp(AHORA),
+        }
+        self.planificador = self._planificador()
+        for nombre in ("a", "b", "c"):
+            self.planificador.registrar(TareaProgramada(nombre, 100, Mock(), jitter=0))
+
+        self.ahora += 60
+        self.assertEqual(self._ejecutar(), ["tarea-b", "tarea-a"])
+
+    def test_jitter_acotado_por_fraccion_del_intervalo(self):
+        """Test: el turno se corre al azar entre 0 y jitter * intervalo"""
+        for i in range(20):
+            self.planificador.registrar(TareaProgramada(f"t{i}", 1000, Mock(), jitter=0.1))
+
+        demoras = [fecha.timestamp() - AHORA for fecha in self.planificador.proximas_ejecuciones().values()]
+        self.assertTrue(all(0 <= demora <= 100 for demora in demoras))
+        self.assertGreater(len(set(demoras)), 1)
+
+    def test_no_superpone_corridas_de_la_misma_tarea(self):
+        """Test: si la corrida anterior sigue en curso, el turno se omite"""
+        liberar = threading.Event()
+        accion = Mock(side_effect=lambda: liberar.wait(5))
+        self.planificador.registrar(TareaProgramada("vacuum", 10, accion, jitter=0))
+        omitidas = get_metrics().counter("biblioteca_job_runs_total", "", ("tarea", "resultado"))
+        antes = omitidas.valor("vacuum", "omitida")
+
+        (primera,) = self.planificador.ejecutar_pendientes()
+        self.ahora += 10
+        self.assertEqual(self.planificador.ejecutar_pendientes(), [])
+        liberar.set()
+        primera.join(5)
+
+        self.assertEqual(accion.call_count, 1)
+        self.assertEqual(omitidas.valor("vacuum", "omitida"), antes + 1)
+
+    def test_error_se_registra_y_no_detiene_el_calendario(self):
+        """Test: una excepción queda persistida y la tarea se vuelve a programar"""
+        self.planificador.registrar(TareaProgramada("analizar", 30, Mock(side_effect=RuntimeError("disco lleno")), jitter=0))
+
+        self._ejecutar()
+
+        self.assertEqual(self.estado_repo.registrar_ejecucion.call_args.args[3], "disco lleno")
+        self.assertIn("analizar", self.planificador.proximas_ejecuciones())
+
+    def test_registro_invalido(self):
+        """Test: nombres repetidos e intervalos no positivos se rechazan"""
+        self.planificador.registrar(TareaProgramada("expirar", 60, Mock()))
+
+        with self.assertRaises(ValueError):
+            self.planificador.registrar(TareaProgramada("expirar", 60, Mock()))
+        with self.assertRaises(ValueError):
+            self.planificador.registrar(TareaProgramada("otra", 0, Mock()))
+
+    def test_hilo_despachador_inicia_y_se_detiene(self):
+        """Test: el hilo de fondo corre las tareas vencidas y termina al detenerlo"""
+        corrio = threading.Event()
+        self.planificador.registrar(TareaProgramada("expirar", 60, corrio.set, jitter=0))
+
+        self.planificador.iniciar()
+        try:
+            self.assertTrue(corrio.wait(5))
+        finally:
+            self.planificador.detener(timeout=5)
+
+        self.assertFalse(self.planificador._hilo.is_alive())
+
+
+if __name__ == "__main__":
+    unittest.main()
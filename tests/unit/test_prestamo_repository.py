@@ -23,6 +23,7 @@ class TestPrestamoRepository(unittest.TestCase):
             "fecha_devolucion_real": None,
             "observaciones": None,
             "activo": True,
+            "version": 0,
         }
 
         self.usuario = Usuario(
@@ -97,6 +98,23 @@ class TestPrestamoRepository(unittest.TestCase):
         self.orm_mock.update.assert_called_once()
         self.assertEqual(resultado, self.prestamo)
 
+    def test_devolver_prestamo_cargado_escribe_solo_la_devolucion(self):
+        self.orm_mock.valor_fecha.side_effect = lambda fecha: fecha.isoformat() if fecha else None
+        self.orm_mock.select.return_value = [self.prestamo_data]
+        prestamo = self.repository.obtener_por_id(1)
+        prestamo.activo = False
+        prestamo.fecha_devolucion_real = datetime(2023, 1, 10)
+
+        self.repository.actualizar(prestamo)
+
+        self.orm_mock.update.assert_called_once_with(
+            "prestamos",
+            {"activo": False, "fecha_devolucion_real": "2023-01-10T00:00:00"},
+            "id = ? AND version = ?",
+            (1, 0),
+            incrementar=("version",),
+        )
+
     def test_entity_to_dict_conversion(self):
         resultado = self.repository._entity_to_dict(self.prestamo)
 
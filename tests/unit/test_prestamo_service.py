@@ -6,15 +6,24 @@ Tests unitarios para PrestamoService
 import os
 import sys
 import unittest
+from contextlib import nullcontext
 from datetime import datetime, timedelta
 from unittest.mock import Mock
 
 # Agregar el path del proyecto
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
 
-from src.application.interfaces import IItemBibliotecaRepository, IMultaRepository, IPrestamoRepository, IUsuarioRepository
+from src.application.cola_reservas import ColaReservas
+from src.application.interfaces import (
+    IItemBibliotecaRepository,
+    IMultaRepository,
+    IPrestamoRepository,
+    IUnidadDeTrabajo,
+    IUsuarioRepository,
+)
 from src.application.services import PrestamoService
 from src.domain.entities import CategoriaItem, EstadoItem, ItemBiblioteca, Multa, Prestamo, TipoUsuario, Usuario
+from src.shared.exceptions import ItemsNoDisponiblesException
 
 
 class TestPrestamoService(unittest.TestCase):
@@ -25,6 +34,7 @@ class TestPrestamoService(unittest.TestCase):
         self.mock_item_repo = Mock(spec=IItemBibliotecaRepository)
         self.mock_usuario_repo = Mock(spec=IUsuarioRepository)
         self.mock_multa_repo = Mock(spec=IMultaRepository)
+        self.mock_multa_repo.saldo_pendiente.return_value = 0.0
 
         self.prestamo_service = PrestamoService(
             self.mock_prestamo_repo, self.mock_item_repo, self.mock_usuario_repo, self.mock_multa_repo
@@ -42,8 +52,6 @@ class TestPrestamoService(unittest.TestCase):
             numero_identificacion="12345",
         )
 
-        item = ItemBiblioteca(id=1, titulo="Python Programming", categoria=CategoriaItem.LIBRO, estado=EstadoItem.DISPONIBLE)
-
         prestamo_esperado = Prestamo(
             id=1,
             usuario_id=1,
@@ -55,9 +63,8 @@ class TestPrestamoService(unittest.TestCase):
         )
 
         self.mock_usuario_repo.obtener_por_id.return_value = usuario
-        self.mock_item_repo.obtener_por_id.return_value = item
+        self.mock_item_repo.reservar_si_disponible.return_value = True
         self.mock_prestamo_repo.crear.return_value = prestamo_esperado
-        self.mock_item_repo.actualizar.return_value = item
 
         # Act
         resultado = self.prestamo_service.realizar_prestamo(1, 1, 1, 15)
@@ -69,9 +76,21 @@ class TestPrestamoService(unittest.TestCase):
         self.assertTrue(resultado.activo)
 
         self.mock_usuario_repo.obtener_por_id.assert_called_once_with(1)
-        self.mock_item_repo.obtener_por_id.assert_called_once_with(1)
+        self.mock_item_repo.reservar_si_disponible.assert_called_once_with(1)
+        self.mock_item_repo.obtener_por_id.assert_not_called()  # El compare-and-set no necesita leer el item
         self.mock_prestamo_repo.crear.assert_called_once()
-        self.mock_item_repo.actualizar.assert_called_once()
+        self.mock_item_repo.actualizar.assert_not_called()
+
+    def test_realizar_prestamo_libera_el_item_si_falla_el_alta(self):
+        """Test: si no se puede registrar el préstamo, el item vuelve a estar disponible"""
+        self.mock_usuario_repo.obtener_por_id.return_value = Usuario(id=1, nombre="Juan", email="juan@test.com")
+        self.mock_item_repo.reservar_si_disponible.return_value = True
+        self.mock_prestamo_repo.crear.side_effect = RuntimeError("disco lleno")
+
+        with self.assertRaises(RuntimeError):
+            self.prestamo_service.realizar_prestamo(1, 1, 1)
+
+        self.mock_item_repo.liberar_si_prestado.assert_called_once_with(1)
 
     def test_realizar_prestamo_usuario_inexistente(self):
         """Test: Error con usuario inexistente"""
@@ -98,6 +117,7 @@ class TestPrestamoService(unittest.TestCase):
         )
 
         self.mock_usuario_repo.obtener_por_id.return_value = usuario
+        self.mock_item_repo.reservar_si_disponible.return_value = False
         self.mock_item_repo.obtener_por_id.return_value = None
 
         # Act & Assert
@@ -122,6 +142,7 @@ class TestPrestamoService(unittest.TestCase):
         item = ItemBiblioteca(id=1, titulo="Python Programming", categoria=CategoriaItem.LIBRO, estado=EstadoItem.PRESTADO)
 
         self.mock_usuario_repo.obtener_por_id.return_value = usuario
+        self.mock_item_repo.reservar_si_disponible.return_value = False
         self.mock_item_repo.obtener_por_id.return_value = item
 
         # Act & Assert
@@ -131,6 +152,111 @@ class TestPrestamoService(unittest.TestCase):
         self.assertIn("no está disponible", str(context.exception))
         self.mock_prestamo_repo.crear.assert_not_called()
 
+    def test_realizar_prestamos_multiples(self):
+        """Test: préstamo de varios items con un UPDATE y un INSERT por lote"""
+        # Arrange
+        self.mock_usuario_repo.obtener_por_id.return_value = Usuario(id=1, nombre="Ana", email="ana@test.com")
+        self.mock_item_repo.obtener_por_ids.return_value = {
+            i: ItemBiblioteca(id=i, titulo=f"Kit {i}", estado=EstadoItem.DISPONIBLE) for i in (5, 6, 7)
+        }
+        self.mock_item_repo.reservar_si_disponibles.return_value = 3
+        self.mock_prestamo_repo.listar_activos_por_items.return_value = [
+            Prestamo(id=100 + i, usuario_id=1, item_id=i, empleado_id=2) for i in (7, 5, 6)
+        ]
+
+        # Act
+        prestamos = self.prestamo_service.realizar_prestamos(1, [5, 6, 7, 6], 2)
+
+        # Assert
+        self.assertEqual([p.item_id for p in prestamos], [5, 6, 7])
+        self.mock_usuario_repo.obtener_por_id.assert_called_once_with(1)
+        self.mock_item_repo.reservar_si_disponibles.assert_called_once_with([5, 6, 7])
+        (nuevos,) = self.mock_prestamo_repo.crear_muchos.call_args[0]
+        self.assertEqual([(p.usuario_id, p.item_id, p.empleado_id) for p in nuevos], [(1, 5, 2), (1, 6, 2), (1, 7, 2)])
+        self.mock_prestamo_repo.crear.assert_not_called()
+
+    def test_realizar_prestamos_informa_items_que_fallan(self):
+        """Test: si un item no se puede prestar no se presta ninguno y se informa cuál falló"""
+        self.mock_usuario_repo.obtener_por_id.return_value = Usuario(id=1, nombre="Ana", email="ana@test.com")
+        self.mock_item_repo.obtener_por_ids.return_value = {
+            5: ItemBiblioteca(id=5, titulo="Kit 5", estado=EstadoItem.DISPONIBLE),
+            6: ItemBiblioteca(id=6, titulo="Kit 6", estado=EstadoItem.EN_REPARACION),
+        }
+
+        with self.assertRaises(ItemsNoDisponiblesException) as contexto:
+            self.prestamo_service.realizar_prestamos(1, [5, 6, 8], 2)
+
+        self.assertEqual(sorted(contexto.exception.fallidos), [6, 8])
+        self.assertIn("en_reparacion", contexto.exception.fallidos[6])
+        self.mock_item_repo.reservar_si_disponibles.assert_not_called()
+        self.mock_prestamo_repo.crear_muchos.assert_not_called()
+
+    def test_realizar_prestamo_usuario_con_multas_o_inactivo(self):
+        """Test: el saldo impago del libro de saldos o un usuario inactivo bloquean el préstamo"""
+        usuario = Usuario(id=1, nombre="Juan", email="juan@test.com")
+        self.mock_usuario_repo.obtener_por_id.return_value = usuario
+        self.mock_multa_repo.saldo_pendiente.return_value = 150.0
+
+        with self.assertRaisesRegex(ValueError, r"multas pendientes por \$150.00"):
+            self.prestamo_service.realizar_prestamo(1, 1, 1)
+        with self.assertRaisesRegex(ValueError, "multas pendientes"):
+            self.prestamo_service.realizar_prestamos(1, [5, 6], 1)
+
+        self.mock_multa_repo.saldo_pendiente.return_value = 0.0
+        usuario.activo = False
+        with self.assertRaisesRegex(ValueError, "inactivo"):
+            self.prestamo_service.realizar_prestamo(1, 1, 1)
+
+        self.mock_multa_repo.saldo_pendiente.assert_called_with(1)
+        self.mock_item_repo.reservar_si_disponible.assert_not_called()
+        self.mock_prestamo_repo.crear.assert_not_called()
+
+    def test_realizar_prestamo_respeta_limite_simultaneo(self):
+        """Test: con el límite alcanzado no se toma el item; sin límite ni siquiera se cuenta"""
+        self.mock_usuario_repo.obtener_por_id.return_value = Usuario(id=1, nombre="Juan", email="juan@test.com")
+        self.mock_prestamo_repo.contar_activos_por_usuario.return_value = 3
+        limitado = PrestamoService(
+            self.mock_prestamo_repo,
+            self.mock_item_repo,
+            self.mock_usuario_repo,
+            self.mock_multa_repo,
+            max_prestamos_simultaneos=3,
+        )
+
+        with self.assertRaisesRegex(ValueError, "máximo 3"):
+            limitado.realizar_prestamo(1, 1, 1)
+
+        self.mock_prestamo_repo.contar_activos_por_usuario.assert_called_once_with(1)
+        self.mock_item_repo.reservar_si_disponible.assert_not_called()
+        self.mock_prestamo_repo.crear.assert_not_called()
+
+        self.mock_item_repo.reservar_si_disponible.return_value = True
+        self.prestamo_service.realizar_prestamo(1, 1, 1)
+        self.mock_prestamo_repo.contar_activos_por_usuario.assert_called_once()
+
+    def test_realizar_prestamos_cuenta_el_lote_contra_el_limite(self):
+        """Test: el lote completo tiene que entrar en el cupo que le queda al usuario"""
+        self.mock_usuario_repo.obtener_por_id.return_value = Usuario(id=1, nombre="Ana", email="ana@test.com")
+        self.mock_prestamo_repo.contar_activos_por_usuario.return_value = 1
+        limitado = PrestamoService(
+            self.mock_prestamo_repo,
+            self.mock_item_repo,
+            self.mock_usuario_repo,
+            self.mock_multa_repo,
+            max_prestamos_simultaneos=3,
+        )
+
+        with self.assertRaisesRegex(ValueError, "con 3 más superaría el máximo de 3"):
+            limitado.realizar_prestamos(1, [5, 6, 7], 2)
+
+        self.mock_item_repo.reservar_si_disponibles.assert_not_called()
+        self.mock_prestamo_repo.crear_muchos.assert_not_called()
+
+    def test_realizar_prestamos_sin_items(self):
+        """Test: Error si no se indica ningún item"""
+        with self.assertRaises(ValueError):
+            self.prestamo_service.realizar_prestamos(1, [], 2)
+
     def test_devolver_item_exitoso(self):
         """Test: Devolución exitosa sin atraso"""
         # Arrange
@@ -262,6 +388,94 @@ class TestPrestamoService(unittest.TestCase):
         self.assertIn("ya fue devuelto", str(context.exception))
         self.mock_prestamo_repo.actualizar.assert_not_called()
 
+    def test_devolver_items_por_prestamo(self):
+        """Test: devolución por lote con un resumen por préstamo pedido"""
+        # Arrange
+        a_tiempo = Prestamo(
+            id=1, usuario_id=1, item_id=10, empleado_id=1, fecha_devolucion_esperada=datetime.now() + timedelta(days=3)
+        )
+        tarde = Prestamo(
+            id=2, usuario_id=2, item_id=20, empleado_id=1, fecha_devolucion_esperada=datetime.now() - timedelta(days=4)
+        )
+        devuelto = Prestamo(id=3, usuario_id=3, item_id=30, empleado_id=1, activo=False)
+        self.mock_prestamo_repo.obtener_por_ids.return_value = {1: a_tiempo, 2: tarde, 3: devuelto}
+        unidad_trabajo = Mock(spec=IUnidadDeTrabajo)
+        unidad_trabajo.transaccion.return_value = nullcontext()
+        servicio = PrestamoService(
+            self.mock_prestamo_repo, self.mock_item_repo, self.mock_usuario_repo, self.mock_multa_repo, unidad_trabajo
+        )
+
+        # Act
+        resultados = servicio.devolver_items(prestamo_ids=[2, 99, 1, 3, 2])
+
+        # Assert
+        self.assertEqual([r.prestamo_id for r in resultados], [2, 99, 1, 3])
+        self.assertEqual([r.devuelto for r in resultados], [True, False, True, False])
+        self.assertEqual(resultados[0].multa, 200.0)
+        self.assertIsNone(resultados[2].multa)
+        self.assertIn("No se encontró", resultados[1].motivo)
+        self.assertIn("ya fue devuelto", resultados[3].motivo)
+
+        unidad_trabajo.transaccion.assert_called_once()
+        self.mock_prestamo_repo.marcar_devueltos.assert_called_once()
+        self.assertEqual(self.mock_prestamo_repo.marcar_devueltos.call_args[0][0], [2, 1])
+        self.mock_item_repo.liberar_si_prestados.assert_called_once_with([20, 10])
+        (multas,) = self.mock_multa_repo.crear_muchas.call_args[0]
+        self.assertEqual([(m.prestamo_id, m.monto) for m in multas], [(2, 200.0)])
+        self.mock_prestamo_repo.actualizar.assert_not_called()
+
+    def test_devolver_items_por_item_sin_atrasos(self):
+        """Test: el buzón devuelve por ID de item y no crea multas si no hay atrasos"""
+        prestamo = Prestamo(
+            id=7, usuario_id=1, item_id=70, empleado_id=1, fecha_devolucion_esperada=datetime.now() + timedelta(days=1)
+        )
+        self.mock_prestamo_repo.listar_activos_por_items.return_value = [prestamo]
+
+        resultados = self.prestamo_service.devolver_items(item_ids=[70, 71])
+
+        self.assertEqual([(r.prestamo_id, r.item_id, r.devuelto) for r in resultados], [(7, 70, True), (None, 71, False)])
+        self.mock_prestamo_repo.listar_activos_por_items.assert_called_once_with([70, 71])
+        self.mock_multa_repo.crear_muchas.assert_not_called()
+
+    def test_devolver_items_aparta_para_la_cola_de_reservas(self):
+        """Test: los items con reservas en espera quedan apartados; el resto vuelve a estar disponible"""
+        cola = Mock(spec=ColaReservas)
+        cola.asignar_siguientes.return_value = {70: 500}
+        servicio = PrestamoService(
+            self.mock_prestamo_repo, self.mock_item_repo, self.mock_usuario_repo, self.mock_multa_repo, cola_reservas=cola
+        )
+        vence = datetime.now() + timedelta(days=1)
+        self.mock_prestamo_repo.listar_activos_por_items.return_value = [
+            Prestamo(id=7, usuario_id=1, item_id=70, empleado_id=1, fecha_devolucion_esperada=vence),
+            Prestamo(id=8, usuario_id=1, item_id=80, empleado_id=1, fecha_devolucion_esperada=vence),
+        ]
+
+        resultados = servicio.devolver_items(item_ids=[70, 80])
+
+        self.assertEqual([r.reserva_id for r in resultados], [500, None])
+        self.mock_item_repo.apartar_si_prestados.assert_called_once_with([70])
+        self.mock_item_repo.liberar_si_prestados.assert_called_once_with([80])
+
+    def test_devolver_items_recarga_la_cola_si_falla(self):
+        """Test: si el lote falla, la cola en memoria se reconstruye desde la base"""
+        cola = Mock(spec=ColaReservas)
+        servicio = PrestamoService(
+            self.mock_prestamo_repo, self.mock_item_repo, self.mock_usuario_repo, self.mock_multa_repo, cola_reservas=cola
+        )
+        self.mock_prestamo_repo.obtener_por_ids.side_effect = RuntimeError("database is locked")
+
+        with self.assertRaises(RuntimeError):
+            servicio.devolver_items(prestamo_ids=[1])
+
+        cola.recargar.assert_called_once()
+
+    def test_devolver_items_requiere_un_solo_tipo_de_id(self):
+        """Test: se indica prestamo_ids o item_ids, no ambos ni ninguno"""
+        with self.assertRaises(ValueError):
+            self.prestamo_service.devolver_items()
+        with self.assertRaises(ValueError):
+            self.prestamo_service.devolver_items(prestamo_ids=[1], item_ids=[1])
+
     def test_listar_prestamos_activos(self):
         """Test: Listar préstamos activos"""
         # Arrange
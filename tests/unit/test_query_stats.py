@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Tests unitarios para huellas de consultas y log de consultas lentas
+"""
+
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# Agregar el path del proyecto
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from src.infrastructure.database import ORM, DatabaseConnection
+from src.infrastructure.database.query_stats import QueryStats, SlowQueryLog, fingerprint
+
+
+class TestFingerprint(unittest.TestCase):
+    def test_normaliza_literales_y_espacios(self):
+        """Test: literales y espacios no cambian la huella"""
+        a = fingerprint("SELECT * FROM usuarios WHERE email = 'a@b.com' AND id = 10")
+        b = fingerprint("SELECT *   FROM usuarios\n WHERE email = 'otro@b.com' AND id = 99")
+
+        self.assertEqual(a, b)
+        self.assertEqual(a, "SELECT * FROM usuarios WHERE email = ? AND id = ?")
+
+    def test_colapsa_listas_in(self):
+        """Test: IN con distinta cantidad de parámetros comparte huella"""
+        a = fingerprint("SELECT * FROM items_biblioteca WHERE id IN (?, ?, ?)")
+        b = fingerprint("SELECT * FROM items_biblioteca WHERE id IN (?)")
+
+        self.assertEqual(a, b)
+        self.assertIn("IN (...)", a)
+
+    def test_no_altera_identificadores(self):
+        """Test: los números dentro de identificadores se conservan"""
+        self.assertIn("idx_1", fingerprint("CREATE INDEX idx_1 ON t(c)"))
+
+
+class TestQueryStats(unittest.TestCase):
+    def test_percentiles_y_orden_por_total(self):
+        """Test: resumen con percentiles, ordenado por tiempo total"""
+        stats = QueryStats()
+        for ms in range(1, 101):
+            stats.registrar("SELECT lenta", ms / 1000)
+        stats.registrar("SELECT rapida", 0.001)
+
+        resumen = stats.resumen()
+
+        self.assertEqual(resumen[0].huella, "SELECT lenta")
+        self.assertEqual(resumen[0].llamadas, 100)
+        self.assertAlmostEqual(resumen[0].p50_ms, 50.0)
+        self.assertAlmostEqual(resumen[0].p95_ms, 95.0)
+        self.assertAlmostEqual(resumen[0].p99_ms, 99.0)
+        self.assertAlmostEqual(resumen[0].max_ms, 100.0)
+        self.assertEqual(len(stats.resumen(limite=1)), 1)
+
+
+class TestDatabaseConnectionInstrumentada(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db = DatabaseConnection(os.path.join(self.temp_dir, "test.db"), slow_query_ms=0)
+        self.orm = ORM(self.db)
+        self.orm.create_tables()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_agrupa_selects_por_huella(self):
+        """Test: los select del ORM con distintos parámetros comparten huella"""
+        with patch.object(SlowQueryLog, "registrar"):
+            self.orm.select("usuarios", "id = ?", (1,))
+            self.orm.select("usuarios", "id = ?", (2,))
+
+        huellas = {r.huella: r.llamadas for r in self.db.query_stats.resumen()}
+        self.assertEqual(huellas["SELECT * FROM usuarios WHERE id = ?"], 2)
+
+    def test_consulta_lenta_incluye_plan(self):
+        """Test: las consultas sobre el umbral se registran con EXPLAIN QUERY PLAN"""
+        with patch.object(SlowQueryLog, "_canal") as mock_canal:
+            self.orm.select("usuarios", "email = ?", ("a@b.com",))
+
+        args = mock_canal.return_value.warning.call_args[0]
+        self.assertIn("SELECT * FROM usuarios WHERE email = ?", args)
+        self.assertIn("SEARCH usuarios USING INDEX", args[-1])
+
+    def test_sentencia_fallida_no_corre_explain(self):
+        """Test: una sentencia que falla cuenta en las estadísticas pero no va al log de consultas lentas"""
+        with patch.object(SlowQueryLog, "registrar") as mock_registrar:
+            with self.assertRaises(sqlite3.IntegrityError):
+                self.db.execute_rowcount("INSERT INTO usuarios (id, email) VALUES (1, NULL)")
+            with self.assertRaises(sqlite3.OperationalError):
+                self.db.execute_query("SELECT * FROM tabla_inexistente")
+
+        mock_registrar.assert_not_called()
+        huellas = {r.huella for r in self.db.query_stats.resumen()}
+        self.assertIn("SELECT * FROM tabla_inexistente", huellas)
+
+    def test_sin_umbral_no_registra_lentas(self):
+        """Test: sin umbral configurado no hay log de consultas lentas"""
+        db = DatabaseConnection(os.path.join(self.temp_dir, "otra.db"))
+
+        self.assertIsNone(db.slow_query_log)
+
+
+if __name__ == "__main__":
+    unittest.main()
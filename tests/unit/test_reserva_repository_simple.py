@@ -21,6 +21,7 @@ class TestReservaRepositorySimple(unittest.TestCase):
             "fecha_reserva": "2023-01-01T00:00:00",
             "fecha_expiracion": "2023-01-08T00:00:00",
             "activa": True,
+            "fecha_asignacion": None,
         }
 
         self.reserva = Reserva(
@@ -12,9 +12,15 @@ from unittest.mock import Mock
 # Agregar el path del proyecto
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
 
-from src.application.interfaces import IItemBibliotecaRepository, IReservaRepository, IUsuarioRepository
+from src.application.interfaces import (
+    IItemBibliotecaRepository,
+    IMultaRepository,
+    IPrestamoRepository,
+    IReservaRepository,
+    IUsuarioRepository,
+)
 from src.application.services import ReservaService
-from src.domain.entities import CategoriaItem, EstadoItem, ItemBiblioteca, Reserva, TipoUsuario, Usuario
+from src.domain.entities import CategoriaItem, EstadoItem, ItemBiblioteca, Prestamo, Reserva, TipoUsuario, Usuario
 
 
 class TestReservaService(unittest.TestCase):
@@ -25,7 +31,12 @@ class TestReservaService(unittest.TestCase):
         self.mock_item_repo = Mock(spec=IItemBibliotecaRepository)
         self.mock_usuario_repo = Mock(spec=IUsuarioRepository)
 
-        self.reserva_service = ReservaService(self.mock_reserva_repo, self.mock_item_repo, self.mock_usuario_repo)
+        self.mock_prestamo_repo = Mock(spec=IPrestamoRepository)
+        self.mock_usuario_repo.obtener_por_id.return_value = Usuario(id=2, nombre="Ana", email="ana@test.com")
+
+        self.reserva_service = ReservaService(
+            self.mock_reserva_repo, self.mock_item_repo, self.mock_usuario_repo, prestamo_repo=self.mock_prestamo_repo
+        )
 
     def test_realizar_reserva_exitosa(self):
         """Test: Realizar reserva exitosamente"""
@@ -136,6 +147,20 @@ class TestReservaService(unittest.TestCase):
         self.assertIn("está disponible, no necesita reserva", str(context.exception))
         self.mock_reserva_repo.crear.assert_not_called()
 
+    def test_realizar_reserva_respeta_limite_simultaneo(self):
+        """Test: un usuario con el máximo de reservas activas no puede reservar otra"""
+        self.mock_usuario_repo.obtener_por_id.return_value = Usuario(id=1, nombre="Juan", email="juan@test.com")
+        self.mock_reserva_repo.contar_activas_por_usuario.return_value = 2
+        limitado = ReservaService(
+            self.mock_reserva_repo, self.mock_item_repo, self.mock_usuario_repo, max_reservas_simultaneas=2
+        )
+
+        with self.assertRaisesRegex(ValueError, "2 reservas activas"):
+            limitado.realizar_reserva(1, 1, 1)
+
+        self.mock_reserva_repo.contar_activas_por_usuario.assert_called_once_with(1)
+        self.mock_reserva_repo.crear.assert_not_called()
+
     def test_cancelar_reserva_exitosa(self):
         """Test: Cancelar reserva exitosamente"""
         # Arrange
@@ -200,6 +225,126 @@ class TestReservaService(unittest.TestCase):
         self.assertEqual(len(resultado), 2)
         self.mock_reserva_repo.listar_activas.assert_called_once()
 
+    def test_convertir_en_prestamo_ejemplar_apartado(self):
+        """Test: la reserva con ejemplar apartado se cierra y el item pasa de reservado a prestado"""
+        # Arrange
+        reserva = Reserva(id=4, usuario_id=2, item_id=9, empleado_id=1, fecha_asignacion=datetime.now())
+        self.mock_reserva_repo.obtener_por_id.return_value = reserva
+        self.mock_reserva_repo.cerrar_si_vigente.return_value = True
+        self.mock_item_repo.prestar_si_reservado.return_value = True
+        self.mock_prestamo_repo.crear.side_effect = lambda p: p
+
+        # Act
+        prestamo = self.reserva_service.convertir_en_prestamo(4, empleado_id=7, dias_prestamo=10)
+
+        # Assert
+        self.assertEqual((prestamo.usuario_id, prestamo.item_id, prestamo.empleado_id), (2, 9, 7))
+        self.assertEqual((prestamo.fecha_devolucion_esperada - prestamo.fecha_prestamo).days, 10)
+        self.mock_item_repo.prestar_si_reservado.assert_called_once_with(9)
+        self.mock_item_repo.reservar_si_disponible.assert_not_called()
+
+    def test_convertir_en_prestamo_sin_ejemplar_disponible(self):
+        """Test: una reserva en espera solo se retira si el item está disponible; si no, no se presta"""
+        self.mock_reserva_repo.obtener_por_id.return_value = Reserva(id=4, usuario_id=2, item_id=9)
+        self.mock_reserva_repo.cerrar_si_vigente.return_value = True
+        self.mock_item_repo.reservar_si_disponible.return_value = False
+
+        with self.assertRaises(ValueError):
+            self.reserva_service.convertir_en_prestamo(4, empleado_id=7)
+
+        self.mock_prestamo_repo.crear.assert_not_called()
+
+    def test_convertir_en_prestamo_respeta_limite_de_prestamos(self):
+        """Test: retirar una reserva cuenta como un préstamo más para el límite del usuario"""
+        self.mock_reserva_repo.obtener_por_id.return_value = Reserva(id=4, usuario_id=2, item_id=9)
+        self.mock_prestamo_repo.contar_activos_por_usuario.return_value = 3
+        limitado = ReservaService(
+            self.mock_reserva_repo,
+            self.mock_item_repo,
+            self.mock_usuario_repo,
+            prestamo_repo=self.mock_prestamo_repo,
+            max_prestamos_simultaneos=3,
+        )
+
+        with self.assertRaisesRegex(ValueError, "3 préstamos activos"):
+            limitado.convertir_en_prestamo(4, empleado_id=7)
+
+        self.mock_prestamo_repo.contar_activos_por_usuario.assert_called_once_with(2)
+        self.mock_reserva_repo.cerrar_si_vigente.assert_not_called()
+        self.mock_prestamo_repo.crear.assert_not_called()
+
+    def test_convertir_en_prestamo_con_multas_pendientes(self):
+        """Test: un usuario que adeuda multas no retira su reserva"""
+        self.mock_reserva_repo.obtener_por_id.return_value = Reserva(id=4, usuario_id=2, item_id=9)
+        mock_multa_repo = Mock(spec=IMultaRepository)
+        mock_multa_repo.saldo_pendiente.return_value = 50.0
+        servicio = ReservaService(
+            self.mock_reserva_repo,
+            self.mock_item_repo,
+            self.mock_usuario_repo,
+            prestamo_repo=self.mock_prestamo_repo,
+            multa_repo=mock_multa_repo,
+        )
+
+        with self.assertRaisesRegex(ValueError, "multas pendientes"):
+            servicio.convertir_en_prestamo(4, empleado_id=7)
+
+        mock_multa_repo.saldo_pendiente.assert_called_once_with(2)
+        self.mock_reserva_repo.cerrar_si_vigente.assert_not_called()
+
+    def test_convertir_en_prestamo_usuario_inactivo(self):
+        """Test: un usuario dado de baja no retira su reserva, igual que no puede pedir un préstamo"""
+        self.mock_reserva_repo.obtener_por_id.return_value = Reserva(id=4, usuario_id=2, item_id=9)
+        self.mock_usuario_repo.obtener_por_id.return_value = Usuario(id=2, nombre="Ana", email="ana@test.com", activo=False)
+
+        with self.assertRaisesRegex(ValueError, "inactivo"):
+            self.reserva_service.convertir_en_prestamo(4, empleado_id=7)
+
+        self.mock_usuario_repo.obtener_por_id.assert_called_once_with(2)
+        self.mock_reserva_repo.cerrar_si_vigente.assert_not_called()
+        self.mock_prestamo_repo.crear.assert_not_called()
+
+    def test_convertir_en_prestamo_reserva_vencida_o_inactiva(self):
+        """Test: no se retira una reserva inexistente, inactiva o vencida"""
+        self.mock_reserva_repo.obtener_por_id.return_value = None
+        with self.assertRaises(ValueError):
+            self.reserva_service.convertir_en_prestamo(4, empleado_id=7)
+
+        self.mock_reserva_repo.obtener_por_id.return_value = Reserva(id=4, item_id=9, activa=False)
+        with self.assertRaises(ValueError):
+            self.reserva_service.convertir_en_prestamo(4, empleado_id=7)
+
+        self.mock_reserva_repo.obtener_por_id.return_value = Reserva(id=4, item_id=9)
+        self.mock_reserva_repo.cerrar_si_vigente.return_value = False
+        with self.assertRaisesRegex(ValueError, "vencida"):
+            self.reserva_service.convertir_en_prestamo(4, empleado_id=7)
+
+        self.mock_item_repo.prestar_si_reservado.assert_not_called()
+        self.mock_item_repo.reservar_si_disponible.assert_not_called()
+
+    def test_expirar_reservas_por_lotes(self):
+        """Test: el barrido pide lotes hasta recibir uno incompleto y reporta lo desactivado"""
+        # Arrange
+        corte = datetime(2024, 6, 20, 8, 0)
+        self.mock_reserva_repo.desactivar_expiradas.side_effect = [[1, 2], [3, 4], [5]]
+        self.mock_reserva_repo.obtener_por_ids.return_value = {}
+
+        # Act
+        resumen = self.reserva_service.expirar_reservas(corte, lote=2)
+
+        # Assert
+        self.assertEqual(resumen.reserva_ids, (1, 2, 3, 4, 5))
+        self.assertEqual((resumen.desactivadas, resumen.lotes, resumen.fecha_corte), (5, 3, corte))
+        self.assertEqual(self.mock_reserva_repo.desactivar_expiradas.call_count, 3)
+        self.mock_reserva_repo.desactivar_expiradas.assert_called_with(corte, 2)
+
+    def test_expirar_reservas_lote_invalido(self):
+        """Test: un lote de cero no se acepta"""
+        with self.assertRaises(ValueError):
+            self.reserva_service.expirar_reservas(lote=0)
+
+        self.mock_reserva_repo.desactivar_expiradas.assert_not_called()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -71,6 +71,15 @@ class TestUsuarioRepository(unittest.TestCase):
         self.orm_mock.select.assert_called_once_with("usuarios", "id = ?", (999,))
         self.assertIsNone(resultado)
 
+    def test_obtener_por_ids(self):
+        self.orm_mock.select_in_rows.return_value = (tuple(self.usuario_data), [tuple(self.usuario_data.values())])
+
+        resultado = self.repository.obtener_por_ids([1, 999])
+
+        self.orm_mock.select_in_rows.assert_called_once_with("usuarios", "id", [1, 999])
+        self.assertEqual(list(resultado), [1])
+        self.assertEqual(resultado[1].nombre, "Juan")
+
     def test_obtener_por_email_existente(self):
         self.orm_mock.select.return_value = [self.usuario_data]
 
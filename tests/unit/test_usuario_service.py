@@ -12,6 +12,7 @@ from unittest.mock import Mock
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
 
 from src.application.interfaces import IUsuarioRepository
+from src.application.read_models import ResumenCuenta
 from src.application.services import UsuarioService
 from src.domain.entities import TipoUsuario, Usuario
 
@@ -166,6 +167,18 @@ class TestUsuarioService(unittest.TestCase):
         self.assertEqual(resultado, usuario)
         self.mock_repo.actualizar.assert_called_once_with(usuario)
 
+    def test_resumen_cuenta(self):
+        """Test: el resumen de cuenta es una sola lectura del repositorio; usuario inexistente es un error"""
+        resumen = ResumenCuenta(1, "Juan", "Pérez", TipoUsuario.ALUMNO, True, 2, 1, None, 1, 0, 3, 150.0)
+        self.mock_repo.resumen_cuenta.return_value = resumen
+
+        self.assertEqual(self.usuario_service.resumen_cuenta(1), resumen)
+        self.assertEqual(self.mock_repo.resumen_cuenta.call_args.args[0], 1)
+
+        self.mock_repo.resumen_cuenta.return_value = None
+        with self.assertRaisesRegex(ValueError, "No se encontró el usuario con ID: 999"):
+            self.usuario_service.resumen_cuenta(999)
+
 
 if __name__ == "__main__":
     unittest.main()